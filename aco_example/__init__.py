@@ -1,13 +1,35 @@
+import contextlib
+import os
 import sys
-import pygame
 
 from aco_example.ant import Ant
-from aco_example.button import Button
+from aco_example.checkpoint import load_checkpoint, save_checkpoint
+from aco_example.clock import SimulationClock
+from aco_example.colony import Colony
+from aco_example.fonts import fonts
+from aco_example.graph import Graph
+from aco_example.network import Network
 from aco_example.node import Node
 from aco_example.path import Path
+from aco_example.profiling import profiler
+from aco_example.simulation import Simulation
+from aco_example.spatial import GridIndex
+from aco_example.worker import SimulationWorker
 
 
-def run():
+def run(threaded=False, checkpoint=None):
+    """Opens the editor window and runs it until it is closed.
+
+    Args:
+        threaded: Whether the simulation runs on a background thread while the window only draws its snapshots.
+        checkpoint: A checkpoint directory to resume from if it exists. The nodes, paths and ants are saved to it
+            when S is pressed and when the window is closed.
+    """
+    # Only the window needs pygame, so importing the package for a headless simulation does not load it.
+    import pygame
+    from aco_example.button import Button
+    from aco_example.render import AntRenderer, LayeredRenderer
+
     WHITE = (255, 255, 255)
     BLACK = (0, 0, 0)
     EVENT_X = 0
@@ -35,9 +57,12 @@ def run():
     NODE_LOCATION = 20
     NODE_RADIUS = 40
     NODE_COLOR = (0, 80, 200)
-    nodes = []
+    # Buckets the nodes by position so that only the nodes near the mouse or the trash can have to be checked.
+    node_index = GridIndex(NODE_RADIUS * 2)
+    network = Network(node_index)
+    nodes = network.nodes
     ID = 0
-    nodes.append(Node(ID, NODE_COLOR, pygame.Rect(NODE_LOCATION, NODE_LOCATION, NODE_RADIUS * 2, NODE_RADIUS * 2)))
+    network.add_node(Node(ID, NODE_COLOR, pygame.Rect(NODE_LOCATION, NODE_LOCATION, NODE_RADIUS * 2, NODE_RADIUS * 2)))
     nodes[0].is_colony = True
     ID += 1
 
@@ -71,11 +96,11 @@ def run():
     TRASH_HEIGHT = 60
     trash = pygame.Rect(10, SCREEN_HEIGHT - TRASH_HEIGHT - 10, TRASH_WIDTH, TRASH_HEIGHT)
     TRASH_COLOR = (40, 40, 40)
-    TRASH_FONT = pygame.font.SysFont('Arial', 53)
+    TRASH_FONT = fonts.get('Arial', 53)
     TRASH_TEXT = TRASH_FONT.render('TRASH', True, WHITE)
 
     # Information text.
-    INFO_FONT = pygame.font.SysFont('Arial', 16)
+    INFO_FONT = fonts.get('Arial', 16)
 
     path_text = ['Toggle the \'Add Path\'',
                  'button in order to add',
@@ -113,105 +138,69 @@ def run():
     FROM_NODE = None
 
     # Paths between nodes.
-    paths = []
+    paths = network.paths
 
-    # Setup for ant colony.
-    colony = []
+    # Setup for ant colony. The simulation shares the node and path lists with the editor.
     NUM_ANTS = 50
-
-    clock = pygame.time.Clock()
-    phero_clock = 0
-    while RUNNING:
-        phero_clock += clock.tick(60)
-
-        # Handling to game events.
-        for event in pygame.event.get():
-            # Check to see if button is pressed.
-            add_path_button.pressed(event)
-            add_food_button.pressed(event)
-            run_button.pressed(event)
-            clear_button.pressed(event)
-
-            # User exiting the game.
-            if event.type == pygame.QUIT:
-                RUNNING = False
-            # User presses a key down.
-            elif event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_ESCAPE:
-                    RUNNING = False
-
-            # User pressing mouse button (1) down.
-            if not run_button.is_pressed:
-                if event.type == pygame.MOUSEBUTTONDOWN:
-                    if event.button == 1:
-                        if clear_button.is_pressed:
-                            nodes.clear()
-                            paths.clear()
-                            clear_button.is_pressed = False
-                        for i, node in enumerate(nodes):
-                            dx = node.rect.centerx - event.pos[EVENT_X]
-                            dy = node.rect.centery - event.pos[EVENT_Y]
-                            dist_sq = dx ** 2 + dy ** 2
-
-                            if dist_sq <= NODE_RADIUS ** 2:
-                                # Below is selection for adding paths between nodes.
-                                if add_path_button.is_pressed and node.rect.x >= MENU_WIDTH:
-                                    if FROM_NODE is None:
-                                        FROM_NODE = i
-                                    else:
-                                        if FROM_NODE != i:
-                                            path = Path(PATH_COLOR, nodes[int(FROM_NODE)], nodes[i])
-                                            paths.append(path)
-                                            nodes[int(FROM_NODE)].add_neighbor(nodes[i], path)
-                                            nodes[i].add_neighbor(nodes[int(FROM_NODE)], path)
-                                        FROM_NODE = None
-
-                                elif add_food_button.is_pressed and node.rect.x >= MENU_WIDTH:
-                                    if not node.is_colony:
-                                        node.has_food = not node.has_food
-
-                                # Otherwise, just select it for repositioning.
-                                else:
-                                    SELECTED = i
-                                selected_offset_x = node.rect.x - event.pos[EVENT_X]
-                                selected_offset_y = node.rect.y - event.pos[EVENT_Y]
-
-                # User releasing mouse button (1).
-                elif event.type == pygame.MOUSEBUTTONUP:
-                    if event.button == 1:
-                        SELECTED = None
-
-                # User moving the mouse on screen.
-                elif event.type == pygame.MOUSEMOTION:
-                    if SELECTED is not None:
-                        selected_node = nodes[int(SELECTED)]
-                        new_x = event.pos[EVENT_X] + selected_offset_x
-                        new_y = event.pos[EVENT_Y] + selected_offset_y
-                        selected_node.update(new_x, new_y)
-
-                        # Updating paths.
-                        for path in paths:
-                            if path.node1 is selected_node:
-                                path.start_pos = selected_node.rect.center
-                            if path.node2 is selected_node:
-                                path.end_pos = selected_node.rect.center
-
-        # Blitting objects onto surfaces.
-        screen.fill(SCREEN_COLOR)
-        screen.blit(menu, (0, 0))
+    simulation = Simulation(nodes, paths, NUM_ANTS, lazy_evaporation=True)
+    if checkpoint is not None and os.path.exists(checkpoint):
+        network.clear()
+        simulation = load_checkpoint(checkpoint, network)
+        run_button.is_pressed = simulation.is_running
+        ID = max(node.node_id for node in nodes) + 1 if nodes else 0
+    simulation_clock = SimulationClock()
+    # In threaded mode, the worker running the simulation and the renderer for the ants in its snapshots.
+    worker = None
+    ant_renderer = None
+
+    def control(command, *args):
+        """Calls a function that changes the simulation, on the worker thread if there is one.
+        """
+        if worker is not None:
+            worker.submit(command, *args)
+        else:
+            command(*args)
+
+    def shared_state():
+        """Returns the lock that keeps the worker away from the nodes, paths and graph, if there is a worker.
+        """
+        return worker.lock if worker is not None else contextlib.nullcontext()
+
+    def move_node(node, x, y):
+        """Moves a node together with the ends of its paths.
+        """
+        simulation.move_node(node, x, y)
+        for path in node.path_to_neighbor:
+            if path.node1 is node:
+                path.start_pos = node.rect.center
+            if path.node2 is node:
+                path.end_pos = node.rect.center
+
+    def remove_node(node, colony):
+        """Removes a node from the simulation after making another node the colony, if the node was the colony.
+        """
+        if colony is not None:
+            colony.is_colony = True
+        simulation.remove_node(node)
+
+    # Everything except the ants is drawn onto a cached static layer that is redrawn only when it changes.
+    renderer = LayeredRenderer(screen)
+    buttons = [add_path_button, add_food_button, run_button, clear_button]
+    last_button_state = None
+
+    def draw_static(surface):
+        """Draws the menu, paths and nodes onto the static layer.
+        """
+        surface.fill(SCREEN_COLOR)
         pygame.draw.rect(menu, MENU_COLOR, NODE_SPAWN)
 
         # Drawing any objects onto the screen. Should draw them from furthest back to closest.
         pygame.draw.rect(menu, TRASH_COLOR, trash)
         menu.blit(TRASH_TEXT, trash.topleft)
+        add_path_button.draw(menu)
+        add_food_button.draw(menu)
         if not run_button.is_pressed:
-            add_path_button.hovered()
-            add_path_button.draw(menu)
-            add_food_button.hovered()
-            add_food_button.draw(menu)
-            clear_button.hovered()
             clear_button.draw(menu)
-        run_button.hovered()
         run_button.draw(menu)
 
         # Blitting button information text.
@@ -226,81 +215,192 @@ def run():
         y_pos = run_button.rect.bottom + 5
         for i, line in enumerate(run_info):
             menu.blit(line, (run_button.rect.left, y_pos + (i * 16) + (5 * i)))
+        surface.blit(menu, (0, 0))
 
-        # Remove any nodes that collide with the trash can.
-        REMOVE_INDEX = trash.collidelist(nodes)
-        if REMOVE_INDEX != -1:
-            SELECTED = None
-            to_remove = nodes[REMOVE_INDEX]
-            nodes.remove(nodes[REMOVE_INDEX])
-
-            if len(nodes) > 0 and to_remove.is_colony:
-                nodes[0].is_colony = True
-
-            path_removal = []
-            for i, path in enumerate(paths):
-                if path.node1 is to_remove:
-                    path.node2.remove_neighbor(path.node1)
-                    path_removal.append(path)
-
-                if path.node2 is to_remove:
-                    path.node1.remove_neighbor(path.node2)
-                    path_removal.append(path)
-
-            for path in path_removal:
-                paths.remove(path)
-
-        # Making sure we never run out of nodes.
-        if len(nodes) <= 0:
-            nodes.append(
-                Node(ID, NODE_COLOR, pygame.Rect(NODE_LOCATION, NODE_LOCATION, NODE_RADIUS * 2, NODE_RADIUS * 2)))
-            nodes[0].is_colony = True
-            ID += 1
-
-        if NODE_SPAWN.collidelist(nodes) == -1:
-            nodes.append(
-                Node(ID, NODE_COLOR, pygame.Rect(NODE_LOCATION, NODE_LOCATION, NODE_RADIUS * 2, NODE_RADIUS * 2)))
-            ID += 1
-
-        # Drawing all paths between the nodes and performing pheromone evaporation.
-        should_evap = (phero_clock / 1000) > 1 and run_button.is_pressed
-        for path in paths:
-            path.draw(screen)
-            if should_evap:
-                path.phero_evaporation()
-            # print(path)
-
-        if should_evap:
-            should_evap = False
-            phero_clock = 0
-
-        # Drawing all of the nodes.
-        for node in nodes:
-            node.draw(screen)
-
-        # Running the actual ant colony optimization simulation.
-        if run_button.is_pressed and len(colony) <= 0:
-            COLONY_NODE = nodes[0]
-            NUM_ANTS *= len(COLONY_NODE.neighbors)
-            ant_size = COLONY_NODE.radius / 2
-            left_top = (COLONY_NODE.rect.centerx - ant_size / 2, COLONY_NODE.rect.centery - ant_size / 2)
-            for i in range(NUM_ANTS):
-                colony.append(Ant(pygame.Rect(left_top, (ant_size, ant_size)), COLONY_NODE))
-        elif not run_button.is_pressed and len(colony) > 0:
-            colony.clear()
+        with shared_state():
+            # Drawing all paths between the nodes.
+            profiler.count('paths_drawn', len(paths))
             for path in paths:
-                path.pheromone = 1
+                path.draw(surface)
+
+            # Drawing all of the nodes.
+            for node in nodes:
+                node.draw(surface)
+
+    def draw_dynamic(surface):
+        """Draws the ants, and the profiler overlay if it is shown, returning the rectangle they cover.
+        """
+        if worker is not None:
+            snapshot = worker.latest()
+            rect = ant_renderer.draw(surface, snapshot.ant_pos, snapshot.found_food)
+        else:
+            rect = simulation.draw_ants(surface)
+        if profiler.overlay:
+            overlay = profiler.draw_overlay(surface, INFO_FONT, (MENU_WIDTH + 10, 10))
+            if overlay is not None:
+                rect = overlay if rect is None else rect.union(overlay)
+        return rect
+
+    # Profiling can be switched on from the start by naming a file to export to, e.g. ACO_PROFILE=profile.csv.
+    if os.environ.get('ACO_PROFILE'):
+        profiler.export_to(os.environ['ACO_PROFILE'])
+        profiler.enabled = True
 
-        for ant in colony:
-            if ant.at_node:
-                ant.choose()
-            else:
-                ant.move()
-            ant.draw(screen)
+    clock = pygame.time.Clock()
+    while RUNNING:
+        elapsed = clock.tick(60)
+
+        # In threaded mode the worker waits while the window handles events and edits the network.
+        with shared_state():
+            # Handling to game events.
+            with profiler.phase('events'):
+                for event in pygame.event.get():
+                    # Check to see if button is pressed.
+                    add_path_button.pressed(event)
+                    add_food_button.pressed(event)
+                    run_button.pressed(event)
+                    clear_button.pressed(event)
+
+                    # User exiting the game.
+                    if event.type == pygame.QUIT:
+                        RUNNING = False
+                    # User presses a key down.
+                    elif event.type == pygame.KEYDOWN:
+                        if event.key == pygame.K_ESCAPE:
+                            RUNNING = False
+                        # Speeding up, slowing down or fast-forwarding the simulation.
+                        elif event.key in (pygame.K_EQUALS, pygame.K_PLUS, pygame.K_KP_PLUS):
+                            control(simulation_clock.faster)
+                        elif event.key in (pygame.K_MINUS, pygame.K_KP_MINUS):
+                            control(simulation_clock.slower)
+                        elif event.key == pygame.K_f:
+                            control(setattr, simulation_clock, 'as_fast_as_possible',
+                                    not simulation_clock.as_fast_as_possible)
+                        elif event.key == pygame.K_s and checkpoint is not None:
+                            control(save_checkpoint, simulation, checkpoint)
+                        # Showing or hiding the profiler overlay.
+                        elif event.key == pygame.K_p:
+                            profiler.overlay = not profiler.overlay
+                            profiler.enabled = profiler.overlay or profiler.export_path is not None
+                            renderer.invalidate()
+
+                    # User pressing mouse button (1) down. The graph can be edited while the simulation runs, which
+                    # keeps the pheromone learned so far.
+                    if event.type in (pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP) or SELECTED is not None:
+                        renderer.invalidate()
+
+                    if event.type == pygame.MOUSEBUTTONDOWN:
+                        if event.button == 1:
+                            if clear_button.is_pressed and not run_button.is_pressed:
+                                network.clear()
+                                clear_button.is_pressed = False
+                            for node in node_index.query_point(event.pos[EVENT_X], event.pos[EVENT_Y], NODE_RADIUS):
+                                # Below is selection for adding paths between nodes.
+                                if add_path_button.is_pressed and node.rect.x >= MENU_WIDTH:
+                                    if FROM_NODE is None:
+                                        FROM_NODE = node
+                                    else:
+                                        path = network.connect(FROM_NODE, node, PATH_COLOR)
+                                        if path is not None:
+                                            control(simulation.add_path, path)
+                                        FROM_NODE = None
+
+                                elif add_food_button.is_pressed and node.rect.x >= MENU_WIDTH:
+                                    if not node.is_colony:
+                                        control(simulation.set_food, node, not node.has_food)
+
+                                # Otherwise, just select it for repositioning.
+                                else:
+                                    SELECTED = node
+                                selected_offset_x = node.rect.x - event.pos[EVENT_X]
+                                selected_offset_y = node.rect.y - event.pos[EVENT_Y]
+
+                    # User releasing mouse button (1).
+                    elif event.type == pygame.MOUSEBUTTONUP:
+                        if event.button == 1:
+                            SELECTED = None
+
+                    # User moving the mouse on screen.
+                    elif event.type == pygame.MOUSEMOTION:
+                        if SELECTED is not None:
+                            new_x = event.pos[EVENT_X] + selected_offset_x
+                            new_y = event.pos[EVENT_Y] + selected_offset_y
+                            control(move_node, SELECTED, new_x, new_y)
+
+            # Updating the hover state of the buttons. The static layer only has to be redrawn when a button changes.
+            add_path_button.hovered()
+            add_food_button.hovered()
+            if not run_button.is_pressed:
+                clear_button.hovered()
+            run_button.hovered()
+            button_state = [(button.is_hovered, button.is_pressed) for button in buttons]
+            if button_state != last_button_state:
+                last_button_state = button_state
+                renderer.invalidate()
+
+            # Remove any nodes that collide with the trash can.
+            with profiler.phase('editing'):
+                in_trash = node_index.query_rect(trash)
+                if in_trash:
+                    SELECTED = None
+                    to_remove = in_trash[0]
+                    network.remove_node(to_remove)
+                    if FROM_NODE is to_remove:
+                        FROM_NODE = None
+
+                    # The oldest remaining node takes over as the colony.
+                    colony = None
+                    if len(nodes) > 0 and to_remove.is_colony:
+                        colony = min(nodes, key=lambda node: node.node_id)
+                    control(remove_node, to_remove, colony)
+                    renderer.invalidate()
+
+                # Making sure we never run out of nodes.
+                if len(nodes) <= 0:
+                    network.add_node(
+                        Node(ID, NODE_COLOR,
+                             pygame.Rect(NODE_LOCATION, NODE_LOCATION, NODE_RADIUS * 2, NODE_RADIUS * 2)))
+                    nodes[0].is_colony = True
+                    control(simulation.add_node, nodes[0])
+                    ID += 1
+                    renderer.invalidate()
+
+                if not node_index.query_rect(NODE_SPAWN):
+                    node = network.add_node(
+                        Node(ID, NODE_COLOR,
+                             pygame.Rect(NODE_LOCATION, NODE_LOCATION, NODE_RADIUS * 2, NODE_RADIUS * 2)))
+                    control(simulation.add_node, node)
+                    ID += 1
+                    renderer.invalidate()
+
+        # Running the actual ant colony optimization simulation.
+        with profiler.phase('simulation'):
+            if run_button.is_pressed and not simulation.is_running:
+                simulation.start()
+            elif not run_button.is_pressed and simulation.is_running:
+                if worker is not None:
+                    worker.stop()
+                    worker = None
+                simulation.stop()
+            # A simulation resumed from a checkpoint is already running when the window opens.
+            if threaded and simulation.is_running and worker is None:
+                ant_renderer = AntRenderer(simulation.ants()[2])
+                worker = SimulationWorker(simulation, simulation_clock)
+                worker.start()
+
+            if worker is None:
+                simulation_clock.tick(simulation, elapsed)
+            elif worker.error is not None:
+                raise worker.error
 
         # Update the display to show all the drawn objects on screen.
-        pygame.display.flip()
+        renderer.render(draw_static, draw_dynamic)
+        profiler.frame()
 
     # Exiting the application.
+    if worker is not None:
+        worker.stop()
+    if checkpoint is not None:
+        save_checkpoint(simulation, checkpoint)
     pygame.quit()
     sys.exit()
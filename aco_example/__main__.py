@@ -0,0 +1,87 @@
+"""Runs the simulation headless on a graph file for every combination of the given parameters and streams one result
+per run to a CSV or JSON lines file as the runs finish.
+
+    python -m aco_example roads.txt --alpha 1 2 --beta 0 2 --evap 0.05 0.1 --ants 10 50 --seeds 3 --output runs.csv
+"""
+import argparse
+import csv
+import json
+import sys
+
+from aco_example.sweep import grid, sweep
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m aco_example',
+                                     description='Sweep the parameters of the ant colony simulation on a graph file.')
+    parser.add_argument('graph', help='edge list, adjacency CSV, TSPLIB or .npy distance matrix file')
+    parser.add_argument('--format', choices=['edges', 'adjacency', 'tsplib', 'npy'], help='format of the graph file')
+    parser.add_argument('--neighbors', type=int, help='nearest neighbors to connect each TSPLIB or .npy node to')
+    parser.add_argument('--colony', type=int, default=0, help='id of the colony node')
+    parser.add_argument('--food', type=int, nargs='+', help='ids of the food nodes, by default the farthest node')
+    parser.add_argument('--alpha', type=float, nargs='+', default=[1.0])
+    parser.add_argument('--beta', type=float, nargs='+', default=[0.0])
+    parser.add_argument('--evap', type=float, nargs='+', default=[0.1], help='fraction of pheromone evaporated')
+    parser.add_argument('--q', type=float, nargs='+', default=[1.0], help='pheromone laid per unit of 1 / length')
+    parser.add_argument('--ants', type=int, nargs='+', default=[50], help='ants per path leaving the colony node')
+    parser.add_argument('--seeds', type=int, default=1, help='number of seeds to repeat every combination with')
+    parser.add_argument('--ticks', type=int, default=3600, help='largest number of ticks per run')
+    parser.add_argument('--patience', type=int, help='stop a run after this many ticks without a shorter path')
+    parser.add_argument('--entropy', type=float, help='only stop early once the route pheromone entropy is below this')
+    parser.add_argument('--dominant', type=float, help='only stop early once this share of ants is on the route')
+    parser.add_argument('--flow', action='store_true', help='count the ants per path instead of simulating each one')
+    parser.add_argument('--candidates', type=int, help='number of shortest paths ants choose among at each node')
+    parser.add_argument('--processes', type=int, help='number of worker processes, by default one per CPU')
+    parser.add_argument('--output', help='CSV (.csv) or JSON lines file to append the results to, by default stdout')
+    args = parser.parse_args(argv)
+
+    cases = grid(args.alpha, args.beta, args.evap, args.q, args.ants, range(args.seeds))
+    load_options = {} if args.neighbors is None else {'neighbors': args.neighbors}
+    results = sweep(args.graph, cases, args.processes, args.format, args.colony, args.food, load_options,
+                    ticks=args.ticks, patience=args.patience, entropy_below=args.entropy, dominant_above=args.dominant,
+                    flow=args.flow, candidates=args.candidates)
+
+    output = open(args.output, 'a', newline='') if args.output else sys.stdout
+    try:
+        if args.output and args.output.endswith('.csv'):
+            writer = None
+            for result in results:
+                if writer is None:
+                    writer = csv.DictWriter(output, fieldnames=_csv_fields(args.output, list(result)))
+                    if output.tell() == 0:
+                        writer.writeheader()
+                writer.writerow(result)
+                output.flush()
+        else:
+            for result in results:
+                output.write(json.dumps(result) + '\n')
+                output.flush()
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+
+def _csv_fields(path, fields):
+    """Returns the columns to append results to a CSV file with. A file written by an earlier sweep keeps its columns,
+    and is written again with the new ones added if the results have more.
+
+    Args:
+        path: The CSV file.
+        fields: The names of the values in a result.
+    """
+    with open(path, newline='') as file:
+        header = next(csv.reader(file), [])
+        new = [field for field in fields if field not in header]
+        if not header or not new:
+            return header or fields
+        rows = list(csv.DictReader(file, fieldnames=header))
+    header += new
+    with open(path, 'w', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=header)
+        writer.writeheader()
+        writer.writerows(rows)
+    return header
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,22 +1,35 @@
-import pygame
+import math
 import random as rand
+from array import array
+
+from aco_example.profiling import profiler
 
 
 class Ant:
-    """Represents an ant that will move along the nodal pathways.
+    """Represents an ant that will move along the nodal pathways. An ant remembers its path as the node ids it
+    visited, and when it comes back to a node already on its path the loop it just walked is cut out, so its memory
+    never holds more than one entry per node and it carries food home along a loop-free route.
     """
 
-    def __init__(self, rect, colony_node):
+    __slots__ = ('rng', 'rect', 'radius', 'colony_node', 'path', 'path_length', 'curr_node', 'prev_node', 'color',
+                 'at_node', 'found_food', 'px_amount', 'initial_exploration', '_on_path', '_lengths')
+
+    def __init__(self, rect, colony_node, rng=None):
         """Initialization method for an ant object.
 
         Args:
             colony_node: The node from which all ants start at and will return to.
+            rng: The random.Random instance used for this ant's decisions. Defaults to the random module itself.
         """
+        self.rng = rng if rng is not None else rand
         self.rect = rect
         self.radius = self.rect.width // 2
         self.colony_node = colony_node
-        self.path = []
-        self.path.append(self.colony_node)
+        # The ids of the nodes on this ant's path, the length walked up to each of them and the position of every
+        # node on the path, which doubles as the set of visited nodes.
+        self.path = array('q', [colony_node.node_id])
+        self._lengths = array('d', [0.0])
+        self._on_path = {colony_node.node_id: 0}
         self.path_length = 0
         self.curr_node = self.colony_node
         self.prev_node = None
@@ -32,6 +45,7 @@ class Ant:
         Args:
             surface: The pygame surface to draw this ant on.
         """
+        import pygame
         pygame.draw.circle(surface, self.color, self.rect.center, self.radius)
         if self.found_food:
             pygame.draw.circle(surface, (0, 255, 0), self.rect.center, self.radius // 2)
@@ -40,20 +54,26 @@ class Ant:
         """Removes all nodes along this ant's path.
         """
         self.path_length = 0
-        self.path.clear()
+        # The buffers are emptied in place rather than replaced.
+        del self.path[:]
+        self.path.append(self.colony_node.node_id)
+        del self._lengths[1:]
+        self._on_path = {self.colony_node.node_id: 0}
         self.prev_node = None
-        self.path.append(self.colony_node)
         self.initial_exploration = False
 
     def choose(self):
         """The ants will make a choice as to which node they will attempt to travel to.
         """
+        profiler.count('ant_decisions')
         if self.curr_node is self.colony_node and self.found_food:
             self.found_food = False
             self.clear_path()
         elif self.found_food:
             self.prev_node = self.curr_node
-            self.curr_node = self.path.pop()
+            node_id = self.path.pop()
+            if node_id != self.curr_node.node_id:
+                self.curr_node = self.curr_node.neighbor(node_id)
             self.update_pheromone(self.prev_node, self.curr_node)
             self.at_node = False
         else:
@@ -78,7 +98,7 @@ class Ant:
 
             if total != 0:
                 prob = 0.0
-                choice = rand.random()
+                choice = self.rng.random()
                 for i, neighbor in enumerate(neighbors):
                     if neighbor is not self.prev_node or len(neighbors) == 1:
                         if not self.initial_exploration:
@@ -90,25 +110,99 @@ class Ant:
                         if choice <= prob:
                             self.prev_node = self.curr_node
                             self.curr_node = neighbor
-                            self.path.append(self.curr_node)
-                            self.path_length += pathways[i].get_dist(80)
+                            self.visit(neighbor, pathways[i].get_dist(80))
                             self.at_node = False
                             break
 
+    def visit(self, node, distance):
+        """Adds a node to this ant's path, or cuts the loop out of the path if the node is already on it.
+
+        Args:
+            node: The node the ant is traveling to.
+            distance: The length of the path to that node.
+        """
+        position = self._on_path.get(node.node_id)
+        if position is None:
+            self._on_path[node.node_id] = len(self.path)
+            self.path.append(node.node_id)
+            self.path_length += distance
+            self._lengths.append(self.path_length)
+            return
+
+        for node_id in self.path[position + 1:]:
+            del self._on_path[node_id]
+        del self.path[position + 1:]
+        del self._lengths[position + 1:]
+        self.path_length = self._lengths[position]
+
+    def repair(self, nodes):
+        """Cuts this ant's path back to the part that still exists after the nodes or paths were edited, and sends
+        the ant back to the last node of that part. Lengths are measured again in case nodes were moved.
+
+        Args:
+            nodes: Dict mapping the id of every node that still exists to the node.
+        """
+        colony = next((node for node in nodes.values() if node.is_colony), None)
+        if self.colony_node.node_id not in nodes or (colony is not None and colony is not self.colony_node):
+            # The colony moved, so there is nothing left of the path to keep.
+            if colony is None:
+                return
+            self.colony_node = colony
+            self.found_food = False
+            exploring = self.initial_exploration
+            self.clear_path()
+            self.initial_exploration = exploring
+            self.curr_node = colony
+            self.at_node = False
+            return
+
+        keep = len(self.path)
+        for i, node_id in enumerate(self.path):
+            node = nodes.get(node_id)
+            if node is None or (i > 0 and node.neighbor(self.path[i - 1]) is None):
+                keep = i
+                break
+        broken = keep < len(self.path) or self.curr_node.node_id not in nodes
+        if not broken and self.found_food and len(self.path) > 0 and self.path[-1] != self.curr_node.node_id:
+            # An ant carrying food must still be able to walk from its node to the rest of its path.
+            broken = self.curr_node.neighbor(self.path[-1]) is None
+        if self.prev_node is not None and self.prev_node.node_id not in nodes:
+            self.prev_node = None
+
+        if not self.found_food:
+            for node_id in self.path[keep:]:
+                del self._on_path[node_id]
+            del self._lengths[keep:]
+            for i in range(1, keep):
+                path = nodes[self.path[i - 1]].path_to(nodes[self.path[i]])
+                self._lengths[i] = self._lengths[i - 1] + path.get_dist(80)
+            self.path_length = self._lengths[keep - 1]
+        del self.path[keep:]
+        if not broken:
+            return
+
+        if len(self.path) == 0:
+            # An ant carrying food that already left the last node of its path only has the colony left.
+            self.curr_node = self.colony_node
+            self.prev_node = None
+        else:
+            self.curr_node = nodes[self.path[-1]]
+            searching = not self.found_food and len(self.path) > 1
+            self.prev_node = nodes[self.path[-2]] if searching else None
+        self.at_node = False
+
     def move(self):
         """Ants move from their previous node to the node they have selected (self.curr_node).
         """
-        ant = pygame.math.Vector2(self.rect.center)
-        node = pygame.math.Vector2(self.curr_node.rect.center)
-        dist = ant.distance_to(node)
+        x, y = self.rect.center
+        dx = self.curr_node.rect.centerx - x
+        dy = self.curr_node.rect.centery - y
+        dist = math.hypot(dx, dy)
 
         if dist <= 5:
             self.at_node = True
         else:
-            pathing = node - ant
-            pathing /= dist
-            pathing *= self.px_amount
-            self.rect.center += pathing
+            self.rect.center = (x + dx / dist * self.px_amount, y + dy / dist * self.px_amount)
 
     def update_pheromone(self, from_node, to_node):
         """Updates the pheromone trail on the path from one node to another.
@@ -118,11 +212,7 @@ class Ant:
             to_node: The node we are traveling to.
         """
         q = 1
-        path = None
-        for i, node in enumerate(from_node.neighbors):
-            if node is to_node:
-                path = from_node.path_to_neighbor[i]
-                break
-
+        path = from_node.path_to(to_node)
         if path is not None:
+            profiler.count('pheromone_deposits')
             path.pheromone += (q / self.path_length)
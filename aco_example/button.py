@@ -1,5 +1,8 @@
 import pygame
 
+from aco_example.fonts import fonts
+from aco_example.text_cache import text_cache
+
 
 class Button:
     """Class represents a GUI button and has a pressed down state and a normal state.
@@ -21,8 +24,8 @@ class Button:
         self.normal_text_color = (255, 255, 255)
         self.pressed_text_color = (0, 0, 0)
 
-        self.font = pygame.font.SysFont('Arial', size)
-        self.words = self.font.render(self.text, True, self.normal_text_color)
+        self.font = fonts.get('Arial', size)
+        self.words = text_cache.render(self.font, self.text, self.normal_text_color)
 
         self.normal_color = normal_color
         self.pressed_color = pressed_color
@@ -38,10 +41,10 @@ class Button:
         """
         if self.is_hovered or self.is_pressed:
             color = self.pressed_color
-            self.words = self.font.render(self.text, True, self.pressed_text_color)
+            self.words = text_cache.render(self.font, self.text, self.pressed_text_color)
         else:
             color = self.normal_color
-            self.words = self.font.render(self.text, True, self.normal_text_color)
+            self.words = text_cache.render(self.font, self.text, self.normal_text_color)
         pygame.draw.rect(surface, color, self.rect)
         # Make sure to blit the text on AFTER we draw the rectangle.
         surface.blit(self.words, self.rect.topleft)
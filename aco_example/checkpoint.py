@@ -0,0 +1,313 @@
+"""Saves the full state of a simulation to a checkpoint and restores it, so a long run can be stopped, moved to another
+machine and resumed. A checkpoint is a directory holding one .npy file per array, e.g. the pheromone of every edge or
+the path stack of every ant, and a small state.json with the settings, the counters and the state of the random
+generators. Since every array is a plain .npy file, np.load(..., mmap_mode='r') opens even a very large state without
+reading it, and read_checkpoint does so for all of them at once.
+"""
+import json
+import os
+import random
+import shutil
+
+import numpy as np
+
+from aco_example.ant import Ant
+from aco_example.colony import Colony
+from aco_example.flow import EDGE_CALENDARS, NODE_CALENDARS, FlowColony
+from aco_example.graph import Graph
+from aco_example.network import Network
+from aco_example.node import Node
+from aco_example.path import Path
+from aco_example.simulation import Simulation
+
+# Bumped whenever the layout of a checkpoint changes in a way older code cannot read.
+VERSION = 1
+
+# The per-ant arrays of a Colony and the per-edge and per-node arrays of a FlowColony that make up their state.
+COLONY_ARRAYS = ('pos', 'curr', 'prev', 'at_node', 'found_food', 'initial_exploration', 'path_length', 'stack',
+                 'stack_edge', 'depth', 'pending_edge', 'visited')
+FLOW_ARRAYS = EDGE_CALENDARS + NODE_CALENDARS + ('flux',)
+
+# The Simulation settings stored in a checkpoint, which are also the ones load_checkpoint can override.
+SETTINGS = ('num_ants', 'dt', 'evap_period', 'vectorized', 'seed', 'lazy_evaporation', 'candidates', 'flow')
+
+
+def save_checkpoint(simulation, path):
+    """Saves the state of a simulation. The checkpoint is written next to the old one and then moved in its place,
+    so a crash while saving never leaves a half-written checkpoint behind.
+
+    Args:
+        simulation: The simulation to save. It does not have to be running.
+        path: The directory to write the checkpoint to.
+    """
+    graph, nodes, paths = _layout(simulation)
+    state = {
+        'version': VERSION,
+        'settings': {name: getattr(simulation, name) for name in SETTINGS},
+        'ticks': simulation.ticks,
+        'evaporations': simulation.evaporations,
+        'is_running': simulation.is_running,
+        'best_length': simulation.best_length,
+        'best_tick': simulation.best_tick,
+        'evap_rate': graph.evap_rate if graph is not None else 0.1,
+        'decay': graph.decay if graph is not None else 1.0,
+        'rng': _generator_state(simulation.rng),
+        'colony': None,
+    }
+    arrays = {}
+    if graph is not None:
+        arrays.update({'graph.pos': graph.pos, 'graph.is_colony': graph.is_colony, 'graph.has_food': graph.has_food,
+                       'graph.edge_nodes': graph.edge_nodes, 'graph.pheromone': graph.pheromone,
+                       'graph.phero_evap': graph.phero_evap})
+        if graph._explicit_length:
+            arrays['graph.length'] = graph.length
+        if graph.decay != 1.0:
+            # The pheromone as stored before the lazy decay factor, so a resumed run rounds exactly the same way.
+            arrays['graph.stored_pheromone'] = graph._pheromone[:graph.num_edges]
+    if nodes is not None:
+        arrays.update({
+            'nodes.node_id': np.array([node.node_id for node in nodes], dtype=np.int64),
+            'nodes.rect': np.array([tuple(node.rect) for node in nodes], dtype=np.int64).reshape(-1, 4),
+            'nodes.color': np.array([node.color for node in nodes], dtype=np.uint8).reshape(-1, 3),
+            'paths.color': np.array([path.color for path in paths], dtype=np.uint8).reshape(-1, 3),
+        })
+        # Ants pick among a node's neighbors in the order of its list, which editing shuffles.
+        edge_of = {id(path): edge for edge, path in enumerate(paths)}
+        order = [[edge_of[id(path)] for path in node.path_to_neighbor] for node in nodes]
+        arrays['nodes.neighbor_offsets'] = np.cumsum([0] + [len(edges) for edges in order])
+        arrays['nodes.neighbor_edges'] = np.array([edge for edges in order for edge in edges], dtype=np.intp)
+    if simulation.best_path is not None:
+        arrays['best_path'] = np.asarray(simulation.best_path, dtype=np.intp)
+
+    colony = simulation.colony
+    if isinstance(colony, Colony):
+        state['colony'] = {'kind': 'colony', 'num_ants': len(colony), 'radius': colony.radius, 'alpha': colony.alpha,
+                           'beta': colony.beta, 'q': colony.q, 'px_amount': colony.px_amount,
+                           'best_length': colony.best_length, 'rng': _generator_state(colony.rng)}
+        arrays.update({'colony.' + name: getattr(colony, name) for name in COLONY_ARRAYS})
+    elif isinstance(colony, FlowColony):
+        state['colony'] = {'kind': 'flow', 'num_ants': colony.num_ants, 'radius': colony.radius,
+                           'alpha': colony.alpha, 'beta': colony.beta, 'q': colony.q, 'px_amount': colony.px_amount,
+                           'stochastic': colony.stochastic, 'flux_decay': colony.flux_decay, 'ticks': colony.ticks,
+                           'best_length': colony.best_length, 'rng': _generator_state(colony.rng)}
+        arrays.update({'colony.' + name: getattr(colony, name) for name in FLOW_ARRAYS})
+    elif len(colony) > 0:
+        index = {node.node_id: i for i, node in enumerate(nodes)}
+        state['colony'] = {'kind': 'ants', 'num_ants': len(colony), 'rng': list(colony[0].rng.getstate()[1]),
+                           'gauss': colony[0].rng.getstate()[2]}
+        arrays.update(_ant_arrays(colony, index))
+
+    temporary = path.rstrip(os.sep) + '.tmp'
+    shutil.rmtree(temporary, ignore_errors=True)
+    os.makedirs(temporary)
+    for name, array in arrays.items():
+        np.save(os.path.join(temporary, name + '.npy'), np.ascontiguousarray(array))
+    with open(os.path.join(temporary, 'state.json'), 'w') as file:
+        # NumPy scalars, e.g. parameters taken from an array, are written as plain numbers.
+        json.dump(state, file, indent=1, default=lambda value: value.item())
+
+    old = path.rstrip(os.sep) + '.old'
+    if os.path.exists(path):
+        shutil.rmtree(old, ignore_errors=True)
+        os.rename(path, old)
+    os.rename(temporary, path)
+    shutil.rmtree(old, ignore_errors=True)
+
+
+def read_checkpoint(path, mmap_mode='r'):
+    """Opens a checkpoint without restoring it, e.g. to inspect a large one.
+
+    Args:
+        path: The checkpoint directory.
+        mmap_mode: Passed on to np.load. The default maps every array read-only without reading it.
+
+    Returns:
+        (state, arrays) where state is the dict from state.json and arrays maps every array's name, such as
+        'graph.pheromone' or 'colony.pos', to the array.
+    """
+    with open(os.path.join(path, 'state.json')) as file:
+        state = json.load(file)
+    if state['version'] > VERSION:
+        raise ValueError(f'Checkpoint version {state["version"]} is newer than the supported version {VERSION}.')
+    arrays = {name[:-len('.npy')]: np.load(os.path.join(path, name), mmap_mode=mmap_mode)
+              for name in os.listdir(path) if name.endswith('.npy')}
+    return state, arrays
+
+
+def load_checkpoint(path, network=None, mmap_mode=None, **kwargs):
+    """Restores a simulation from a checkpoint. A simulation that was running carries on exactly where it stopped,
+    including its random decisions.
+
+    Args:
+        path: The checkpoint directory.
+        network: The Network to add the restored nodes and paths to, if the simulation ran on Node and Path objects.
+            Defaults to a new one.
+        mmap_mode: Passed on to np.load for the ants' arrays. 'c' maps them copy-on-write, so even a huge colony
+            resumes without reading all of it first. The mapped files must then be kept until the simulation is done.
+        **kwargs: Passed on to the Simulation initializer, e.g. convergence, overriding the saved settings.
+
+    Returns:
+        The restored simulation.
+    """
+    state, arrays = read_checkpoint(path, mmap_mode)
+    settings = dict(state['settings'], rng=_generator(state['rng']))
+    settings.update(kwargs)
+
+    graph = None
+    if 'graph.pos' in arrays:
+        graph = Graph.from_arrays(arrays['graph.pos'], arrays['graph.edge_nodes'], arrays['graph.pheromone'],
+                                  state['evap_rate'], settings['lazy_evaporation'], arrays.get('graph.length'))
+        graph.phero_evap[:] = arrays['graph.phero_evap']
+        graph.is_colony[:] = arrays['graph.is_colony']
+        graph.has_food[:] = arrays['graph.has_food']
+        if 'graph.stored_pheromone' in arrays:
+            graph._pheromone[:graph.num_edges] = arrays['graph.stored_pheromone']
+            graph.decay = state['decay']
+
+    if 'nodes.node_id' in arrays:
+        network = network if network is not None else Network()
+        nodes, paths = _restore_objects(graph, arrays, network)
+        simulation = Simulation(network.nodes, network.paths, **settings)
+        if state['is_running']:
+            simulation._node_at = nodes
+            simulation._path_at = paths
+            simulation._node_by_id = {node.node_id: node for node in nodes}
+    else:
+        simulation = Simulation.from_graph(graph, **settings) if graph is not None else Simulation([], [], **settings)
+    simulation.graph = graph
+    simulation.ticks = state['ticks']
+    simulation.evaporations = state['evaporations']
+    simulation.is_running = state['is_running']
+    simulation.best_length = state['best_length']
+    simulation.best_tick = state['best_tick']
+    simulation.best_path = np.array(arrays['best_path']) if 'best_path' in arrays else None
+
+    colony = state['colony']
+    if colony is None:
+        return simulation
+    if colony['kind'] == 'ants':
+        simulation.colony = _restore_ants(simulation, colony, arrays)
+        return simulation
+
+    rng = _generator(colony['rng'])
+    if colony['kind'] == 'flow':
+        restored = FlowColony(graph, colony['num_ants'], colony['radius'], rng, colony['stochastic'],
+                              colony['px_amount'], colony['flux_decay'])
+        restored.ticks = colony['ticks']
+        names = FLOW_ARRAYS
+    else:
+        restored = Colony(graph, 0, colony['radius'], rng, settings['candidates'])
+        restored.px_amount = colony['px_amount']
+        names = COLONY_ARRAYS
+    for name in names:
+        setattr(restored, name, arrays['colony.' + name])
+    restored.alpha, restored.beta, restored.q = colony['alpha'], colony['beta'], colony['q']
+    restored.best_length = colony['best_length']
+    restored.best_path = simulation.best_path
+    simulation.colony = restored
+    return simulation
+
+
+def _layout(simulation):
+    """Returns the graph to save and the Node and Path objects in the order of its ids, or None if there are none.
+    A simulation that is not running may have been edited since it last ran, so its graph is built again.
+    """
+    if simulation.is_running and simulation._node_by_id is not None:
+        return simulation.graph, simulation._node_at, simulation._path_at
+    if len(simulation.nodes) > 0:
+        return Graph.from_objects(simulation.nodes, simulation.paths), simulation.nodes, simulation.paths
+    return simulation.graph, None, None
+
+
+def _ant_arrays(ants, index):
+    """Returns the state of a list of Ant objects as arrays. The ragged paths are stored back to back with the
+    offset of every ant's first entry.
+    """
+    paths = [[index[node_id] for node_id in ant.path] for ant in ants]
+    lengths = [list(ant._lengths) for ant in ants]
+    return {
+        'ants.rect': np.array([tuple(ant.rect) for ant in ants], dtype=np.int64),
+        'ants.curr': np.array([index[ant.curr_node.node_id] for ant in ants], dtype=np.intp),
+        'ants.prev': np.array([index[ant.prev_node.node_id] if ant.prev_node is not None else -1 for ant in ants],
+                              dtype=np.intp),
+        'ants.colony': np.array([index[ant.colony_node.node_id] for ant in ants], dtype=np.intp),
+        'ants.flags': np.array([(ant.at_node, ant.found_food, ant.initial_exploration) for ant in ants], dtype=bool),
+        'ants.path_length': np.array([ant.path_length for ant in ants], dtype=float),
+        'ants.path_offsets': np.cumsum([0] + [len(path) for path in paths]),
+        'ants.path': np.array([node for path in paths for node in path], dtype=np.intp),
+        'ants.length_offsets': np.cumsum([0] + [len(length) for length in lengths]),
+        'ants.lengths': np.array([length for path in lengths for length in path], dtype=float),
+    }
+
+
+def _restore_objects(graph, arrays, network):
+    """Creates the Node and Path objects of a checkpoint as views over its graph and adds them to a network.
+
+    Returns:
+        (nodes, paths) in the order of their ids in the graph.
+    """
+    import pygame
+    nodes = []
+    paths = []
+    for i, (node_id, rect, color) in enumerate(zip(arrays['nodes.node_id'].tolist(), arrays['nodes.rect'].tolist(),
+                                                   arrays['nodes.color'].tolist())):
+        node = Node(node_id, tuple(color), pygame.Rect(rect))
+        node.bind(graph, i)
+        nodes.append(network.add_node(node))
+    for edge, ((u, v), color) in enumerate(zip(graph.edge_nodes.tolist(), arrays['paths.color'].tolist())):
+        path = Path(tuple(color), nodes[u], nodes[v])
+        path.phero_evap = float(graph.phero_evap[edge])
+        path.bind(graph, edge)
+        paths.append(network.add_path(path))
+
+    offsets, edges = arrays['nodes.neighbor_offsets'].tolist(), arrays['nodes.neighbor_edges'].tolist()
+    for i, node in enumerate(nodes):
+        ordered = [paths[edge] for edge in edges[offsets[i]:offsets[i + 1]]]
+        for path in ordered:
+            node.remove_neighbor(path.node2 if path.node1 is node else path.node1)
+        for path in ordered:
+            node.add_neighbor(path.node2 if path.node1 is node else path.node1, path)
+    return nodes, paths
+
+
+def _restore_ants(simulation, colony, arrays):
+    """Creates the Ant objects of a checkpoint, all sharing one random.Random set to the saved state.
+    """
+    import pygame
+    rng = random.Random()
+    rng.setstate((3, tuple(colony['rng']), colony['gauss']))
+    nodes = simulation._node_at
+    path_offsets, length_offsets = arrays['ants.path_offsets'], arrays['ants.length_offsets']
+    ants = []
+    for i in range(colony['num_ants']):
+        at_node, found_food, initial_exploration = arrays['ants.flags'][i].tolist()
+        ant = Ant(pygame.Rect(arrays['ants.rect'][i].tolist()), nodes[int(arrays['ants.colony'][i])], rng)
+        path = [nodes[node].node_id for node in arrays['ants.path'][path_offsets[i]:path_offsets[i + 1]].tolist()]
+        del ant.path[:]
+        ant.path.extend(path)
+        del ant._lengths[:]
+        ant._lengths.extend(arrays['ants.lengths'][length_offsets[i]:length_offsets[i + 1]].tolist())
+        ant._on_path = {} if found_food else {node_id: position for position, node_id in enumerate(path)}
+        ant.path_length = float(arrays['ants.path_length'][i])
+        ant.curr_node = nodes[int(arrays['ants.curr'][i])]
+        prev = int(arrays['ants.prev'][i])
+        ant.prev_node = nodes[prev] if prev >= 0 else None
+        ant.at_node, ant.found_food, ant.initial_exploration = at_node, found_food, initial_exploration
+        ants.append(ant)
+    return ants
+
+
+def _generator_state(rng):
+    """Returns the state of a NumPy random generator as plain data, or None if there is no generator.
+    """
+    return rng.bit_generator.state if rng is not None else None
+
+
+def _generator(state):
+    """Creates a NumPy random generator from the state returned by _generator_state.
+    """
+    if state is None:
+        return None
+    bit_generator = getattr(np.random, state['bit_generator'])()
+    bit_generator.state = state
+    return np.random.Generator(bit_generator)
@@ -0,0 +1,82 @@
+import time
+
+
+class SimulationClock:
+    """Represents a fixed-timestep scheduler for a simulation. Every simulation tick covers the same amount of
+    simulation time, so the outcome of a run does not depend on the frame rate; rendering a frame only decides how
+    many ticks are run before it.
+    """
+
+    def __init__(self, speed=1.0, max_frame_ms=250, budget_ms=15):
+        """Initialization method for a simulation clock.
+
+        Args:
+            speed: How many seconds of simulation time pass per second of wall time.
+            max_frame_ms: Frames longer than this are treated as this long so a stall does not trigger a burst of
+                catch-up ticks.
+            budget_ms: The wall time per frame spent on ticks when running as fast as possible.
+        """
+        self.speed = speed
+        self.max_frame_ms = max_frame_ms
+        self.budget_ms = budget_ms
+        self.as_fast_as_possible = False
+        self.accumulator = 0.0
+
+    def tick(self, simulation, elapsed_ms):
+        """Runs the simulation ticks that are due for a frame.
+
+        Args:
+            simulation: The simulation to advance.
+            elapsed_ms: The wall time since the previous frame, in milliseconds.
+
+        Returns:
+            The number of ticks that were run.
+        """
+        if not simulation.is_running:
+            self.accumulator = 0.0
+            return 0
+
+        # A converged simulation is not worth the whole frame budget any more.
+        if self.as_fast_as_possible and not simulation.converged:
+            return self._run_for(simulation, self.budget_ms / 1000)
+
+        self.accumulator += min(elapsed_ms, self.max_frame_ms) / 1000 * self.speed
+        steps = int(self.accumulator / simulation.dt)
+        self.accumulator -= steps * simulation.dt
+        simulation.step(steps)
+        return steps
+
+    def _run_for(self, simulation, budget):
+        """Runs batches of ticks until a wall-time budget is used up. Batches double in size, but never beyond the
+        number of ticks that the time per tick so far says are left in the budget.
+
+        Args:
+            simulation: The simulation to advance.
+            budget: The wall time to spend, in seconds.
+
+        Returns:
+            The number of ticks that were run.
+        """
+        steps = 0
+        batch = 1
+        start = time.perf_counter()
+        while simulation.is_running:
+            spent = time.perf_counter() - start
+            if steps > 0 and spent > 0:
+                batch = min(batch * 2, int((budget - spent) / spent * steps))
+            if spent >= budget or batch < 1:
+                break
+            simulation.step(batch)
+            steps += batch
+        self.accumulator = 0.0
+        return steps
+
+    def faster(self):
+        """Doubles the speed of the simulation.
+        """
+        self.speed *= 2
+
+    def slower(self):
+        """Halves the speed of the simulation.
+        """
+        self.speed /= 2
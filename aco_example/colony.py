@@ -0,0 +1,381 @@
+import numpy as np
+
+from aco_example.profiling import profiler
+
+
+class Colony:
+    """Represents a whole colony of ants stored as a structure of NumPy arrays. All moving ants are advanced with a
+    single vectorized update and all ants sitting at a node choose their next path with one batched roulette-wheel
+    draw, so the cost of a tick no longer grows with the number of Python objects.
+
+    Every ant keeps a bitset of the nodes on its path. When an ant comes back to one of them, the loop it just walked
+    is cut out of its path, so paths never hold more entries than there are nodes and food is carried home along a
+    loop-free route.
+    """
+
+    def __init__(self, graph, num_ants, radius, rng=None, candidates=None):
+        """Initialization method for a colony.
+
+        Args:
+            graph: The graph the ants walk on. All ants start at and return to its colony node.
+            num_ants: The number of ants in this colony.
+            radius: The radius the ants are drawn with.
+            rng: The NumPy random generator used for the ants' decisions.
+            candidates: The number of shortest paths leaving a node that ants choose among, or None to consider
+                every path. Ants fall back to every path when none of the candidates can be taken.
+        """
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.graph = graph
+        self.radius = radius
+        self.color = (0, 0, 0)
+        self.renderer = None
+        self.px_amount = 5
+        self.alpha = 1
+        # Ants only follow pheromone by default, since with real-time movement the distance heuristic makes the
+        # colony less consistent.
+        self.beta = 0
+        self.q = 1
+        self.candidates = candidates
+
+        self.colony_index = graph.colony
+        self.offsets, self.adj_node, self.adj_edge = graph.csr()
+        self.length = graph.length
+
+        self.pos = np.tile(graph.pos[self.colony_index], (num_ants, 1))
+        self.curr = np.full(num_ants, self.colony_index, dtype=np.intp)
+        self.prev = np.full(num_ants, -1, dtype=np.intp)
+        self.at_node = np.ones(num_ants, dtype=bool)
+        self.found_food = np.zeros(num_ants, dtype=bool)
+        self.initial_exploration = np.ones(num_ants, dtype=bool)
+        self.path_length = np.zeros(num_ants, dtype=float)
+        # The length and the node ids of the shortest path any ant has walked from the colony to food.
+        self.best_length = np.inf
+        self.best_path = None
+
+        # Each ant's path is a stack of the nodes it visited and the edges it used to reach them.
+        self.stack = np.full((num_ants, 16), self.colony_index, dtype=np.intp)
+        self.stack_edge = np.full((num_ants, 16), -1, dtype=np.intp)
+        self.depth = np.ones(num_ants, dtype=np.intp)
+        self.pending_edge = np.full(num_ants, -1, dtype=np.intp)
+        # Bit n % 8 of byte n // 8 in an ant's row is set while node n is on its path.
+        self.visited = np.zeros((num_ants, (graph.num_nodes + 7) // 8), dtype=np.uint8)
+        self._mark(np.arange(num_ants), self.curr, True)
+
+    def __len__(self):
+        return len(self.curr)
+
+    def step(self):
+        """Advances every ant by one tick. Ants away from a node move towards it, the rest make their next choice.
+        """
+        at_node = self.at_node.copy()
+        moving = np.flatnonzero(~at_node)
+        if moving.size > 0:
+            self.move(moving)
+        waiting = np.flatnonzero(at_node)
+        if waiting.size > 0:
+            self.choose(waiting)
+
+    def move(self, ants):
+        """Moves ants from their previous node towards the node they have selected.
+
+        Args:
+            ants: Indices of the ants to move.
+        """
+        delta = self.graph.pos[self.curr[ants]] - self.pos[ants]
+        dist = np.hypot(delta[:, 0], delta[:, 1])
+        arrived = dist <= 5
+        self.at_node[ants[arrived]] = True
+
+        going = ~arrived
+        self.pos[ants[going]] += delta[going] / dist[going, None] * self.px_amount
+
+    def choose(self, ants):
+        """The ants at a node decide where they will travel to next.
+
+        Args:
+            ants: Indices of the ants that are sitting at a node.
+        """
+        profiler.count('ant_decisions', ants.size)
+        found = self.found_food[ants]
+        at_colony = self.curr[ants] == self.colony_index
+        self._return_home(ants[found & at_colony])
+        self._walk_back(ants[found & ~at_colony])
+
+        searching = ants[~found]
+        on_food = self.graph.has_food[self.curr[searching]]
+        self.found_food[searching[on_food]] = True
+        self.pending_edge[searching[on_food]] = -1
+        self._forget_path(searching[on_food])
+        if on_food.any():
+            arrived = searching[on_food]
+            best = arrived[np.argmin(self.path_length[arrived])]
+            if self.path_length[best] < self.best_length:
+                self.best_length = float(self.path_length[best])
+                self.best_path = self.stack[best, :self.depth[best]].copy()
+        self._explore(searching[~on_food])
+
+    def _return_home(self, ants):
+        """Clears the path of ants that brought food back to the colony.
+        """
+        self.found_food[ants] = False
+        self.path_length[ants] = 0
+        self.prev[ants] = -1
+        self.stack[ants, 0] = self.colony_index
+        self.stack_edge[ants, 0] = -1
+        self.depth[ants] = 1
+        self.initial_exploration[ants] = False
+        self._mark(ants, self.curr[ants], True)
+
+    def _walk_back(self, ants):
+        """Pops the next node off the path of ants carrying food and lays pheromone on the path just walked.
+        """
+        self.depth[ants] -= 1
+        popped = self.stack[ants, self.depth[ants]]
+        edge = self.pending_edge[ants]
+        laid = edge >= 0
+        self.graph.deposit(edge[laid], self.q / self.path_length[ants[laid]])
+        self.pending_edge[ants] = self.stack_edge[ants, self.depth[ants]]
+
+        self.prev[ants] = self.curr[ants]
+        self.curr[ants] = popped
+        self.at_node[ants] = False
+
+    def _explore(self, ants):
+        """Picks the next path for every searching ant, first among its node's candidates if there are candidate
+        lists and then among all of its neighbors.
+        """
+        curr = self.curr[ants]
+        ants = ants[self.offsets[curr + 1] > self.offsets[curr]]
+        if self.candidates is not None:
+            ants = self._draw(ants, *self.graph.candidates(self.candidates))
+        self._draw(ants, self.offsets, self.adj_node, self.adj_edge)
+
+    def _draw(self, ants, offsets, adj_node, adj_edge):
+        """Sends ants along a path picked with one roulette-wheel draw over the neighbor lists of their nodes.
+
+        Args:
+            ants: Indices of the ants to move. Each must have at least one neighbor in the lists.
+            offsets: The offsets of the neighbor lists, laid out like the result of Graph.csr.
+            adj_node: The neighbors in the lists.
+            adj_edge: The edges to those neighbors.
+
+        Returns:
+            The ants that could not take any path in the lists.
+        """
+        if ants.size == 0:
+            return ants
+        curr = self.curr[ants]
+        start = offsets[curr]
+        seg_start, seg_end, owner, slot = expand_segments(start, offsets[curr + 1] - start)
+        neighbor = adj_node[slot]
+        edge = adj_edge[slot]
+
+        weight = np.where(self.initial_exploration[ants][owner], 1.0, self.graph.pheromone_of(edge) ** self.alpha)
+        if self.beta != 0:
+            weight *= self.graph.heuristic(self.beta)[edge]
+        # Ants do not turn back unless it is their only option.
+        degree = self.offsets[curr + 1] - self.offsets[curr]
+        weight[(neighbor == self.prev[ants][owner]) & (degree[owner] > 1)] = 0
+
+        pick, total = roulette(weight, seg_start, seg_end, self.rng)
+        chosen = total > 0
+        self._push(ants[chosen], neighbor[pick[chosen]], edge[pick[chosen]])
+        return ants[~chosen]
+
+    def _push(self, ants, nodes, edges):
+        """Sends ants along the given paths and records the nodes on their paths. Ants heading to a node already on
+        their path drop the loop back to it instead.
+        """
+        self.prev[ants] = self.curr[ants]
+        self.curr[ants] = nodes
+        self.at_node[ants] = False
+        revisit = self._on_path(ants, nodes)
+        if revisit.any():
+            self._cut_loops(ants[revisit], nodes[revisit])
+            ants, nodes, edges = ants[~revisit], nodes[~revisit], edges[~revisit]
+
+        if ants.size > 0 and self.depth[ants].max() >= self.stack.shape[1]:
+            grow = self.stack.shape[1]
+            self.stack = np.pad(self.stack, ((0, 0), (0, grow)))
+            self.stack_edge = np.pad(self.stack_edge, ((0, 0), (0, grow)), constant_values=-1)
+
+        self.stack[ants, self.depth[ants]] = nodes
+        self.stack_edge[ants, self.depth[ants]] = edges
+        self.depth[ants] += 1
+        self.path_length[ants] += self.length[edges]
+        # Every ant appears once here, so plain indexing can set the bits.
+        self.visited[ants, nodes >> 3] |= np.left_shift(1, nodes & 7).astype(np.uint8)
+
+    def _cut_loops(self, ants, nodes):
+        """Shortens the paths of ants back to the point where they first visited the given nodes.
+        """
+        depth = self.depth[ants]
+        columns = np.arange(depth.max())
+        window = self.stack[ants, :columns.size]
+        on_path = columns < depth[:, None]
+        position = ((window == nodes[:, None]) & on_path).argmax(axis=1)
+
+        dropped = on_path & (columns > position[:, None])
+        rows, cols = np.nonzero(dropped)
+        self._mark(ants[rows], window[rows, cols], False)
+
+        kept = (columns >= 1) & (columns <= position[:, None])
+        walked = self.length[np.maximum(self.stack_edge[ants, :columns.size], 0)]
+        self.path_length[ants] = np.where(kept, walked, 0.0).sum(axis=1)
+        self.depth[ants] = position + 1
+
+    def _forget_path(self, ants):
+        """Clears the visited bits of every node on the paths of some ants.
+        """
+        if ants.size == 0:
+            return
+        depth = self.depth[ants]
+        rows, cols = np.nonzero(np.arange(depth.max()) < depth[:, None])
+        self._mark(ants[rows], self.stack[ants[rows], cols], False)
+
+    def remap(self, node_map=None, edge_map=None):
+        """Carries the ants over to their graph after it was edited while they were running. Paths that lost a node
+        or an edge are cut back to the part that still exists and their ants walk back to its last node, so they
+        keep what they had walked instead of starting over. Only ants whose colony node is gone are sent home.
+
+        Args:
+            node_map: Array mapping every old node id to its new id, or -1 for removed nodes. None if no node
+                was removed.
+            edge_map: Array mapping every old edge id to its new id, or -1 for removed edges. None if no edge
+                was removed.
+        """
+        graph = self.graph
+        self.offsets, self.adj_node, self.adj_edge = graph.csr()
+        self.length = graph.length
+        old_colony = node_map[self.colony_index] if node_map is not None else self.colony_index
+        self.colony_index = graph.colony
+        if node_map is not None:
+            self.curr, self.prev, self.stack = (_apply(node_map, ids) for ids in (self.curr, self.prev, self.stack))
+        if edge_map is not None:
+            self.stack_edge, self.pending_edge = _apply(edge_map, self.stack_edge), _apply(edge_map, self.pending_edge)
+        if self.best_path is not None and node_map is not None:
+            self.best_path = _apply(node_map, self.best_path)
+
+        # Every path is kept up to the first node that is gone or that lost its edge to the node before it.
+        columns = np.arange(self.stack.shape[1])
+        walked = columns < self.depth[:, None]
+        broken = walked & ((self.stack < 0) | ((columns >= 1) & (self.stack_edge < 0)))
+        keep = np.where(broken.any(axis=1), broken.argmax(axis=1), self.depth)
+        returning = self.found_food
+        # Ants carrying food that were heading to a removed node go on to the next node of their path.
+        lost = returning & (self.curr < 0) & (keep > 0)
+
+        if old_colony == self.colony_index:
+            ants = np.flatnonzero((keep < self.depth) | lost)
+            last = keep[ants] - 1
+            self.depth[ants] = keep[ants]
+            self.curr[ants] = self.stack[ants, last]
+            self.prev[ants] = np.where(returning[ants] | (last == 0), -1, self.stack[ants, np.maximum(last - 1, 0)])
+            self.at_node[ants] = False
+            self.pending_edge[ants] = -1
+        else:
+            # The colony moved or is gone, so every ant heads for the new one.
+            self.curr[:] = self.colony_index
+            self.prev[:] = -1
+            self.at_node[:] = False
+            self.found_food[:] = False
+            self.pending_edge[:] = -1
+            self.stack[:, 0] = self.colony_index
+            self.stack_edge[:, 0] = -1
+            self.depth[:] = 1
+
+        # Lengths may have changed too, so the paths of searching ants are measured again.
+        walked = (columns >= 1) & (columns < self.depth[:, None])
+        searching = ~self.found_food
+        if graph.num_edges > 0:
+            lengths = np.where(walked, self.length[np.maximum(self.stack_edge, 0)], 0.0).sum(axis=1)
+            self.path_length[searching] = lengths[searching]
+        else:
+            self.path_length[searching] = 0
+
+        self.visited = np.zeros((len(self), (graph.num_nodes + 7) // 8), dtype=np.uint8)
+        rows, cols = np.nonzero((columns < self.depth[:, None]) & searching[:, None])
+        self._mark(rows, self.stack[rows, cols], True)
+
+    def _on_path(self, ants, nodes):
+        """Returns whether each node is on the path of the matching ant.
+        """
+        return ((self.visited[ants, nodes >> 3] >> (nodes & 7)) & 1).astype(bool)
+
+    def _mark(self, ants, nodes, on_path):
+        """Sets or clears the visited bit of each node for the matching ant.
+        """
+        bits = np.left_shift(1, nodes & 7).astype(np.uint8)
+        if on_path:
+            np.bitwise_or.at(self.visited, (ants, nodes >> 3), bits)
+        else:
+            np.bitwise_and.at(self.visited, (ants, nodes >> 3), ~bits)
+
+    def draw(self, surface):
+        """Draws every ant in this colony on the specified surface.
+
+        Args:
+            surface: The pygame surface to draw the ants on.
+
+        Returns:
+            The pygame rectangle covering every ant, or None if there are no ants.
+        """
+        if self.renderer is None:
+            from aco_example.render import AntRenderer
+            self.renderer = AntRenderer(self.radius, self.color)
+        return self.renderer.draw(surface, self.pos, self.found_food)
+
+
+def expand_segments(start, degree):
+    """Flattens the neighbor lists of several nodes into one array of candidate slots.
+
+    Args:
+        start: The offset of each node's first neighbor in the CSR arrays.
+        degree: The number of neighbors of each node. Every node must have at least one.
+
+    Returns:
+        (seg_start, seg_end, owner, slot) where candidates seg_start[i]:seg_end[i] belong to node i, owner maps each
+        candidate back to its node and slot is each candidate's index into the CSR neighbor and edge arrays.
+    """
+    seg_end = np.cumsum(degree)
+    seg_start = seg_end - degree
+    owner = np.repeat(np.arange(len(degree)), degree)
+    slot = start[owner] + np.arange(seg_end[-1] if len(degree) > 0 else 0) - seg_start[owner]
+    return seg_start, seg_end, owner, slot
+
+
+def roulette(weight, seg_start, seg_end, rng):
+    """Draws one candidate from every segment with probability proportional to its weight, all in a single
+    cumulative sum and searchsorted. Every segment is scaled by its largest weight first, so a segment of tiny
+    weights after segments of large ones keeps its precision in the shared sum.
+
+    Args:
+        weight: The non-negative weight of every candidate.
+        seg_start: The index of the first candidate of each segment.
+        seg_end: One past the index of the last candidate of each segment. Segments follow each other without gaps.
+        rng: The NumPy random generator to draw with.
+
+    Returns:
+        (pick, total) holding the index of the chosen candidate and the total weight of each segment. Segments
+        with a total weight of zero have no meaningful pick.
+    """
+    size = seg_end - seg_start
+    filled = size > 0
+    scale = np.zeros(len(seg_start))
+    if filled.any():
+        scale[filled] = np.maximum.reduceat(weight, seg_start[filled])
+    cumulative = np.cumsum(weight / np.repeat(np.where(scale > 0, scale, 1.0), size))
+    base = np.where(seg_start > 0, cumulative[seg_start - 1], 0.0)
+    total = np.where(filled, cumulative[seg_end - 1] - base, 0.0)
+    # Drawing from (0, 1] means the draw can never land on a zero-weight candidate at the start of a segment.
+    choice = base + (1.0 - rng.random(len(seg_start))) * total
+    pick = np.minimum(np.searchsorted(cumulative, choice, side='left'), seg_end - 1)
+    return pick, total * scale
+
+
+def _apply(id_map, ids):
+    """Maps an array of ids through an array of new ids, keeping -1 for ids that are unset.
+    """
+    if len(id_map) == 0:
+        return np.full_like(ids, -1)
+    return np.where(ids >= 0, id_map[np.maximum(ids, 0)], -1)
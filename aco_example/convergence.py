@@ -0,0 +1,143 @@
+import numpy as np
+
+
+class ConvergenceMonitor:
+    """Represents a watch on how settled a running simulation is. Every interval ticks it follows the strongest
+    pheromone from the colony to food, which gives the dominant route, and measures the pheromone entropy of the
+    nodes on that route and the share of ants walking it. Together with the number of ticks since the simulation
+    last found a shorter path, these decide when the simulation has converged. The entropy at a route node leaves out
+    the edge back to the previous node, the way an ant walking the route sees it, so a fully settled route scores 0.
+
+    A simulation with a monitor stops by itself once it converges, unless the monitor is told not to stop it. It
+    then keeps running, but SimulationClock no longer runs it as fast as possible.
+    """
+
+    def __init__(self, patience=1800, entropy_below=None, dominant_above=None, interval=60, stop=True):
+        """Initialization method for a convergence monitor.
+
+        Args:
+            patience: The number of ticks without a shorter path after which the simulation may have converged, or
+                None to only go by the other measurements. Without any of the three it never converges.
+            entropy_below: If given, the average pheromone entropy of the nodes on the dominant route must also be
+                below this value, between 0 and 1.
+            dominant_above: If given, the share of ants on the dominant route must also be above this value.
+            interval: The number of ticks between measurements.
+            stop: Whether the simulation stops running once it has converged.
+        """
+        self.patience = patience
+        self.entropy_below = entropy_below
+        self.dominant_above = dominant_above
+        self.interval = interval
+        self.stop = stop
+        self.reset()
+
+    def reset(self):
+        """Forgets every measurement, e.g. when the simulation starts again.
+        """
+        self.route = None
+        self.entropy = 1.0
+        self.dominant_share = 0.0
+        self.ticks_since_improvement = 0
+        self.converged = False
+        self.converged_at = None
+
+    def update(self, simulation):
+        """Measures a simulation and decides whether it has converged.
+
+        Args:
+            simulation: The running simulation.
+
+        Returns:
+            Whether the simulation has converged.
+        """
+        graph = simulation.graph
+        best_tick = simulation.best_tick if simulation.best_tick is not None else 0
+        self.ticks_since_improvement = simulation.ticks - best_tick
+        self.route = dominant_route(graph)
+        if self.route is None:
+            self.entropy = 1.0
+            self.dominant_share = 0.0
+        else:
+            self.entropy = route_entropy(graph, self.route)
+            on_route = np.zeros(graph.num_nodes, dtype=bool)
+            on_route[self.route] = True
+            self.dominant_share = simulation.share_on_route(on_route)
+
+        checks = []
+        if self.patience is not None:
+            checks.append(self.ticks_since_improvement >= self.patience)
+        if self.entropy_below is not None:
+            checks.append(self.entropy < self.entropy_below)
+        if self.dominant_above is not None:
+            checks.append(self.dominant_share > self.dominant_above)
+        converged = simulation.best_tick is not None and len(checks) > 0 and all(checks)
+        if converged and not self.converged:
+            self.converged_at = simulation.ticks
+        self.converged = converged
+        return converged
+
+    def metrics(self):
+        """Returns the latest measurements as a dict.
+        """
+        return {
+            'entropy': self.entropy,
+            'dominant_share': self.dominant_share,
+            'ticks_since_improvement': self.ticks_since_improvement,
+            'converged': self.converged,
+            'converged_at': self.converged_at,
+        }
+
+
+def route_entropy(graph, route):
+    """Returns how undecided an ant walking a route is on average, as the entropy of its chance of taking each edge
+    other than the one back, divided by the largest possible value.
+
+    Args:
+        graph: The graph the route is on.
+        route: The node ids along the route.
+    """
+    offsets, neighbors, edges = graph.csr()
+    entropies = []
+    # The food node at the end of the route has no choice left to make.
+    for i, node in enumerate(route[:-1]):
+        start, end = offsets[node], offsets[node + 1]
+        ahead = neighbors[start:end] != (route[i - 1] if i > 0 else -1)
+        if ahead.sum() < 2:
+            continue
+        pheromone = graph.pheromone_of(edges[start:end][ahead])
+        chance = pheromone[pheromone > 0] / pheromone.sum()
+        entropies.append(float(-(chance * np.log(chance)).sum() / np.log(ahead.sum())))
+    return float(np.mean(entropies)) if entropies else 0.0
+
+
+def dominant_route(graph):
+    """Follows the edge with the most pheromone from the colony node until it reaches food, never visiting a node
+    twice.
+
+    Args:
+        graph: The graph to follow the pheromone on.
+
+    Returns:
+        The list of node ids on the route, or None if it runs into a dead end before reaching food.
+    """
+    if graph.num_nodes == 0:
+        return None
+    offsets, neighbors, edges = graph.csr()
+    has_food = graph.has_food
+    node = graph.colony
+    route = [node]
+    visited = {node}
+    while not has_food[node]:
+        start, end = offsets[node], offsets[node + 1]
+        pheromone = graph.pheromone_of(edges[start:end])
+        best = None
+        for i in np.argsort(-pheromone, kind='stable'):
+            if int(neighbors[start + i]) not in visited:
+                best = int(neighbors[start + i])
+                break
+        if best is None:
+            return None
+        node = best
+        route.append(node)
+        visited.add(node)
+    return route
@@ -0,0 +1,428 @@
+import numpy as np
+
+from aco_example.colony import expand_segments
+from aco_example.profiling import profiler
+
+
+class FlowColony:
+    """Represents a colony as numbers of ants instead of individual ants, so that its cost depends on the size of
+    the graph rather than on the number of ants. Ants on their way along an edge are counted per direction and per
+    tick left until they arrive, and all ants arriving at a node over the same edge are routed together with one
+    multinomial draw, using the same weights as an individual ant in Colony.
+
+    Searching ants remember the total length they walked. Once they reach food they turn back along the edge they
+    came in over, each group laying q / length for the length of its own route. From there they head back to the
+    colony along the edges searching ants came in over, in proportion to how many did, never moving farther from the
+    colony. Groups mix at every node and loops are not cut out of the lengths they lay pheromone for, so this is a
+    mean-field approximation of Colony rather than an exact one. On a choice between two routes it settles like
+    Colony, but on graphs with many routes of similar length its pheromone differs from Colony's more than two sets
+    of Colony seeds differ from each other. best_length is the shortest average length of a group's way back.
+    """
+
+    def __init__(self, graph, num_ants, radius, rng=None, stochastic=True, px_amount=5, flux_decay=0.01):
+        """Initialization method for a flow colony.
+
+        Args:
+            graph: The graph the ants walk on. All ants start at and return to its colony node.
+            num_ants: The number of ants in this colony. This can be millions.
+            radius: The radius the groups of ants are drawn with.
+            rng: The NumPy random generator used for routing.
+            stochastic: Whether routing draws whole ants at random. Otherwise every edge gets its expected share,
+                including fractions of ants.
+            px_amount: The number of pixels an ant moves per tick, which sets how many ticks each edge takes.
+            flux_decay: The fraction of the remembered flow of searching ants forgotten every tick.
+        """
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.graph = graph
+        self.num_ants = num_ants
+        self.radius = radius
+        self.color = (0, 0, 0)
+        self.renderer = None
+        self.stochastic = stochastic
+        self.flux_decay = flux_decay
+        self.alpha = 1
+        self.beta = 0
+        self.q = 1
+        self.ticks = 0
+        self.best_length = np.inf
+        # No single ant's path is known, see dominant_route for the route the pheromone points along.
+        self.best_path = None
+
+        self.px_amount = px_amount
+        self._measure()
+
+        # Row (tick % horizon) holds the ants arriving at the head of each directed edge on that tick.
+        for name in EDGE_CALENDARS:
+            setattr(self, name, np.zeros((self.horizon, len(self.tail))))
+        # Ants leaving a node without having arrived over an edge: searching ants setting off from the colony and
+        # ants setting off home from food.
+        for name in NODE_CALENDARS:
+            setattr(self, name, np.zeros((self.horizon, graph.num_nodes)))
+        # How many searching ants recently walked each directed edge.
+        self.flux = np.zeros(len(self.tail))
+
+    def _measure(self):
+        """Reads the layout of the graph: its directed edges, how many ticks each takes and how far every node is
+        from the colony.
+        """
+        graph = self.graph
+        self.colony_index = graph.colony
+        self.offsets, self.adj_node, self.adj_edge = graph.csr()
+        self.length = graph.length
+        degree = np.diff(self.offsets)
+
+        # Directed edge 2 * e runs from edge_nodes[e, 0] to edge_nodes[e, 1] and 2 * e + 1 runs the other way.
+        self.tail = graph.edge_nodes.ravel().copy()
+        self.head = graph.edge_nodes[:, ::-1].ravel().copy()
+        owner = np.repeat(np.arange(graph.num_nodes), degree)
+        self.adj_out = 2 * self.adj_edge + (graph.edge_nodes[self.adj_edge, 0] != owner)
+        delta = graph.pos[self.head] - graph.pos[self.tail]
+        pixels = np.hypot(delta[:, 0], delta[:, 1])
+        # Like an individual ant: one tick to choose, one per px_amount pixels and one to notice it arrived.
+        self.travel = np.maximum(np.ceil((pixels - self.px_amount) / self.px_amount), 0).astype(np.intp) + 2
+        # Room for ants turning back at food, who wait TURN_TICKS before walking an edge.
+        self.horizon = (int(self.travel.max()) if self.travel.size > 0 else 0) + TURN_TICKS + 1
+        self.hops = _hops_from(self.colony_index, self.offsets, self.adj_node)
+
+    def remap(self, node_map=None, edge_map=None):
+        """Carries the ants over to their graph after it was edited while they were running. Ants on edges that
+        still exist keep going, arriving no later than the edge now takes. Ants on removed edges turn back to the
+        node they came from and set off again from there, and ants waiting at a removed node move to the colony.
+
+        Args:
+            node_map: Array mapping every old node id to its new id, or -1 for removed nodes. None if no node
+                was removed.
+            edge_map: Array mapping every old edge id to its new id, or -1 for removed edges. None if no edge
+                was removed.
+        """
+        old_tail = self.tail
+        old_horizon = self.horizon
+        num_nodes = self.restarting.shape[1]
+        node_map = node_map if node_map is not None else np.arange(num_nodes)
+        edge_map = edge_map if edge_map is not None else np.arange(len(old_tail) // 2)
+        directed = np.arange(len(old_tail))
+        kept = edge_map[directed // 2] >= 0
+        directed_map = np.where(kept, 2 * edge_map[directed // 2] + directed % 2, -1)
+        self._measure()
+
+        # Ants waiting at a removed node, or turning back to one, start searching again from the colony.
+        calendars = {name: getattr(self, name) for name in EDGE_CALENDARS + NODE_CALENDARS}
+        for name in EDGE_CALENDARS:
+            setattr(self, name, np.zeros((self.horizon, len(self.tail))))
+        for name in NODE_CALENDARS:
+            setattr(self, name, np.zeros((self.horizon, self.graph.num_nodes)))
+        soon = (self.ticks + 1) % self.horizon
+        for name in EDGE_CALENDARS:
+            rows, edges = np.nonzero(calendars[name])
+            values = calendars[name][rows, edges]
+            moved = directed_map[edges]
+            on = moved >= 0
+            left = np.minimum((rows[on] - self.ticks) % old_horizon, self.travel[moved[on]])
+            np.add.at(getattr(self, name), ((self.ticks + left) % self.horizon, moved[on]), values[on])
+            if name in TURNING_BACK:
+                back = node_map[old_tail[edges[~on]]]
+                np.add.at(getattr(self, TURNING_BACK[name]), (soon, back[back >= 0]), values[~on][back >= 0])
+                if name in COUNTS:
+                    self.restarting[soon, self.colony_index] += values[~on][back < 0].sum()
+        for name in NODE_CALENDARS:
+            rows, nodes = np.nonzero(calendars[name])
+            values = calendars[name][rows, nodes]
+            moved = node_map[nodes]
+            on = moved >= 0
+            left = np.minimum((rows[on] - self.ticks) % old_horizon, self.horizon - 1)
+            np.add.at(getattr(self, name), ((self.ticks + left) % self.horizon, moved[on]), values[on])
+            if name in COUNTS:
+                self.restarting[soon, self.colony_index] += values[~on].sum()
+
+        flux = np.zeros(len(self.tail))
+        flux[directed_map[kept]] = self.flux[kept]
+        self.flux = flux
+
+    def __len__(self):
+        return self.num_ants
+
+    def step(self):
+        """Advances every ant by one tick.
+        """
+        self.ticks += 1
+        slot = self.ticks % self.horizon
+        exploring = _take(self.exploring, slot)
+        searching = _take(self.searching, slot)
+        walked = _take(self.walked, slot)
+        returning = _take(self.returning, slot)
+        inverse_length = _take(self.inverse_length, slot)
+        walked_back = _take(self.walked_back, slot)
+        restarting = _take(self.restarting, slot)
+        setting_off = _take(self.setting_off, slot)
+        setting_off_inverse = _take(self.setting_off_inverse, slot)
+
+        arrived = exploring + searching
+        self.flux *= 1 - self.flux_decay
+        self.flux += arrived
+
+        # Searching ants that found food set off home after the same three ticks an individual ant takes.
+        edges = np.flatnonzero(arrived)
+        nodes = self.head[edges]
+        food = self.graph.has_food[nodes]
+        found = edges[food]
+        if found.size > 0:
+            self._turn_back(found, arrived[found], walked[found])
+        edges, nodes = edges[~food], nodes[~food]
+
+        # Returning ants that reached the colony start searching again on the next tick.
+        back = np.flatnonzero(returning)
+        home = self.head[back] == self.colony_index
+        if home.any():
+            self.best_length = min(self.best_length, float((walked_back[back[home]] / returning[back[home]]).min()))
+        self.restarting[(self.ticks + 1) % self.horizon, self.colony_index] += returning[back[home]].sum()
+        back = back[~home]
+
+        if self.ticks == 1:
+            # Every ant starts at the colony, exploring.
+            self._route_searching(np.array([self.colony_index]), np.array([-1]), np.array([float(self.num_ants)]),
+                                  np.zeros(1), np.zeros(1))
+        starting = np.flatnonzero(restarting)
+        self._route_searching(np.concatenate((nodes, starting)),
+                              np.concatenate((self.tail[edges], np.full(starting.size, -1))),
+                              np.concatenate((exploring[edges], np.zeros(starting.size))),
+                              np.concatenate((searching[edges], restarting[starting])),
+                              np.concatenate((walked[edges], np.zeros(starting.size))))
+        leaving = np.flatnonzero(setting_off)
+        self._route_returning(np.concatenate((self.head[back], leaving)),
+                              np.concatenate((self.tail[back], np.full(leaving.size, -1))),
+                              np.concatenate((returning[back], setting_off[leaving])),
+                              np.concatenate((inverse_length[back], setting_off_inverse[leaving])),
+                              np.concatenate((walked_back[back], np.zeros(leaving.size))))
+
+    def _route_searching(self, nodes, prev, exploring, searching, walked):
+        """Sends groups of searching ants at nodes along the edges leaving those nodes.
+
+        Args:
+            nodes: The node each group is at.
+            prev: The node each group came from, or -1 if it did not arrive over an edge.
+            exploring: The number of ants in each group that are still on their first trip.
+            searching: The number of ants in each group that have brought food home before.
+            walked: The total length walked by the ants of each group.
+        """
+        start = self.offsets[nodes]
+        degree = self.offsets[nodes + 1] - start
+        keep = degree > 0
+        # Ants at a node without edges, which only happens once the graph is edited, wait there.
+        soon = (self.ticks + 1) % self.horizon
+        np.add.at(self.restarting[soon], nodes[~keep], exploring[~keep] + searching[~keep])
+        nodes, prev, start, degree = nodes[keep], prev[keep], start[keep], degree[keep]
+        exploring, searching, walked = exploring[keep], searching[keep], walked[keep]
+        if nodes.size == 0:
+            return
+
+        seg_start, seg_end, owner, slot = expand_segments(start, degree)
+        # Ants do not turn back unless it is their only option.
+        allowed = (self.adj_node[slot] != prev[owner]) | (degree[owner] == 1)
+        edge = self.adj_edge[slot]
+        weight = self.graph.pheromone_of(edge) ** self.alpha
+        if self.beta != 0:
+            weight *= self.graph.heuristic(self.beta)[edge]
+        profiler.count('ant_decisions', int(exploring.sum() + searching.sum()))
+
+        to_explore = self._split(exploring, np.where(allowed, 1.0, 0.0), seg_start, seg_end)
+        to_search = self._split(searching, np.where(allowed, weight, 0.0), seg_start, seg_end)
+        moved = to_explore + to_search
+        total = exploring + searching
+        mean = np.divide(walked, total, out=np.zeros_like(walked), where=total > 0)
+
+        used = moved > 0
+        directed = self.adj_out[slot][used]
+        arrive = (self.ticks + self.travel[directed]) % self.horizon
+        np.add.at(self.exploring, (arrive, directed), to_explore[used])
+        np.add.at(self.searching, (arrive, directed), to_search[used])
+        np.add.at(self.walked, (arrive, directed), moved[used] * (mean[owner][used] + self.length[edge[used]]))
+
+    def _turn_back(self, edges, count, walked):
+        """Sends groups of ants that just reached food back along the edge each group came in over, like an
+        individual ant retracing its path, so every group lays pheromone for the length of its own route.
+
+        Args:
+            edges: The directed edge each group arrived over.
+            count: The number of ants in each group.
+            walked: The total length walked by the ants of each group.
+        """
+        back = edges ^ 1
+        edge = back // 2
+        inverse = count * count / np.maximum(walked, 1e-12)
+        self.graph.deposit(edge, self.q * inverse)
+        # The ants first wait at the food the same ticks an individual ant takes to turn around.
+        arrive = (self.ticks + TURN_TICKS + self.travel[back]) % self.horizon
+        np.add.at(self.returning, (arrive, back), count)
+        np.add.at(self.inverse_length, (arrive, back), inverse)
+        np.add.at(self.walked_back, (arrive, back), count * self.length[edge])
+
+    def _route_returning(self, nodes, prev, returning, inverse_length, walked_back):
+        """Sends groups of ants carrying food one edge further on their way back to the colony, laying pheromone on
+        the way.
+
+        Args:
+            nodes: The node each group is at.
+            prev: The node each group came from, or -1 if it did not arrive over an edge.
+            returning: The number of ants in each group.
+            inverse_length: The sum of 1 / length over the ants of each group.
+            walked_back: The total length the ants of each group walked since they found food.
+        """
+        start = self.offsets[nodes]
+        degree = self.offsets[nodes + 1] - start
+        keep = degree > 0
+        soon = (self.ticks + 1) % self.horizon
+        np.add.at(self.setting_off[soon], nodes[~keep], returning[~keep])
+        np.add.at(self.setting_off_inverse[soon], nodes[~keep], inverse_length[~keep])
+        nodes, prev, start, degree = nodes[keep], prev[keep], start[keep], degree[keep]
+        returning, inverse_length, walked_back = returning[keep], inverse_length[keep], walked_back[keep]
+        if nodes.size == 0:
+            return
+
+        seg_start, seg_end, owner, slot = expand_segments(start, degree)
+        # Like an individual ant retracing its path, a group takes the edges searching ants came in over, never
+        # one leading farther from the colony and only back the way it came when there is nothing else.
+        neighbor = self.adj_node[slot]
+        allowed = (self.hops[neighbor] <= self.hops[nodes][owner]) & ((neighbor != prev[owner]) | (degree[owner] == 1))
+        weight = np.where(allowed, self.flux[self.adj_out[slot] ^ 1] + 1e-12, 0.0)
+        moved = self._split(returning, weight, seg_start, seg_end)
+        share = np.divide(inverse_length, returning, out=np.zeros_like(returning), where=returning > 0)
+        mean = np.divide(walked_back, returning, out=np.zeros_like(returning), where=returning > 0)
+
+        used = moved > 0
+        directed = self.adj_out[slot][used]
+        edge = self.adj_edge[slot][used]
+        inverse = moved[used] * share[owner][used]
+        self.graph.deposit(edge, self.q * inverse)
+        arrive = (self.ticks + self.travel[directed]) % self.horizon
+        np.add.at(self.returning, (arrive, directed), moved[used])
+        np.add.at(self.inverse_length, (arrive, directed), inverse)
+        np.add.at(self.walked_back, (arrive, directed), moved[used] * (mean[owner][used] + self.length[edge]))
+
+    def _split(self, counts, weight, seg_start, seg_end):
+        """Divides the ants of every group over its candidates in proportion to their weights.
+
+        Args:
+            counts: The number of ants in each group.
+            weight: The weight of every candidate. Groups whose candidates all weigh zero are spread evenly.
+            seg_start: The index of each group's first candidate.
+            seg_end: One past the index of each group's last candidate.
+
+        Returns:
+            The number of ants sent to every candidate.
+        """
+        owner = np.repeat(np.arange(len(seg_start)), seg_end - seg_start)
+        total = np.add.reduceat(weight, seg_start) if weight.size > 0 else np.zeros(0)
+        weight = np.where(total[owner] > 0, weight, 1.0)
+        total = np.add.reduceat(weight, seg_start) if weight.size > 0 else np.zeros(0)
+        if not self.stochastic:
+            return counts[owner] * weight / total[owner]
+
+        # A multinomial draw per group, as one binomial draw per candidate position across all groups at once.
+        moved = np.zeros(len(weight))
+        left = counts.astype(np.int64)
+        left_weight = total.copy()
+        length = seg_end - seg_start
+        for k in range(int(length.max()) if length.size > 0 else 0):
+            groups = np.flatnonzero((length > k) & (left > 0))
+            if groups.size == 0:
+                break
+            index = seg_start[groups] + k
+            last = length[groups] == k + 1
+            chance = np.clip(weight[index] / np.maximum(left_weight[groups], 1e-300), 0, 1)
+            drawn = np.where(last, left[groups], self.rng.binomial(left[groups], np.where(last, 1.0, chance)))
+            moved[index] = drawn
+            left[groups] -= drawn
+            left_weight[groups] -= weight[index]
+        return moved
+
+    def share_on_route(self, on_route):
+        """Returns the share of ants walking an edge between two nodes of a route.
+
+        Args:
+            on_route: Bool array marking the graph nodes on the route.
+        """
+        walking = (self.exploring + self.searching + self.returning).sum(axis=0)
+        both = on_route[self.tail] & on_route[self.head]
+        return float(walking[both].sum() / self.num_ants) if self.num_ants > 0 else 0.0
+
+    @property
+    def pos(self):
+        """The position of every group of ants: one per directed edge and arrival tick that holds any ants."""
+        return self.groups()[0]
+
+    @property
+    def found_food(self):
+        """Whether each group in pos is carrying food."""
+        return self.groups()[1]
+
+    def groups(self):
+        """Returns the positions of the groups of ants on the edges and whether each carries food.
+        """
+        pos = []
+        found = []
+        for calendars, carrying in (((self.exploring, self.searching), False), ((self.returning,), True)):
+            rows, edges = np.nonzero(sum(calendars))
+            left = (rows - self.ticks) % self.horizon
+            progress = np.clip(1 - left / self.travel[edges], 0, 1)[:, None]
+            start = self.graph.pos[self.tail[edges]]
+            pos.append(start + (self.graph.pos[self.head[edges]] - start) * progress)
+            found.append(np.full(len(edges), carrying))
+        return np.concatenate(pos).reshape(-1, 2), np.concatenate(found)
+
+    def draw(self, surface):
+        """Draws a dot for every group of ants on the specified surface.
+
+        Args:
+            surface: The pygame surface to draw the ants on.
+
+        Returns:
+            The pygame rectangle covering every group, or None if there are none.
+        """
+        if self.renderer is None:
+            from aco_example.render import AntRenderer
+            self.renderer = AntRenderer(self.radius, self.color)
+        pos, found_food = self.groups()
+        return self.renderer.draw(surface, pos, found_food)
+
+
+# The ticks an ant takes at food before it starts walking back.
+TURN_TICKS = 3
+
+# The calendars of ants on their way along a directed edge and of ants leaving a node without having arrived over an
+# edge, and where the ants of an edge calendar go when their edge is removed and they turn back.
+EDGE_CALENDARS = ('exploring', 'searching', 'walked', 'returning', 'inverse_length', 'walked_back')
+NODE_CALENDARS = ('restarting', 'setting_off', 'setting_off_inverse')
+TURNING_BACK = {'exploring': 'restarting', 'searching': 'restarting', 'returning': 'setting_off',
+                'inverse_length': 'setting_off_inverse'}
+# The calendars that count ants rather than sum up something about them.
+COUNTS = ('exploring', 'searching', 'returning', 'restarting', 'setting_off')
+
+
+def _take(calendar, slot):
+    """Returns a copy of one row of a calendar and clears that row.
+    """
+    row = calendar[slot].copy()
+    calendar[slot] = 0
+    return row
+
+
+def _hops_from(source, offsets, adj_node):
+    """Returns the number of edges on the shortest path from a node to every node, found with a breadth-first search.
+    Unreachable nodes get a number larger than any path.
+    """
+    hops = np.full(len(offsets) - 1, len(offsets), dtype=np.intp)
+    hops[source] = 0
+    frontier = np.array([source])
+    distance = 0
+    while frontier.size > 0:
+        distance += 1
+        start = offsets[frontier]
+        degree = offsets[frontier + 1] - start
+        frontier, degree, start = frontier[degree > 0], degree[degree > 0], start[degree > 0]
+        if frontier.size == 0:
+            break
+        neighbors = adj_node[expand_segments(start, degree)[3]]
+        neighbors = np.unique(neighbors[hops[neighbors] > distance])
+        hops[neighbors] = distance
+        frontier = neighbors
+    return hops
@@ -0,0 +1,53 @@
+from aco_example.profiling import profiler
+
+
+class FontRegistry:
+    """Represents the fonts of the whole process, keyed by (face, size). Looking up a system font scans the fonts
+    installed on the machine, so every face is only looked up once and every size of it only loaded once, however
+    many nodes, paths and buttons draw with it.
+    """
+
+    def __init__(self):
+        """Initialization method for an empty font registry.
+        """
+        self.lookups = 0
+        self._files = {}
+        self._fonts = {}
+
+    def get(self, face, size):
+        """Returns the font for a face and size, loading it the first time it is asked for.
+
+        Args:
+            face: The name of the system font, e.g. 'Arial'. Falls back to pygame's default font if it is not
+                installed.
+            size: The size of the font.
+        """
+        import pygame
+        if not pygame.font.get_init():
+            # Fonts loaded before pygame.font was last quit can no longer be used.
+            pygame.font.init()
+            self._fonts.clear()
+        font = self._fonts.get((face, size))
+        if font is not None:
+            return font
+
+        if face not in self._files:
+            self._files[face] = pygame.font.match_font(face)
+            self.lookups += 1
+            profiler.count('font_lookups')
+        font = pygame.font.Font(self._files[face], size)
+        self._fonts[(face, size)] = font
+        return font
+
+    def clear(self):
+        """Forgets every font.
+        """
+        self._files.clear()
+        self._fonts.clear()
+
+    def __len__(self):
+        return len(self._fonts)
+
+
+# The registry shared by every node, path, button and window.
+fonts = FontRegistry()
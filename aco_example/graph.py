@@ -0,0 +1,538 @@
+import numpy as np
+
+from aco_example.profiling import profiler
+
+
+class Graph:
+    """Represents the graph the ants walk on as flat arrays. Nodes and edges are referred to by integer ids, the
+    neighbors of every node are kept in compressed (CSR) offset and neighbor arrays and the pheromone of every edge
+    lives in a single array indexed by edge id.
+
+    With lazy evaporation, pheromone is stored divided by one global decay factor. Evaporating only shrinks that
+    factor, which makes it O(1) no matter how many edges there are, and reads and deposits apply it instead.
+
+    The length of every edge, the distance heuristic derived from it and each node's list of nearest neighbors are
+    computed once and kept. Moving a node with move_node only recomputes the edges connected to it.
+    """
+
+    # Stored pheromone is folded back into true values once the decay factor gets this small.
+    RENORMALIZE_BELOW = 1e-64
+
+    def __init__(self, node_capacity=16, edge_capacity=16, lazy_evaporation=False, evap_rate=0.1):
+        """Initialization method for an empty graph.
+
+        Args:
+            node_capacity: The number of nodes to allocate room for up front.
+            edge_capacity: The number of edges to allocate room for up front.
+            lazy_evaporation: Whether evaporation only updates a global decay factor. Every edge then evaporates at
+                evap_rate instead of its own rate.
+            evap_rate: The fraction of pheromone every edge loses per evaporation when evaporation is lazy.
+        """
+        self.lazy_evaporation = lazy_evaporation
+        self.evap_rate = evap_rate
+        self.decay = 1.0
+        self.num_nodes = 0
+        self.num_edges = 0
+        # Counts the changes to the nodes, edges and node positions, so copies of the layout know when they are stale.
+        self.revision = 0
+        self._pos = np.zeros((node_capacity, 2), dtype=float)
+        self._is_colony = np.zeros(node_capacity, dtype=bool)
+        self._has_food = np.zeros(node_capacity, dtype=bool)
+        self._edge_nodes = np.zeros((edge_capacity, 2), dtype=np.intp)
+        self._pheromone = np.zeros(edge_capacity, dtype=float)
+        self._phero_evap = np.zeros(edge_capacity, dtype=float)
+        # The length of every edge, computed on first use unless given explicitly, e.g. by a road graph file.
+        # Explicit lengths do not follow the node positions.
+        self._length = None
+        self._explicit_length = False
+        # (1 / length) ** beta of every edge, for each beta asked for, and the nearest-neighbor lists for each k.
+        self._heuristic = {}
+        self._candidates = {}
+        # A full matrix of distances between nodes, if one was loaded. It may be a read-only memory-mapped array.
+        self.distances = None
+        self._edge_ids = {}
+        self._csr = None
+        # The edges touching each node, as dicts used as ordered sets. Only built once the graph is edited.
+        self._incident = None
+
+    @classmethod
+    def from_objects(cls, nodes, paths, lazy_evaporation=False):
+        """Builds a graph from Node and Path objects and turns those objects into views over it.
+
+        Args:
+            nodes: The list of nodes. A node's id in the graph is its position in this list.
+            paths: The list of paths between the nodes. A path's id in the graph is its position in this list.
+            lazy_evaporation: Whether evaporation only updates a global decay factor. All paths must then share the
+                same evaporation rate.
+
+        Returns:
+            The new graph.
+        """
+        rates = {path.phero_evap for path in paths}
+        if lazy_evaporation and len(rates) > 1:
+            raise ValueError('Lazy evaporation needs every path to have the same evaporation rate.')
+        graph = cls(max(len(nodes), 1), max(len(paths), 1), lazy_evaporation, rates.pop() if rates else 0.1)
+        index = {}
+        for node in nodes:
+            index[node.node_id] = graph.add_node(node.rect.centerx, node.rect.centery, node.is_colony, node.has_food)
+        for path in paths:
+            graph.add_edge(index[path.node1.node_id], index[path.node2.node_id], path.pheromone, path.phero_evap)
+
+        for i, node in enumerate(nodes):
+            node.bind(graph, i)
+        for i, path in enumerate(paths):
+            path.bind(graph, i)
+        return graph
+
+    @classmethod
+    def from_arrays(cls, pos, edge_nodes, pheromone=1.0, phero_evap=0.1, lazy_evaporation=False, length=None):
+        """Builds a graph in bulk from node positions and edge endpoints.
+
+        Args:
+            pos: Array of shape (num_nodes, 2) holding the center of every node.
+            edge_nodes: Array of shape (num_edges, 2) holding the two node ids each edge connects.
+            pheromone: The initial pheromone level of every edge.
+            phero_evap: The fraction of pheromone every edge loses when it evaporates.
+            lazy_evaporation: Whether evaporation only updates a global decay factor.
+            length: The length of every edge, or None to use the distance between the node positions.
+
+        Returns:
+            The new graph. No node is marked as the colony or as holding food yet.
+        """
+        pos = np.asarray(pos, dtype=float).reshape(-1, 2)
+        edge_nodes = np.asarray(edge_nodes, dtype=np.intp).reshape(-1, 2)
+        graph = cls(max(len(pos), 1), max(len(edge_nodes), 1), lazy_evaporation, phero_evap)
+        graph.num_nodes = len(pos)
+        graph.num_edges = len(edge_nodes)
+        graph._pos[:graph.num_nodes] = pos
+        graph._edge_nodes[:graph.num_edges] = edge_nodes
+        graph._pheromone[:graph.num_edges] = pheromone
+        graph._phero_evap[:graph.num_edges] = phero_evap
+        if length is not None:
+            graph._length = np.zeros(len(graph._edge_nodes), dtype=float)
+            graph._length[:graph.num_edges] = length
+            graph._explicit_length = True
+
+        # Built back to front so that, like add_edge, the first of several parallel edges is the one looked up.
+        u, v = edge_nodes[::-1, 0].tolist(), edge_nodes[::-1, 1].tolist()
+        ids = range(graph.num_edges - 1, -1, -1)
+        graph._edge_ids = dict(zip(zip(v, u), ids))
+        graph._edge_ids.update(zip(zip(u, v), ids))
+        return graph
+
+    @property
+    def pos(self):
+        """The (x, y) position of every node."""
+        return self._pos[:self.num_nodes]
+
+    @property
+    def is_colony(self):
+        """Whether each node is a colony node."""
+        return self._is_colony[:self.num_nodes]
+
+    @property
+    def has_food(self):
+        """Whether each node holds food."""
+        return self._has_food[:self.num_nodes]
+
+    @property
+    def edge_nodes(self):
+        """The two node ids that each edge connects."""
+        return self._edge_nodes[:self.num_edges]
+
+    @property
+    def pheromone(self):
+        """The pheromone level of every edge, indexed by edge id. With lazy evaporation this is a read-only copy, use
+        set_pheromone and deposit to change it.
+        """
+        if self.lazy_evaporation:
+            return self._pheromone[:self.num_edges] * self.decay
+        return self._pheromone[:self.num_edges]
+
+    @property
+    def phero_evap(self):
+        """The fraction of pheromone each edge loses when it evaporates."""
+        return self._phero_evap[:self.num_edges]
+
+    @property
+    def length(self):
+        """The length of every edge. Unless lengths were given explicitly, this is the distance between the node
+        centers scaled the same way as Path.get_dist(80).
+        """
+        return self._length_table()[:self.num_edges]
+
+    def heuristic(self, beta=1.0):
+        """Returns how attractive every edge is for its length, (1 / length) ** beta. The values are kept for every
+        beta asked for, so only the first call for a beta costs more than an array lookup.
+
+        Args:
+            beta: How strongly short edges are preferred.
+        """
+        values = self._heuristic.get(beta)
+        if values is None:
+            values = np.zeros(len(self._edge_nodes), dtype=float)
+            values[:self.num_edges] = (1 / np.maximum(self.length, 1e-12)) ** beta
+            self._heuristic[beta] = values
+        return values[:self.num_edges]
+
+    def candidates(self, k):
+        """Returns the candidate lists of the graph: the compressed adjacency of the csr method, but with only the
+        k shortest edges of every node, sorted from shortest to longest.
+
+        Args:
+            k: The number of candidates per node.
+
+        Returns:
+            (offsets, neighbors, edges) laid out the same way as the result of csr.
+        """
+        lists = self._candidates.get(k)
+        if lists is None:
+            offsets, neighbors, edges = self.csr()
+            degree = np.diff(offsets)
+            owner = np.repeat(np.arange(self.num_nodes), degree)
+            order = np.lexsort((self.length[edges], owner))
+            keep = order[np.arange(len(order)) - offsets[owner] < k]
+            kept = np.zeros(self.num_nodes + 1, dtype=np.intp)
+            np.cumsum(np.minimum(degree, k), out=kept[1:])
+            lists = (kept, neighbors[keep], edges[keep])
+            self._candidates[k] = lists
+        return lists
+
+    def move_node(self, node, x, y):
+        """Moves a node, updating the length, heuristic and candidate lists of only the edges connected to it.
+
+        Args:
+            node: The id of the node.
+            x: The new x-coordinate of the node's center.
+            y: The new y-coordinate of the node's center.
+        """
+        self._pos[node] = (x, y)
+        self.revision += 1
+        if self._length is None or self._explicit_length:
+            return
+        edges = np.fromiter(self._incidence()[node], dtype=np.intp)
+        if edges.size == 0:
+            return
+        self._length[edges] = self._distance(self._edge_nodes[edges])
+        for beta, values in self._heuristic.items():
+            values[edges] = (1 / np.maximum(self._length[edges], 1e-12)) ** beta
+        self._candidates.clear()
+
+    def _length_table(self):
+        """Returns the whole array of edge lengths, computing it the first time.
+        """
+        if self._length is None:
+            self._length = np.zeros(len(self._edge_nodes), dtype=float)
+            self._length[:self.num_edges] = self._distance(self.edge_nodes)
+        return self._length
+
+    def _distance(self, edge_nodes):
+        """Returns the distance between the two nodes of some edges.
+        """
+        delta = self._pos[edge_nodes[:, 1]] - self._pos[edge_nodes[:, 0]]
+        return np.hypot(delta[:, 0], delta[:, 1]) / 80
+
+    @property
+    def colony(self):
+        """The id of the colony node, or the first node if none is marked as a colony."""
+        colonies = np.flatnonzero(self.is_colony)
+        return int(colonies[0]) if colonies.size > 0 else 0
+
+    def add_node(self, x, y, is_colony=False, has_food=False):
+        """Adds a node to the graph.
+
+        Args:
+            x: The x-coordinate of the node's center.
+            y: The y-coordinate of the node's center.
+            is_colony: Whether the node is the colony.
+            has_food: Whether the node holds food.
+
+        Returns:
+            The id of the new node.
+        """
+        if self.num_nodes == len(self._pos):
+            self._pos = _grow(self._pos)
+            self._is_colony = _grow(self._is_colony)
+            self._has_food = _grow(self._has_food)
+
+        node = self.num_nodes
+        self._pos[node] = (x, y)
+        self._is_colony[node] = is_colony
+        self._has_food[node] = has_food
+        self.num_nodes += 1
+        self.revision += 1
+        self._csr = None
+        self._candidates.clear()
+        if self._incident is not None:
+            self._incident.append({})
+        return node
+
+    def add_edge(self, u, v, pheromone=1.0, phero_evap=0.1, length=None):
+        """Adds an edge between two nodes.
+
+        Args:
+            u: The id of one of the nodes to connect.
+            v: The id of the other node to connect.
+            pheromone: The initial pheromone level of the edge.
+            phero_evap: The fraction of pheromone the edge loses when it evaporates.
+            length: The length of the edge. Defaults to the distance between the nodes, read from the distance
+                matrix if there is one.
+
+        Returns:
+            The id of the new edge.
+        """
+        if self.num_edges == len(self._edge_nodes):
+            self._edge_nodes = _grow(self._edge_nodes)
+            self._pheromone = _grow(self._pheromone)
+            self._phero_evap = _grow(self._phero_evap)
+            if self._length is not None:
+                self._length = _grow(self._length)
+            for beta, values in self._heuristic.items():
+                self._heuristic[beta] = _grow(values)
+
+        edge = self.num_edges
+        self._edge_nodes[edge] = (u, v)
+        self._pheromone[edge] = pheromone / self.decay
+        self._phero_evap[edge] = phero_evap
+        if length is not None:
+            self._length_table()
+        if self._length is not None:
+            if length is None and self.distances is not None:
+                length = self.distances[u, v]
+            elif length is None:
+                length = np.hypot(*(self._pos[v] - self._pos[u])) / 80
+            self._length[edge] = length
+            for beta, values in self._heuristic.items():
+                values[edge] = (1 / max(self._length[edge], 1e-12)) ** beta
+        self._edge_ids.setdefault((u, v), edge)
+        self._edge_ids.setdefault((v, u), edge)
+        self.num_edges += 1
+        self.revision += 1
+        self._csr = None
+        self._candidates.clear()
+        if self._incident is not None:
+            self._incident[u][edge] = None
+            self._incident[v][edge] = None
+        return edge
+
+    def incident_edges(self, node):
+        """Returns the ids of the edges connected to a node.
+
+        Args:
+            node: The id of the node.
+        """
+        return list(self._incidence()[node])
+
+    def remove_edge(self, edge):
+        """Removes an edge in O(degree). The last edge is moved into the freed id so the arrays stay packed.
+
+        Args:
+            edge: The id of the edge to remove.
+
+        Returns:
+            The old id of the edge that now has the removed edge's id, or None if no edge was moved.
+        """
+        incident = self._incidence()
+        u, v = self._edge_nodes[edge].tolist()
+        incident[u].pop(edge, None)
+        incident[v].pop(edge, None)
+
+        # If the two nodes are still connected by a parallel edge, lookups fall back to it.
+        remaining = [other for other in incident[u] if sorted(self._edge_nodes[other].tolist()) == sorted((u, v))]
+        for key in ((u, v), (v, u)):
+            if self._edge_ids.get(key) == edge:
+                if remaining:
+                    self._edge_ids[key] = min(remaining)
+                else:
+                    del self._edge_ids[key]
+
+        last = self.num_edges - 1
+        moved = None
+        if edge != last:
+            self._edge_nodes[edge] = self._edge_nodes[last]
+            self._pheromone[edge] = self._pheromone[last]
+            self._phero_evap[edge] = self._phero_evap[last]
+            if self._length is not None:
+                self._length[edge] = self._length[last]
+            for values in self._heuristic.values():
+                values[edge] = values[last]
+            a, b = self._edge_nodes[edge].tolist()
+            for node in (a, b):
+                if last in incident[node]:
+                    del incident[node][last]
+                    incident[node][edge] = None
+            for key in ((a, b), (b, a)):
+                if self._edge_ids.get(key) == last:
+                    self._edge_ids[key] = edge
+            moved = last
+        self.num_edges -= 1
+        self.revision += 1
+        self._csr = None
+        self._candidates.clear()
+        return moved
+
+    def remove_node(self, node):
+        """Removes a node and every edge connected to it in O(degree). The last node is moved into the freed id so
+        the arrays stay packed, and edges are moved the same way as by remove_edge.
+
+        Args:
+            node: The id of the node to remove.
+
+        Returns:
+            The old id of the node that now has the removed node's id, or None if no node was moved.
+        """
+        incident = self._incidence()
+        while incident[node]:
+            self.remove_edge(next(iter(incident[node])))
+
+        last = self.num_nodes - 1
+        moved = None
+        if node != last:
+            self._pos[node] = self._pos[last]
+            self._is_colony[node] = self._is_colony[last]
+            self._has_food[node] = self._has_food[last]
+            old_keys = {}
+            for edge in incident[last]:
+                u, v = self._edge_nodes[edge].tolist()
+                for key in ((u, v), (v, u)):
+                    if key in self._edge_ids:
+                        old_keys[key] = self._edge_ids.pop(key)
+                self._edge_nodes[edge] = (node if u == last else u, node if v == last else v)
+            for (u, v), edge in old_keys.items():
+                self._edge_ids[(node if u == last else u, node if v == last else v)] = edge
+            incident[node] = incident[last]
+            moved = last
+        incident.pop()
+        self.num_nodes -= 1
+        self.revision += 1
+        self._csr = None
+        self._candidates.clear()
+        return moved
+
+    def _incidence(self):
+        """Returns the edges touching each node, building them from the compressed adjacency the first time.
+        """
+        if self._incident is None:
+            offsets, _, edges = self.csr()
+            edges = edges.tolist()
+            self._incident = [dict.fromkeys(edges[offsets[i]:offsets[i + 1]]) for i in range(self.num_nodes)]
+        return self._incident
+
+    def edge_id(self, u, v):
+        """Returns the id of the edge between two nodes, or None if they are not connected.
+
+        Args:
+            u: The id of the node we are traveling from.
+            v: The id of the node we are traveling to.
+        """
+        return self._edge_ids.get((u, v))
+
+    def csr(self):
+        """Returns the compressed adjacency of the graph as (offsets, neighbors, edges). The neighbors of node i are
+        neighbors[offsets[i]:offsets[i + 1]] and are reached through edges[offsets[i]:offsets[i + 1]].
+        """
+        if self._csr is None:
+            edge_nodes = self.edge_nodes
+            ids = np.arange(self.num_edges, dtype=np.intp)
+            source = np.concatenate((edge_nodes[:, 0], edge_nodes[:, 1]))
+            target = np.concatenate((edge_nodes[:, 1], edge_nodes[:, 0]))
+            order = np.argsort(source, kind='stable')
+            offsets = np.zeros(self.num_nodes + 1, dtype=np.intp)
+            np.cumsum(np.bincount(source, minlength=self.num_nodes), out=offsets[1:])
+            self._csr = (offsets, target[order], np.concatenate((ids, ids))[order])
+        return self._csr
+
+    def degree(self, node):
+        """Returns the number of edges connected to a node.
+
+        Args:
+            node: The id of the node.
+        """
+        offsets = self.csr()[0]
+        return int(offsets[node + 1] - offsets[node])
+
+    def pheromone_of(self, edges):
+        """Returns the pheromone level of some edges.
+
+        Args:
+            edges: An edge id or array of edge ids.
+        """
+        return self._pheromone[edges] * self.decay
+
+    def read_pheromone(self, out):
+        """Copies the pheromone level of the first edges into an existing array without allocating a new one.
+
+        Args:
+            out: A float array. As many edges as fit are copied, starting at edge 0.
+
+        Returns:
+            The number of edges copied.
+        """
+        count = min(len(out), self.num_edges)
+        np.multiply(self._pheromone[:count], self.decay, out=out[:count])
+        return count
+
+    def set_pheromone(self, edges, value):
+        """Sets the pheromone level of some edges.
+
+        Args:
+            edges: An edge id or array of edge ids.
+            value: The new pheromone level.
+        """
+        self._pheromone[edges] = np.asarray(value) / self.decay
+
+    def deposit(self, edges, amount):
+        """Lays pheromone on some edges. Repeated edge ids each receive their deposit.
+
+        Args:
+            edges: An array of edge ids.
+            amount: The amount of pheromone laid on each edge.
+        """
+        profiler.count('pheromone_deposits', len(edges))
+        np.add.at(self._pheromone, edges, np.asarray(amount) / self.decay)
+
+    def reset_pheromone(self, value=1.0):
+        """Sets the pheromone level of every edge back to the same value.
+
+        Args:
+            value: The new pheromone level.
+        """
+        self.decay = 1.0
+        self._pheromone[:self.num_edges] = value
+
+    def evaporate(self):
+        """Evaporates pheromone from every edge.
+        """
+        if not self.lazy_evaporation:
+            pheromone = self._pheromone[:self.num_edges]
+            pheromone -= pheromone * self.phero_evap
+            return
+
+        self.decay *= 1 - self.evap_rate
+        if self.decay < self.RENORMALIZE_BELOW:
+            self.renormalize()
+
+    def attach_pheromone(self, buffer):
+        """Moves the pheromone of this graph into an existing array, such as one backed by shared memory. The graph
+        reads and writes that array from then on.
+
+        Args:
+            buffer: A float array with room for at least num_edges values.
+        """
+        buffer[:self.num_edges] = self.pheromone
+        self._pheromone = buffer
+        self.decay = 1.0
+
+    def renormalize(self):
+        """Folds the global decay factor back into the stored pheromone so that it cannot underflow.
+        """
+        self._pheromone[:self.num_edges] *= self.decay
+        self.decay = 1.0
+
+
+def _grow(array):
+    """Returns a copy of an array with room for twice as many rows.
+    """
+    grown = np.zeros((len(array) * 2,) + array.shape[1:], dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
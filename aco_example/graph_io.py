@@ -0,0 +1,448 @@
+"""Loads graphs from and saves them to edge lists, adjacency matrix CSV files, TSPLIB instances and NumPy distance
+matrices. Everything is read straight into a Graph's arrays, so large graphs never become Node and Path objects.
+"""
+import hashlib
+import math
+import os
+
+import numpy as np
+
+from aco_example.graph import Graph
+
+# Distance in pixels between neighboring nodes when a file has no coordinates to lay the graph out with.
+SPACING = 80
+
+# The value of pi TSPLIB defines GEO distances with. The published distances and optimal tour lengths of GEO
+# instances are computed with it, not with math.pi.
+TSPLIB_PI = 3.141592
+
+# Headers of the TSPLIB sections that hold data instead of a single value.
+TSPLIB_SECTIONS = {'NODE_COORD_SECTION', 'EDGE_WEIGHT_SECTION', 'DISPLAY_DATA_SECTION', 'DEPOT_SECTION',
+                   'DEMAND_SECTION', 'FIXED_EDGES_SECTION', 'TOUR_SECTION'}
+
+# Which entries of the distance matrix an explicit TSPLIB edge weight section lists, in order. Column-wise formats
+# list the same values as the row-wise format of the opposite triangle.
+TSPLIB_TRIANGLES = {
+    'UPPER_ROW': (np.triu_indices, 1), 'LOWER_COL': (np.triu_indices, 1),
+    'LOWER_ROW': (np.tril_indices, -1), 'UPPER_COL': (np.tril_indices, -1),
+    'UPPER_DIAG_ROW': (np.triu_indices, 0), 'LOWER_DIAG_COL': (np.triu_indices, 0),
+    'LOWER_DIAG_ROW': (np.tril_indices, 0), 'UPPER_DIAG_COL': (np.tril_indices, 0),
+}
+
+
+def load_graph(path, file_format=None, **kwargs):
+    """Loads a graph from a file.
+
+    Args:
+        path: The file to load.
+        file_format: 'edges', 'adjacency', 'tsplib' or 'npy'. Defaults to the one matching the file extension: .tsp for
+            TSPLIB, .csv for an adjacency matrix, .npy for a distance matrix and an edge list otherwise.
+        **kwargs: Passed on to the loader of that format.
+
+    Returns:
+        The new graph.
+    """
+    loaders = {'edges': load_edge_list, 'adjacency': load_adjacency_csv, 'tsplib': load_tsplib,
+               'npy': load_distance_matrix_graph}
+    return loaders[file_format or _format_of(path)](path, **kwargs)
+
+
+def save_graph(graph, path, file_format=None, **kwargs):
+    """Saves a graph to a file.
+
+    Args:
+        graph: The graph to save.
+        path: The file to write.
+        file_format: 'edges', 'adjacency' or 'tsplib'. Defaults to the one matching the file extension.
+        **kwargs: Passed on to the saver of that format.
+    """
+    savers = {'edges': save_edge_list, 'adjacency': save_adjacency_csv, 'tsplib': save_tsplib}
+    savers[file_format or _format_of(path)](graph, path, **kwargs)
+
+
+def load_edge_list(path, coordinates=None, delimiter=None, lazy_evaporation=False):
+    """Loads a graph from a text file with one edge per line, written as the two node ids and optionally the length
+    of the edge. Lines starting with # or % are comments.
+
+    Args:
+        path: The edge list file.
+        coordinates: An optional file with one node per line, written as the node id and its x and y coordinates.
+        delimiter: The string between the columns. Defaults to any whitespace.
+        lazy_evaporation: Whether the graph evaporates lazily.
+
+    Returns:
+        The new graph. Node ids are renumbered from zero in the order of the ids in the file. Without a length
+        column, edges are as long as the distance between their coordinates, or all one long without coordinates.
+    """
+    data = np.loadtxt(path, comments=('#', '%'), delimiter=delimiter, ndmin=2)
+    if data.shape[1] < 2:
+        raise ValueError(f'{path} needs at least two columns, the ids of the nodes each edge connects.')
+    ends = data[:, :2].astype(np.int64)
+    ids = ends.ravel()
+
+    if coordinates is not None:
+        coords = np.loadtxt(coordinates, comments=('#', '%'), delimiter=delimiter, ndmin=2)
+        labels = np.unique(np.concatenate((ids, coords[:, 0].astype(np.int64))))
+        pos = _layout(len(labels))
+        pos[np.searchsorted(labels, coords[:, 0].astype(np.int64))] = coords[:, 1:3]
+    else:
+        labels = np.unique(ids)
+        pos = _layout(len(labels))
+
+    if data.shape[1] > 2:
+        length = data[:, 2]
+    else:
+        length = None if coordinates is not None else 1.0
+    edge_nodes = np.searchsorted(labels, ends)
+    return Graph.from_arrays(pos, edge_nodes, lazy_evaporation=lazy_evaporation, length=length)
+
+
+def save_edge_list(graph, path, coordinates=None, delimiter=' '):
+    """Saves a graph as an edge list with the length of every edge.
+
+    Args:
+        graph: The graph to save.
+        path: The edge list file to write.
+        coordinates: An optional file to write the position of every node to.
+        delimiter: The string between the columns.
+    """
+    edges = np.column_stack((graph.edge_nodes, graph.length))
+    np.savetxt(path, edges, fmt=['%d', '%d', '%.17g'], delimiter=delimiter, header='node node length')
+    if coordinates is not None:
+        nodes = np.column_stack((np.arange(graph.num_nodes), graph.pos))
+        np.savetxt(coordinates, nodes, fmt=['%d', '%.17g', '%.17g'], delimiter=delimiter, header='node x y')
+
+
+def load_adjacency_csv(path, delimiter=',', lazy_evaporation=False):
+    """Loads a graph from a CSV file holding its adjacency matrix. The value in row i and column j is the length of
+    the edge between nodes i and j, with zero or an empty cell meaning they are not connected.
+
+    Args:
+        path: The CSV file.
+        delimiter: The string between the columns.
+        lazy_evaporation: Whether the graph evaporates lazily.
+
+    Returns:
+        The new graph, laid out on a grid. An edge is added when either triangle of the matrix lists it.
+    """
+    matrix = np.genfromtxt(path, delimiter=delimiter, filling_values=0, ndmin=2)
+    if matrix.shape[0] != matrix.shape[1]:
+        raise ValueError(f'{path} holds a {matrix.shape[0]}x{matrix.shape[1]} matrix, adjacency must be square.')
+    matrix = np.nan_to_num(matrix)
+    weight = np.where(matrix > 0, matrix, matrix.T)
+    u, v = np.nonzero(np.triu(weight > 0, k=1))
+    return Graph.from_arrays(_layout(len(matrix)), np.column_stack((u, v)), lazy_evaporation=lazy_evaporation,
+                             length=weight[u, v])
+
+
+def save_adjacency_csv(graph, path, delimiter=','):
+    """Saves a graph as a CSV adjacency matrix. The matrix has a row and column per node, so only use this for
+    small graphs.
+
+    Args:
+        graph: The graph to save.
+        path: The CSV file to write.
+        delimiter: The string between the columns.
+    """
+    matrix = np.zeros((graph.num_nodes, graph.num_nodes))
+    u, v = graph.edge_nodes.T
+    matrix[u, v] = graph.length
+    matrix[v, u] = graph.length
+    np.savetxt(path, matrix, fmt='%.17g', delimiter=delimiter)
+
+
+def load_tsplib(path, neighbors=None, distance_file=None, lazy_evaporation=False):
+    """Loads a symmetric TSPLIB instance. Coordinates with EUC_2D, CEIL_2D, ATT, GEO, MAN_2D and MAX_2D distances
+    and explicit edge weights are supported.
+
+    Args:
+        path: The .tsp file.
+        neighbors: Connect every node to only this many of its nearest nodes instead of to every other node.
+        distance_file: An .npy file to keep the distance matrix in. It is memory-mapped instead of held in memory,
+            and an existing file built from the same coordinates or weights is reused without recomputing it.
+        lazy_evaporation: Whether the graph evaporates lazily.
+
+    Returns:
+        The new graph, with the distance matrix as its distances.
+    """
+    spec, sections = _read_tsplib(path)
+    n = int(spec['DIMENSION'])
+    kind = spec.get('EDGE_WEIGHT_TYPE', 'EUC_2D')
+
+    coords = None
+    for name in ('NODE_COORD_SECTION', 'DISPLAY_DATA_SECTION'):
+        if name in sections:
+            coords = sections[name].reshape(-1, 3)[:, 1:3]
+            break
+
+    if kind == 'EXPLICIT':
+        matrix = _explicit_weights(sections['EDGE_WEIGHT_SECTION'], n, spec.get('EDGE_WEIGHT_FORMAT', 'FULL_MATRIX'))
+        if distance_file is not None:
+            matrix = _store(distance_file, matrix.shape, lambda rows: matrix[rows], _source_of(kind, matrix))
+    elif coords is None:
+        raise ValueError(f'{path} has EDGE_WEIGHT_TYPE {kind} but no NODE_COORD_SECTION.')
+    else:
+        matrix = distance_matrix(coords, distance_file, kind)
+    return from_distance_matrix(matrix, neighbors, coords, lazy_evaporation)
+
+
+def save_tsplib(graph, path, name=None):
+    """Saves a graph as a TSPLIB instance. A graph with a distance matrix is saved with explicit edge weights,
+    otherwise the node positions are saved with EUC_2D distances. TSPLIB instances are complete graphs, so the
+    edges of the graph itself are not saved.
+
+    Args:
+        graph: The graph to save.
+        path: The .tsp file to write.
+        name: The name of the instance. Defaults to the file name.
+    """
+    name = name or os.path.splitext(os.path.basename(path))[0]
+    explicit = graph.distances is not None
+    with open(path, 'w') as file:
+        file.write(f'NAME : {name}\nTYPE : TSP\nDIMENSION : {graph.num_nodes}\n')
+        if explicit:
+            file.write('EDGE_WEIGHT_TYPE : EXPLICIT\nEDGE_WEIGHT_FORMAT : FULL_MATRIX\n')
+            file.write('DISPLAY_DATA_TYPE : TWOD_DISPLAY\nEDGE_WEIGHT_SECTION\n')
+            for row in graph.distances:
+                file.write(' '.join(map(repr, np.asarray(row, dtype=float).tolist())) + '\n')
+        else:
+            file.write('EDGE_WEIGHT_TYPE : EUC_2D\n')
+        file.write('DISPLAY_DATA_SECTION\n' if explicit else 'NODE_COORD_SECTION\n')
+        for i, (x, y) in enumerate(graph.pos.tolist(), start=1):
+            file.write(f'{i} {x!r} {y!r}\n')
+        file.write('EOF\n')
+
+
+def distance_matrix(coords, path=None, kind='EUC_2D', block=1024):
+    """Computes the distance between every pair of nodes, one block of rows at a time.
+
+    Args:
+        coords: Array of shape (num_nodes, 2) holding the coordinates of every node.
+        path: An .npy file to keep the matrix in, memory-mapped. An existing file computed from the same
+            coordinates and kind is reused without recomputing it. None keeps the matrix in memory.
+        kind: How distances are measured, as a TSPLIB EDGE_WEIGHT_TYPE.
+        block: The number of rows computed at once.
+
+    Returns:
+        The (num_nodes, num_nodes) matrix, read-only if it is memory-mapped.
+    """
+    coords = np.asarray(coords, dtype=float)
+    n = len(coords)
+    distance = _TSPLIB_DISTANCES[kind]
+
+    def rows(chunk):
+        return distance(coords[chunk, None, :], coords[None, :, :])
+
+    if path is None:
+        matrix = np.empty((n, n))
+        for start in range(0, n, block):
+            matrix[start:start + block] = rows(slice(start, start + block))
+        np.fill_diagonal(matrix, 0)
+        return matrix
+    return _store(path, (n, n), rows, _source_of(kind, coords), block)
+
+
+def load_distance_matrix(path):
+    """Opens a distance matrix saved as an .npy file without reading it into memory.
+
+    Args:
+        path: The .npy file.
+
+    Returns:
+        The matrix, as a read-only memory-mapped array.
+    """
+    return np.load(path, mmap_mode='r')
+
+
+def load_distance_matrix_graph(path, neighbors=None, lazy_evaporation=False):
+    """Loads a graph from a distance matrix saved as an .npy file, which stays memory-mapped.
+
+    Args:
+        path: The .npy file.
+        neighbors: Connect every node to only this many of its nearest nodes instead of to every other node.
+        lazy_evaporation: Whether the graph evaporates lazily.
+
+    Returns:
+        The new graph, laid out on a grid.
+    """
+    return from_distance_matrix(load_distance_matrix(path), neighbors, lazy_evaporation=lazy_evaporation)
+
+
+def from_distance_matrix(matrix, neighbors=None, pos=None, lazy_evaporation=False, block=1024):
+    """Builds a graph from a distance matrix, either complete or connecting every node to its nearest nodes.
+
+    Args:
+        matrix: The (num_nodes, num_nodes) distance matrix. It is kept as the graph's distances, not copied.
+        neighbors: Connect every node to only this many of its nearest nodes instead of to every other node.
+        pos: The position of every node. Defaults to a grid layout.
+        lazy_evaporation: Whether the graph evaporates lazily.
+        block: The number of rows of the matrix read at once when looking for the nearest nodes.
+
+    Returns:
+        The new graph.
+    """
+    n = len(matrix)
+    if neighbors is None or neighbors >= n - 1:
+        u, v = np.triu_indices(n, k=1)
+    else:
+        pairs = []
+        for start in range(0, n, block):
+            rows = np.array(matrix[start:start + block], dtype=float)
+            rows[np.arange(len(rows)), np.arange(start, start + len(rows))] = np.inf
+            nearest = np.argpartition(rows, neighbors - 1, axis=1)[:, :neighbors]
+            pairs.append(np.column_stack((np.repeat(np.arange(start, start + len(rows)), neighbors), nearest.ravel())))
+        pairs = np.unique(np.sort(np.concatenate(pairs), axis=1), axis=0)
+        u, v = pairs[:, 0], pairs[:, 1]
+
+    # Reading row by row keeps a memory-mapped matrix from being read in random order.
+    length = np.empty(len(u))
+    starts = np.searchsorted(u, np.arange(n + 1))
+    for i in range(n):
+        if starts[i] < starts[i + 1]:
+            length[starts[i]:starts[i + 1]] = np.asarray(matrix[i])[v[starts[i]:starts[i + 1]]]
+
+    graph = Graph.from_arrays(_layout(n) if pos is None else pos, np.column_stack((u, v)),
+                              lazy_evaporation=lazy_evaporation, length=length)
+    graph.distances = matrix
+    return graph
+
+
+def _format_of(path):
+    """Returns the name of the file format matching a file's extension.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    return {'.tsp': 'tsplib', '.csv': 'adjacency', '.npy': 'npy'}.get(extension, 'edges')
+
+
+def _layout(num_nodes):
+    """Returns positions on a square grid for nodes that have no coordinates of their own.
+    """
+    side = max(math.ceil(math.sqrt(num_nodes)), 1)
+    ys, xs = np.divmod(np.arange(num_nodes), side)
+    return np.stack((xs, ys), axis=1).astype(float) * SPACING
+
+
+def _source_of(kind, values):
+    """Returns a digest of the edge weight type and the coordinates or weights a distance matrix is computed from.
+    """
+    digest = hashlib.sha256(kind.encode())
+    digest.update(np.ascontiguousarray(values, dtype=float).tobytes())
+    return digest.hexdigest()
+
+
+def _store(path, shape, rows, source, block=1024):
+    """Writes a matrix to a memory-mapped .npy file one block of rows at a time and returns it opened read-only.
+    The digest of what the matrix was computed from is written next to it, in path + '.source', and an existing
+    file is only reused when its digest matches, so a file left by another instance of the same size is rebuilt.
+    """
+    sidecar = path + '.source'
+    if os.path.exists(path) and os.path.exists(sidecar):
+        with open(sidecar) as file:
+            known = file.read().strip()
+        matrix = np.load(path, mmap_mode='r')
+        if known == source and matrix.shape == shape:
+            return matrix
+        del matrix
+    if os.path.exists(sidecar):
+        # The digest only goes back once the new matrix is complete, so an interrupted write is never reused.
+        os.remove(sidecar)
+    matrix = np.lib.format.open_memmap(path, mode='w+', dtype=float, shape=shape)
+    for start in range(0, shape[0], block):
+        chunk = slice(start, min(start + block, shape[0]))
+        matrix[chunk] = rows(chunk)
+        matrix[chunk, chunk][np.diag_indices(chunk.stop - chunk.start)] = 0
+    matrix.flush()
+    del matrix
+    with open(sidecar, 'w') as file:
+        file.write(source + '\n')
+    return np.load(path, mmap_mode='r')
+
+
+def _read_tsplib(path):
+    """Reads the header values and the data sections of a TSPLIB file.
+    """
+    spec = {}
+    sections = {}
+    current = None
+    with open(path) as file:
+        for line in file:
+            line = line.strip()
+            if not line:
+                continue
+            first = line.split()[0].rstrip(':')
+            if first == 'EOF':
+                break
+            if first in TSPLIB_SECTIONS:
+                current = sections.setdefault(first, [])
+            elif first[0].isalpha():
+                key, _, value = line.partition(':')
+                spec[key.strip()] = value.strip()
+                current = None
+            elif current is not None:
+                current.extend(line.split())
+    return spec, {name: np.array(values, dtype=float) for name, values in sections.items()}
+
+
+def _explicit_weights(values, n, layout):
+    """Builds the full distance matrix from the values of an explicit TSPLIB edge weight section.
+    """
+    if layout == 'FULL_MATRIX':
+        return values[:n * n].reshape(n, n)
+    if layout not in TSPLIB_TRIANGLES:
+        raise ValueError(f'Unsupported EDGE_WEIGHT_FORMAT {layout}.')
+    indices, k = TSPLIB_TRIANGLES[layout]
+    i, j = indices(n, k)
+    matrix = np.zeros((n, n))
+    matrix[i, j] = values[:len(i)]
+    matrix[j, i] = values[:len(i)]
+    return matrix
+
+
+def _nint(x):
+    return np.floor(x + 0.5)
+
+
+def _euclidean(a, b):
+    return _nint(np.hypot(*np.moveaxis(a - b, -1, 0)))
+
+
+def _ceiling(a, b):
+    return np.ceil(np.hypot(*np.moveaxis(a - b, -1, 0)))
+
+
+def _manhattan(a, b):
+    return _nint(np.abs(a - b).sum(axis=-1))
+
+
+def _maximum(a, b):
+    return _nint(np.abs(a - b)).max(axis=-1)
+
+
+def _pseudo_euclidean(a, b):
+    r = np.sqrt((np.square(a - b).sum(axis=-1)) / 10)
+    t = _nint(r)
+    return np.where(t < r, t + 1, t)
+
+
+def _geographical(a, b):
+    def radians(value):
+        degrees = np.trunc(value)
+        return TSPLIB_PI * (degrees + 5 * (value - degrees) / 3) / 180
+
+    latitude_a, longitude_a = radians(a[..., 0]), radians(a[..., 1])
+    latitude_b, longitude_b = radians(b[..., 0]), radians(b[..., 1])
+    q1 = np.cos(longitude_a - longitude_b)
+    q2 = np.cos(latitude_a - latitude_b)
+    q3 = np.cos(latitude_a + latitude_b)
+    return np.trunc(6378.388 * np.arccos(np.clip(0.5 * ((1 + q1) * q2 - (1 - q1) * q3), -1, 1)) + 1)
+
+
+# The distance functions of the TSPLIB edge weight types, computed between broadcast coordinate arrays.
+_TSPLIB_DISTANCES = {
+    'EUC_2D': _euclidean,
+    'CEIL_2D': _ceiling,
+    'MAN_2D': _manhattan,
+    'MAX_2D': _maximum,
+    'ATT': _pseudo_euclidean,
+    'GEO': _geographical,
+}
@@ -0,0 +1,128 @@
+from aco_example.path import Path
+
+
+class Network:
+    """Represents the nodes and paths being edited, kept in plain lists that can be handed to a Simulation. Every
+    node and path remembers its position in those lists, so removing one moves the last item into its place instead
+    of searching and shifting the lists, and removing a node only visits its own paths. Removing therefore costs
+    O(degree) no matter how large the graph is, but does not keep the order of the lists.
+    """
+
+    def __init__(self, spatial_index=None):
+        """Initialization method for an empty network.
+
+        Args:
+            spatial_index: A GridIndex to keep the nodes in, if any.
+        """
+        self.nodes = []
+        self.paths = []
+        self.spatial_index = spatial_index
+        # Maps a node's id to its position in the node list, and a path's identity to its position in the path list.
+        self._node_slot = {}
+        self._path_slot = {}
+
+    def add_node(self, node):
+        """Adds a node to the network.
+
+        Args:
+            node: The node to add. Its node_id must not be used by another node in the network.
+
+        Returns:
+            The node that was added.
+        """
+        if node.node_id in self._node_slot:
+            raise ValueError(f'A node with id {node.node_id} is already in the network.')
+        self._node_slot[node.node_id] = len(self.nodes)
+        self.nodes.append(node)
+        if self.spatial_index is not None:
+            self.spatial_index.insert(node)
+        return node
+
+    def remove_node(self, node):
+        """Removes a node and every path connected to it.
+
+        Args:
+            node: The node to remove.
+
+        Returns:
+            The list of paths that were removed with the node.
+        """
+        removed = list(node.path_to_neighbor)
+        for path in removed:
+            self.remove_path(path)
+
+        _swap_remove(self.nodes, self._node_slot, node.node_id, lambda item: item.node_id)
+        if self.spatial_index is not None:
+            self.spatial_index.remove(node)
+        return removed
+
+    def connect(self, node1, node2, color):
+        """Adds a path between two nodes unless they are the same node or already connected.
+
+        Args:
+            node1: One of the nodes to connect.
+            node2: The other node to connect.
+            color: The color of the new path.
+
+        Returns:
+            The new path, or None if no path was added.
+        """
+        if node1 is node2 or node1.path_to(node2) is not None:
+            return None
+        return self.add_path(Path(color, node1, node2))
+
+    def add_path(self, path):
+        """Adds a path to the network and makes its two nodes neighbors.
+
+        Args:
+            path: The path to add.
+
+        Returns:
+            The path that was added.
+        """
+        self._path_slot[id(path)] = len(self.paths)
+        self.paths.append(path)
+        path.node1.add_neighbor(path.node2, path)
+        path.node2.add_neighbor(path.node1, path)
+        return path
+
+    def remove_path(self, path):
+        """Removes a path from the network so that its two nodes are no longer neighbors.
+
+        Args:
+            path: The path to remove.
+        """
+        _swap_remove(self.paths, self._path_slot, id(path), id)
+        path.node1.remove_neighbor(path.node2)
+        path.node2.remove_neighbor(path.node1)
+
+    def clear(self):
+        """Removes every node and path.
+        """
+        self.nodes.clear()
+        self.paths.clear()
+        self._node_slot.clear()
+        self._path_slot.clear()
+        if self.spatial_index is not None:
+            self.spatial_index.clear()
+
+    def __contains__(self, node):
+        return self._node_slot.get(node.node_id) is not None
+
+
+def _swap_remove(items, slots, key, key_of):
+    """Removes an item from a list by moving the last item into its position.
+
+    Args:
+        items: The list to remove from.
+        slots: Dict mapping the key of every item to its position in the list.
+        key: The key of the item to remove.
+        key_of: Function returning the key of an item.
+    """
+    index = slots.pop(key, None)
+    if index is None:
+        return
+    last = items.pop()
+    if index != len(items):
+        items[index] = last
+        slots[key_of(last)] = index
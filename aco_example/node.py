@@ -1,4 +1,5 @@
-import pygame
+from aco_example.fonts import fonts
+from aco_example.text_cache import text_cache
 
 
 class Node:
@@ -18,24 +19,77 @@ class Node:
         self.color = color
         self.rect = rect
         self.radius = self.rect.width // 2
-        self.font = pygame.font.SysFont('Arial', 20)
-        self.info_font = pygame.font.SysFont('Arial', 38)
+        # Fonts and pygame itself are only needed once this node is drawn, so headless simulations never load them.
+        self.font = None
+        self.info_font = None
         self.info_text = ''
+        # Label surfaces are kept between frames and only rebuilt when their text changes.
+        self._id_label = None
+        self._info_label = None
+
+        # The graph this node is a view over, if any, and this node's id within it.
+        self.graph = None
+        self.index = None
+        # The spatial index this node is kept in, if any.
+        self.spatial_index = None
 
         # Determines whether or not this node is a colony or food-bearing node.
-        self.is_colony = False
-        self.has_food = False
+        self._is_colony = False
+        self._has_food = False
 
         self.neighbors = []
         self.path_to_neighbor = []
+        # Maps a neighbor's node id to its position in the neighbor lists.
+        self._slot = {}
+
+    def bind(self, graph, index):
+        """Makes this node a view over a node in a graph so that its state is read from and written to the graph.
+
+        Args:
+            graph: The graph holding this node.
+            index: The id of this node within the graph.
+        """
+        self.graph = graph
+        self.index = index
+
+    @property
+    def is_colony(self):
+        """Whether or not this node is the colony."""
+        if self.graph is None:
+            return self._is_colony
+        return bool(self.graph.is_colony[self.index])
+
+    @is_colony.setter
+    def is_colony(self, value):
+        if self.graph is None:
+            self._is_colony = value
+        else:
+            self.graph.is_colony[self.index] = value
+
+    @property
+    def has_food(self):
+        """Whether or not this node holds food."""
+        if self.graph is None:
+            return self._has_food
+        return bool(self.graph.has_food[self.index])
+
+    @has_food.setter
+    def has_food(self, value):
+        if self.graph is None:
+            self._has_food = value
+        else:
+            self.graph.has_food[self.index] = value
 
     def add_neighbor(self, neighbor, connection):
-        """Adds a neighbor to this node's list of neighbors.
+        """Adds a neighbor to this node's list of neighbors. A node only keeps one connection to each neighbor.
 
         Args:
             neighbor: The neighboring node.
             connection: The path from this node to its neighbor.
         """
+        if neighbor.node_id in self._slot:
+            return
+        self._slot[neighbor.node_id] = len(self.neighbors)
         self.neighbors.append(neighbor)
         self.path_to_neighbor.append(connection)
 
@@ -45,10 +99,36 @@ class Node:
         Args:
             neighbor: The node to remove from the list of neighbors.
         """
-        if neighbor in self.neighbors:
-            index = self.neighbors.index(neighbor)
-            self.neighbors.remove(neighbor)
-            self.path_to_neighbor.pop(index)
+        index = self._slot.pop(neighbor.node_id, None)
+        if index is None:
+            return
+
+        # Move the last neighbor into the freed slot so nothing has to shift.
+        last = len(self.neighbors) - 1
+        if index != last:
+            self.neighbors[index] = self.neighbors[last]
+            self.path_to_neighbor[index] = self.path_to_neighbor[last]
+            self._slot[self.neighbors[index].node_id] = index
+        self.neighbors.pop()
+        self.path_to_neighbor.pop()
+
+    def neighbor(self, node_id):
+        """Returns the neighbor with a node id, or None if there is no such neighbor.
+
+        Args:
+            node_id: The id of the neighboring node.
+        """
+        index = self._slot.get(node_id)
+        return self.neighbors[index] if index is not None else None
+
+    def path_to(self, neighbor):
+        """Returns the path from this node to a neighbor, or None if they are not connected.
+
+        Args:
+            neighbor: The neighboring node.
+        """
+        index = self._slot.get(neighbor.node_id)
+        return self.path_to_neighbor[index] if index is not None else None
 
     def draw(self, surface):
         """Draws this node on the specified surface.
@@ -56,23 +136,32 @@ class Node:
         Args:
             surface: The pygame surface to draw this node on.
         """
+        import pygame
+        if self.font is None:
+            self.font = fonts.get('Arial', 20)
+            self.info_font = fonts.get('Arial', 38)
+
         # Nodes are in the shape of circles.
         pygame.draw.circle(surface, self.color, self.rect.center, self.radius)
-        text = self.font.render(f'{self.node_id}', True, (255, 255, 255))
-        surface.blit(text, self.rect.topleft)
+        if self._id_label is None:
+            self._id_label = text_cache.render(self.font, f'{self.node_id}', (255, 255, 255))
+        surface.blit(self._id_label, self.rect.topleft)
 
         # Determine the text to be displayed on the node.
         if self.has_food:
-            self.info_text = 'F'
+            info_text = 'F'
         elif self.is_colony:
-            self.info_text = 'C'
+            info_text = 'C'
         else:
-            self.info_text = None
+            info_text = None
+
+        if info_text != self.info_text:
+            self.info_text = info_text
+            self._info_label = text_cache.render(self.info_font, info_text, (255, 255, 255)) if info_text else None
 
-        text = self.info_font.render(self.info_text, True, (255, 255, 255))
         loc = (self.rect.centerx - (self.radius / 3), self.rect.centery - (self.radius / 2))
-        if self.info_text is not None:
-            surface.blit(text, loc)
+        if self._info_label is not None:
+            surface.blit(self._info_label, loc)
 
     def update(self, x, y):
         """Updates the node's location if it is moved.
@@ -83,6 +172,10 @@ class Node:
         """
         self.rect.x = x
         self.rect.y = y
+        if self.graph is not None:
+            self.graph.move_node(self.index, *self.rect.center)
+        if self.spatial_index is not None:
+            self.spatial_index.move(self)
 
     def __eq__(self, obj):
         return isinstance(obj, Node) and obj.node_id == self.node_id
@@ -0,0 +1,173 @@
+import multiprocessing
+import os
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from aco_example.simulation import Simulation
+
+
+class ParallelColonies:
+    """Represents several independent colonies running on the same graph, each in its own process. Every colony lays
+    pheromone in its own row of a pheromone table kept in shared memory. After every round of merge_interval ticks
+    the colonies pause and the rows are merged, either by averaging them or by copying the row of the colony that
+    found the shortest path into every other row.
+
+    The colonies only run at the same time when there are free cores for their processes, and every round waits for
+    the slowest colony and for the merge, so how much faster this is than a single colony has to be measured.
+    """
+
+    MERGES = ('average', 'best')
+
+    def __init__(self, graph, num_colonies=None, num_ants=50, merge='average', merge_interval=600, seed=None,
+                 **kwargs):
+        """Initialization method for parallel colonies.
+
+        Args:
+            graph: The graph the colonies run on. It is copied into every process and is not changed.
+            num_colonies: The number of colonies, and processes. Defaults to the number of CPUs.
+            num_ants: The number of ants per path leaving the colony node, in every colony.
+            merge: How pheromone is merged between rounds, either 'average' or 'best'.
+            merge_interval: The number of ticks every colony runs between merges.
+            seed: Seed for the colonies' random generators, so that a run can be repeated.
+            **kwargs: Passed on to each colony's Simulation, e.g. dt or evap_period.
+        """
+        if merge not in self.MERGES:
+            raise ValueError(f'Unknown merge {merge!r}, expected one of {", ".join(self.MERGES)}.')
+        self.graph = graph
+        self.num_colonies = num_colonies or os.cpu_count() or 1
+        self.num_ants = num_ants
+        self.merge = merge
+        self.merge_interval = merge_interval
+        self.seed = seed
+        self.kwargs = kwargs
+        self.rounds = 0
+        self.ant_steps = 0
+        self.best_length = np.inf
+        self._shm = None
+        self._pheromone = None
+        self._workers = []
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def pheromone(self):
+        """The merged pheromone level of every edge."""
+        return self._pheromone[0, :self.graph.num_edges].copy()
+
+    def start(self):
+        """Creates the shared pheromone table and starts one process per colony.
+        """
+        shape = (self.num_colonies, max(self.graph.num_edges, 1))
+        self._shm = shared_memory.SharedMemory(create=True, size=int(np.prod(shape)) * 8)
+        self._pheromone = np.ndarray(shape, dtype=float, buffer=self._shm.buf)
+        self._pheromone[:, :self.graph.num_edges] = self.graph.pheromone
+
+        seeds = np.random.SeedSequence(self.seed).spawn(self.num_colonies)
+        for k in range(self.num_colonies):
+            conn, child_conn = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=_colony_worker, daemon=True,
+                                              args=(k, self.graph, self._shm.name, shape, child_conn, seeds[k],
+                                                    self.num_ants, self.merge_interval, self.kwargs))
+            process.start()
+            self._workers.append((process, conn))
+
+    def run(self, rounds):
+        """Runs a number of rounds, merging the pheromone after each one.
+
+        Args:
+            rounds: The number of rounds to run.
+
+        Returns:
+            A dict with the number of rounds run, the ant steps evaluated, the ant steps per second and the
+            shortest path found by any colony.
+        """
+        if not self._workers:
+            self.start()
+
+        start = time.perf_counter()
+        ant_steps = 0
+        for _ in range(rounds):
+            for _, conn in self._workers:
+                conn.send('step')
+            results = [conn.recv() for _, conn in self._workers]
+            ant_steps += sum(steps for steps, _ in results)
+            self._merge([best for _, best in results])
+            self.rounds += 1
+
+        elapsed = time.perf_counter() - start
+        self.ant_steps += ant_steps
+        return {
+            'rounds': self.rounds,
+            'ant_steps': self.ant_steps,
+            'ant_steps_per_sec': ant_steps / elapsed if elapsed > 0 else 0.0,
+            'best_length': self.best_length,
+        }
+
+    def _merge(self, best_lengths):
+        """Merges the pheromone of all colonies while they are paused.
+
+        Args:
+            best_lengths: The shortest path found so far by each colony.
+        """
+        self.best_length = min([self.best_length] + best_lengths)
+        if self.merge == 'average':
+            self._pheromone[:] = self._pheromone.mean(axis=0)
+        else:
+            self._pheromone[:] = self._pheromone[int(np.argmin(best_lengths))]
+
+    def close(self):
+        """Stops every process and releases the shared memory.
+        """
+        try:
+            for process, conn in self._workers:
+                # A process that already died can no longer be told to stop.
+                if process.is_alive():
+                    try:
+                        conn.send('stop')
+                    except (BrokenPipeError, ConnectionResetError):
+                        pass
+                process.join()
+        finally:
+            self._workers = []
+            if self._shm is not None:
+                self._pheromone = self._pheromone.copy()
+                self._shm.close()
+                self._shm.unlink()
+                self._shm = None
+
+
+def _colony_worker(k, graph, shm_name, shape, conn, seed, num_ants, interval, kwargs):
+    """Runs one colony in a worker process until it is told to stop.
+
+    Args:
+        k: The colony's row in the shared pheromone table.
+        graph: The graph to run on.
+        shm_name: The name of the shared memory holding the pheromone table.
+        shape: The shape of the pheromone table.
+        conn: The pipe the commands arrive on and the results are sent back through.
+        seed: The seed sequence for this colony's random generator.
+        num_ants: The number of ants per path leaving the colony node.
+        interval: The number of ticks to run per round.
+        kwargs: Passed on to the colony's Simulation.
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        graph.attach_pheromone(np.ndarray(shape, dtype=float, buffer=shm.buf)[k])
+        # The table has to hold true pheromone levels for merging, so evaporation cannot be deferred.
+        graph.lazy_evaporation = False
+        simulation = Simulation.from_graph(graph, num_ants=num_ants, rng=np.random.default_rng(seed), **kwargs)
+        simulation.start()
+        while conn.recv() == 'step':
+            simulation.step(interval)
+            conn.send((interval * len(simulation.colony), simulation.colony.best_length))
+    finally:
+        # Move the pheromone back into private memory so nothing points into the shared memory when it is closed.
+        graph.attach_pheromone(graph.pheromone.copy())
+        shm.close()
@@ -1,6 +1,8 @@
-import pygame
 from math import sqrt
 
+from aco_example.fonts import fonts
+from aco_example.text_cache import text_cache
+
 
 class Path:
     """Represents a path object. These are connections between nodes.
@@ -21,10 +23,41 @@ class Path:
         self.end_pos = node2.rect.center
         self.width = 30
 
+        # The graph this path is a view over, if any, and this path's edge id within it.
+        self.graph = None
+        self.edge_id = None
+
         # Pheromone value determines how likely an ant is to travel along this path.
-        self.pheromone = 1
+        self._pheromone = 1
         self.phero_evap = 0.1
-        self.font = pygame.font.SysFont('Arial', 28)
+        self.font = None
+        # The distance label is only rebuilt when one of the connected nodes moves.
+        self._label = None
+        self._label_ends = None
+
+    def bind(self, graph, edge_id):
+        """Makes this path a view over an edge in a graph so that its pheromone is read from and written to the graph.
+
+        Args:
+            graph: The graph holding this path.
+            edge_id: The id of this path's edge within the graph.
+        """
+        self.graph = graph
+        self.edge_id = edge_id
+
+    @property
+    def pheromone(self):
+        """The pheromone level of this path."""
+        if self.graph is None:
+            return self._pheromone
+        return float(self.graph.pheromone_of(self.edge_id))
+
+    @pheromone.setter
+    def pheromone(self, value):
+        if self.graph is None:
+            self._pheromone = value
+        else:
+            self.graph.set_pheromone(self.edge_id, value)
 
     def get_dist(self, node_size):
         """Returns the length/distance of this path.
@@ -32,6 +65,9 @@ class Path:
         Args:
             node_size: Used to calculate the distance so that the numbers are not incredibly large due to pixel measurements.
         """
+        if self.graph is not None:
+            # The graph keeps the lengths of its edges, scaled for a node size of 80.
+            return float(self.graph.length[self.edge_id]) * 80 / node_size
         x_diff = self.node2.rect.centerx - self.node1.rect.centerx
         y_diff = self.node2.rect.centery - self.node1.rect.centery
         return sqrt(x_diff ** 2 + y_diff ** 2) / node_size
@@ -42,10 +78,16 @@ class Path:
         Args:
             surface: The pygame surface to draw this path on.
         """
+        import pygame
+        if self.font is None:
+            self.font = fonts.get('Arial', 28)
         pygame.draw.line(surface, self.color, self.start_pos, self.end_pos, self.width)
         center_point = ((self.end_pos[0] + self.start_pos[0]) / 2, (self.end_pos[1] + self.start_pos[1]) / 2)
-        text = self.font.render(f'{round(self.get_dist(80), 1)}', True, (255, 255, 255))
-        surface.blit(text, center_point)
+        ends = (self.node1.rect.center, self.node2.rect.center)
+        if ends != self._label_ends:
+            self._label_ends = ends
+            self._label = text_cache.render(self.font, f'{round(self.get_dist(80), 1)}', (255, 255, 255))
+        surface.blit(self._label, center_point)
 
     def phero_evaporation(self):
         """Controls how much pheromone this path loses.
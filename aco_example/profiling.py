@@ -0,0 +1,171 @@
+import csv
+import json
+import os
+import time
+from collections import defaultdict
+
+
+class _Phase:
+    """Times one phase of a frame for a profiler.
+    """
+
+    __slots__ = ('profiler', 'name', 'start')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profiler.times[self.name] += time.perf_counter() - self.start
+
+
+class _NoPhase:
+    """Stands in for a phase timer while profiling is switched off.
+    """
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return None
+
+
+_NO_PHASE = _NoPhase()
+
+
+class Profiler:
+    """Represents low-overhead instrumentation of the main loop. It keeps the time spent in each phase of a frame
+    and counters such as ant decisions and pheromone deposits, summarizes them over a window of frames, and can
+    draw that summary on screen or append it to a JSON lines or CSV file. While it is switched off, timing a phase
+    or counting something costs a single attribute check.
+    """
+
+    def __init__(self, enabled=False, window=1.0):
+        """Initialization method for a profiler.
+
+        Args:
+            enabled: Whether the profiler starts switched on.
+            window: The number of seconds each summary covers.
+        """
+        self.enabled = enabled
+        self.overlay = False
+        self.window = window
+        self.export_path = None
+        self.times = defaultdict(float)
+        self.counters = defaultdict(int)
+        self.frames = 0
+        self.summary = {}
+        self._window_start = time.perf_counter()
+
+    def phase(self, name):
+        """Returns a context manager that adds the time spent inside it to a phase.
+
+        Args:
+            name: The name of the phase, e.g. 'events' or 'simulation'.
+        """
+        if not self.enabled:
+            return _NO_PHASE
+        return _Phase(self, name)
+
+    def count(self, name, amount=1):
+        """Adds to a counter.
+
+        Args:
+            name: The name of the counter, e.g. 'ant_decisions'.
+            amount: How much to add.
+        """
+        if self.enabled:
+            self.counters[name] += amount
+
+    def export_to(self, path):
+        """Appends every summary to a file from now on, as CSV if the path ends in .csv and JSON lines otherwise.
+
+        Args:
+            path: The file to append to, or None to stop exporting.
+        """
+        self.export_path = path
+
+    def frame(self):
+        """Marks the end of a frame. Once the window is over, the summary is updated and exported.
+        """
+        if not self.enabled:
+            return
+        self.frames += 1
+        now = time.perf_counter()
+        elapsed = now - self._window_start
+        if elapsed < self.window:
+            return
+
+        summary = {'time': time.time(), 'frames': self.frames, 'fps': self.frames / elapsed}
+        for name, seconds in self.times.items():
+            summary[f'{name}_ms'] = seconds * 1000 / self.frames
+        for name, count in self.counters.items():
+            summary[name] = count
+        self.summary = summary
+        if self.export_path is not None:
+            self._export(summary)
+
+        self.times.clear()
+        self.counters.clear()
+        self.frames = 0
+        self._window_start = now
+
+    def _export(self, summary):
+        """Appends a summary to the export file.
+        """
+        if self.export_path.endswith('.csv'):
+            fields, rows = [], []
+            if os.path.exists(self.export_path) and os.path.getsize(self.export_path) > 0:
+                with open(self.export_path, newline='') as file:
+                    fields = next(csv.reader(file))
+            new = sorted(set(summary) - set(fields))
+            if new and fields:
+                # A phase or counter seen for the first time gets a column, so the file is written again with it.
+                with open(self.export_path, newline='') as file:
+                    rows = list(csv.DictReader(file))
+            if new:
+                fields = fields + new
+                with open(self.export_path, 'w', newline='') as file:
+                    writer = csv.DictWriter(file, fieldnames=fields)
+                    writer.writeheader()
+                    writer.writerows(rows)
+            with open(self.export_path, 'a', newline='') as file:
+                csv.DictWriter(file, fieldnames=fields).writerow(summary)
+        else:
+            with open(self.export_path, 'a') as file:
+                file.write(json.dumps(summary) + '\n')
+
+    def draw_overlay(self, surface, font, topleft, color=(255, 255, 255)):
+        """Draws the latest summary on a surface, one value per line.
+
+        Args:
+            surface: The pygame surface to draw on.
+            font: The pygame font to draw with.
+            topleft: The position of the first line.
+            color: The color of the text.
+
+        Returns:
+            The pygame rectangle covering the drawn text, or None if there is nothing to show yet.
+        """
+        # The values change every window, so the lines are rendered directly instead of through the text cache.
+        rect = None
+        x, y = topleft
+        for name, value in self.summary.items():
+            if name == 'time':
+                continue
+            text = f'{name}: {value:.2f}' if isinstance(value, float) else f'{name}: {value}'
+            line = surface.blit(font.render(text, True, color), (x, y))
+            rect = line if rect is None else rect.union(line)
+            y += line.height
+        return rect
+
+
+# The profiler shared by the main loop, the simulation and the renderers.
+profiler = Profiler()
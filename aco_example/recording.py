@@ -0,0 +1,403 @@
+"""Records the pheromone of every edge and the positions of a sample of ants while a simulation runs, and plays such a
+recording back without running the simulation again.
+
+A recording kept on disk is a directory holding frames.bin, the frames written back to back as fixed-size records,
+meta.json with the sizes of those records, and the node positions and edges of the graph as pos.npy and
+edge_nodes.npy. Every time the graph is edited during the run, the new layout is written as pos.<tick>.npy and
+edge_nodes.<tick>.npy, where tick is the tick of the first frame taken with it, and meta.json lists those ticks. When
+an edit leaves more edges than a frame has room for, the frames from then on are wider and go to frames.<tick>.bin,
+which meta.json lists with their width. Frame files are only ever appended to, so a recording cut short by a crash
+loses at most its last frame, and they are read back as memory-mapped arrays.
+
+    python -m aco_example.recording run.rec
+"""
+import json
+import os
+import sys
+
+import numpy as np
+
+from aco_example.colony import Colony
+from aco_example.fonts import fonts
+
+
+def frame_dtype(edges, ants):
+    """Returns the record type of one frame.
+
+    Args:
+        edges: The number of edges whose pheromone a frame holds.
+        ants: The number of ants whose position a frame holds.
+    """
+    return np.dtype([('tick', '<i8'), ('edges', '<i4'), ('ants', '<i4'), ('pheromone', '<f4', (edges,)),
+                     ('pos', '<f4', (ants, 2)), ('found_food', '?', (ants,))])
+
+
+class Recorder:
+    """Represents a recorder that takes a frame of a running simulation every few ticks: the pheromone of every edge
+    and the position of a fixed sample of ants. Frames go into a ring buffer allocated only once, so the latest frames
+    are always in memory, and can also be appended to a file. Taking a frame of a Colony writes straight into the
+    buffer without allocating; other colonies are sampled from the arrays Simulation.ants builds.
+
+    Nodes and edges added, removed or moved while the simulation runs renumber the graph, so the first frame taken
+    after an edit starts a new layout: a copy of the node positions and edge ends that frames from then on are drawn
+    with. A layout with more edges than a frame has room for makes the frames wider, which allocates the ring buffer
+    again with the frames in memory copied over.
+    """
+
+    def __init__(self, capacity=1000, every=60, ants=500, edges=None, path=None):
+        """Initialization method for a recorder. The buffer is allocated when the first frame is taken, once the
+        graph is known. A recorder records a single run.
+
+        Args:
+            capacity: The number of frames kept in memory.
+            every: The number of ticks between frames.
+            ants: The largest number of ants a frame holds. Larger colonies are sampled evenly.
+            edges: The number of edges a frame has room for at first. Defaults to the number of edges in the graph.
+            path: A directory to append every frame to, or None to only keep frames in memory.
+        """
+        self.capacity = capacity
+        self.every = every
+        self.max_ants = ants
+        self.max_edges = edges
+        self.path = path
+        self.dt = 1 / 60
+        # (tick, pos, edge_nodes) of every layout the frames in memory are drawn with, oldest first.
+        self.layouts = []
+        self.frames = None
+        # Every frame ever taken, of which the last capacity are in the ring buffer.
+        self.count = 0
+        self.sample = None
+        self._file = None
+        # The graph and its revision the latest layout was copied from, the ticks of the layouts on disk and the
+        # [tick, edges] of every frame file after frames.bin.
+        self._graph = None
+        self._revision = None
+        self._layout_ticks = []
+        self._widths = []
+        self._first_width = None
+
+    def _allocate(self, simulation):
+        """Allocates the ring buffer and starts the file for the graph of a simulation.
+        """
+        graph = simulation.graph
+        self.dt = simulation.dt
+        edges = graph.num_edges if self.max_edges is None else max(self.max_edges, graph.num_edges)
+        self._first_width = edges
+        self._use(np.zeros(self.capacity, dtype=frame_dtype(edges, self.max_ants)))
+        self._sampled_pos = np.zeros((self.max_ants, 2))
+        self._sampled_food = np.zeros(self.max_ants, dtype=bool)
+
+        if self.path is not None:
+            os.makedirs(self.path, exist_ok=True)
+            self._file = open(os.path.join(self.path, 'frames.bin'), 'wb')
+
+    def _use(self, frames):
+        """Makes an array the ring buffer, with views of each field so taking a frame creates no new arrays.
+        """
+        self.frames = frames
+        self._tick, self._edges, self._ants = frames['tick'], frames['edges'], frames['ants']
+        self._pheromone, self._pos, self._found_food = frames['pheromone'], frames['pos'], frames['found_food']
+
+    def _widen(self, simulation):
+        """Makes room in every frame for the edges of the graph, at least doubling the width so that a growing graph
+        only rarely allocates the buffer again. Later frames on disk go to a file of their own.
+        """
+        width = max(simulation.graph.num_edges, 2 * self._pheromone.shape[1])
+        frames = np.zeros(len(self.frames), dtype=frame_dtype(width, self.max_ants))
+        _copy_frames(self.frames, frames)
+        self._use(frames)
+        if self.path is not None:
+            self._file.close()
+            self._widths.append([simulation.ticks, width])
+            self._file = open(os.path.join(self.path, f'frames.{simulation.ticks}.bin'), 'wb')
+
+    def _start_layout(self, simulation):
+        """Copies the node positions and edge ends of the graph as the layout of the frames from this tick on, and
+        writes them to the recording before the first frame drawn with them.
+        """
+        graph = simulation.graph
+        self._graph, self._revision = graph, graph.revision
+        self.layouts.append((simulation.ticks, graph.pos.copy(), graph.edge_nodes.copy()))
+        if graph.num_edges > self._pheromone.shape[1]:
+            self._widen(simulation)
+        if self.path is None:
+            return
+
+        # The first layout keeps the plain names, so recordings of unedited graphs read as before.
+        suffix = f'.{simulation.ticks}' if self.count > 0 else ''
+        if suffix:
+            self._layout_ticks.append(simulation.ticks)
+        np.save(os.path.join(self.path, f'pos{suffix}.npy'), self.layouts[-1][1])
+        np.save(os.path.join(self.path, f'edge_nodes{suffix}.npy'), self.layouts[-1][2])
+        meta = {'every': self.every, 'dt': self.dt, 'edges': self._first_width, 'ants': self.max_ants,
+                'layouts': self._layout_ticks, 'widths': self._widths}
+        with open(os.path.join(self.path, 'meta.json.tmp'), 'w') as file:
+            json.dump(meta, file, indent=1)
+        os.replace(os.path.join(self.path, 'meta.json.tmp'), os.path.join(self.path, 'meta.json'))
+
+    def record(self, simulation):
+        """Takes a frame of a simulation if one is due on its current tick. Simulation.step calls this every tick
+        for the recorder it was given.
+
+        Args:
+            simulation: The running simulation.
+        """
+        if simulation.ticks % self.every != 0:
+            return
+        if self.frames is None:
+            self._allocate(simulation)
+        if simulation.graph is not self._graph or simulation.graph.revision != self._revision:
+            self._start_layout(simulation)
+        slot = self.count % len(self.frames)
+        self._tick[slot] = simulation.ticks
+        self._edges[slot] = simulation.graph.read_pheromone(self._pheromone[slot])
+
+        colony = simulation.colony
+        if isinstance(colony, Colony):
+            pos, found_food = colony.pos, colony.found_food
+        else:
+            pos, found_food, _ = simulation.ants()
+        if self.sample is None or len(self.sample) != min(len(pos), self.max_ants):
+            # Evenly spaced ants, so recording never draws from the simulation's random generators.
+            count = min(len(pos), self.max_ants)
+            self.sample = np.linspace(0, len(pos) - 1, count).astype(np.intp) if count > 0 else np.zeros(0, np.intp)
+        count = len(self.sample)
+        np.take(pos, self.sample, axis=0, out=self._sampled_pos[:count])
+        np.take(found_food, self.sample, out=self._sampled_food[:count])
+        self._pos[slot, :count] = self._sampled_pos[:count]
+        self._found_food[slot, :count] = self._sampled_food[:count]
+        self._ants[slot] = count
+
+        self.count += 1
+        if self._file is not None:
+            self._file.write(self.frames[slot:slot + 1].data)
+        # Layouts that no frame in memory is drawn with any more are forgotten.
+        oldest = self._tick[self.count % len(self.frames)] if self.count > len(self.frames) else self._tick[0]
+        while len(self.layouts) > 1 and self.layouts[1][0] <= oldest:
+            self.layouts.pop(0)
+
+    def flush(self):
+        """Writes the frames taken so far to the file, if there is one.
+        """
+        if self._file is not None:
+            self._file.flush()
+
+    def close(self):
+        """Closes the file, if there is one. The frames in memory are kept.
+        """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def replay(self):
+        """Returns a Replay of the frames still in memory.
+        """
+        if self.frames is None:
+            raise ValueError('No frame has been recorded yet.')
+        kept = min(self.count, len(self.frames))
+        order = (np.arange(kept) + self.count - kept) % len(self.frames)
+        _, pos, edge_nodes = self.layouts[0]
+        return Replay(self.frames[order], pos, edge_nodes, self.every, self.dt, self.layouts[1:])
+
+
+class Replay:
+    """Represents the playback of a recording. A cursor moves through the simulation ticks at any speed and shows
+    the last frame taken at or before it, so seeking to any tick is a binary search and nothing is simulated.
+    """
+
+    def __init__(self, frames, pos, edge_nodes, every=60, dt=1 / 60, layouts=()):
+        """Initialization method for a replay.
+
+        Args:
+            frames: The array of frames in the order they were taken, with a frame_dtype record type.
+            pos: Array of shape (num_nodes, 2) holding the center of every node in the first frame.
+            edge_nodes: Array of shape (num_edges, 2) holding the two node ids each edge connects in the first frame.
+            every: The number of ticks between frames.
+            dt: The simulation time covered by one tick, in seconds.
+            layouts: (tick, pos, edge_nodes) of every later layout of the graph, in the order of their ticks. Frames
+                taken at or after a layout's tick are drawn with it.
+        """
+        self.frames = frames
+        self.ticks = frames['tick']
+        self._layout_ticks = np.array([tick for tick, _, _ in layouts], dtype=np.int64)
+        self._layouts = [(pos, edge_nodes)] + [(later_pos, later_edges) for _, later_pos, later_edges in layouts]
+        self.every = every
+        self.dt = dt
+        self.cursor = float(self.ticks[0]) if len(frames) > 0 else 0.0
+        self.speed = 1.0
+        self.playing = True
+
+    @classmethod
+    def open(cls, path):
+        """Opens a recording written by a Recorder, mapping its frames instead of reading them.
+
+        Args:
+            path: The directory of the recording.
+
+        Returns:
+            The new replay.
+        """
+        with open(os.path.join(path, 'meta.json')) as file:
+            meta = json.load(file)
+        files = [('frames.bin', meta['edges'])]
+        files += [(f'frames.{tick}.bin', edges) for tick, edges in meta.get('widths', [])]
+        parts = [_map_frames(os.path.join(path, name), frame_dtype(edges, meta['ants'])) for name, edges in files]
+        if len(parts) == 1:
+            frames = parts[0]
+        else:
+            # Frames of different widths are copied into one array as wide as the widest.
+            frames = np.zeros(sum(len(part) for part in parts), dtype=parts[-1].dtype)
+            start = 0
+            for part in parts:
+                _copy_frames(part, frames[start:start + len(part)])
+                start += len(part)
+        layouts = [(tick, np.load(os.path.join(path, f'pos.{tick}.npy')),
+                    np.load(os.path.join(path, f'edge_nodes.{tick}.npy'))) for tick in meta.get('layouts', [])]
+        return cls(frames, np.load(os.path.join(path, 'pos.npy')), np.load(os.path.join(path, 'edge_nodes.npy')),
+                   meta['every'], meta['dt'], layouts)
+
+    def __len__(self):
+        return len(self.frames)
+
+    @property
+    def index(self):
+        """The index of the frame shown at the cursor."""
+        return max(int(np.searchsorted(self.ticks, self.cursor, side='right')) - 1, 0)
+
+    @property
+    def pos(self):
+        """The center of every node in the frame shown at the cursor."""
+        return self._layout()[0]
+
+    @property
+    def edge_nodes(self):
+        """The two node ids of every edge in the frame shown at the cursor."""
+        return self._layout()[1]
+
+    def _layout(self):
+        """Returns the (pos, edge_nodes) the frame at the cursor is drawn with.
+        """
+        tick = self.ticks[self.index] if len(self.frames) > 0 else 0
+        return self._layouts[int(np.searchsorted(self._layout_ticks, tick, side='right'))]
+
+    def seek(self, tick):
+        """Moves the cursor to a tick, staying within the recording.
+
+        Args:
+            tick: The simulation tick to show.
+        """
+        if len(self.frames) > 0:
+            self.cursor = float(min(max(tick, self.ticks[0]), self.ticks[-1]))
+
+    def update(self, elapsed_ms):
+        """Moves the cursor forward for a frame of wall time, stopping at the end of the recording.
+
+        Args:
+            elapsed_ms: The wall time since the previous frame, in milliseconds.
+        """
+        if self.playing and len(self.frames) > 0:
+            self.seek(self.cursor + self.speed * elapsed_ms / 1000 / self.dt)
+
+    def frame(self):
+        """Returns the frame at the cursor as (tick, pheromone, pos, found_food), each cut to what was recorded.
+        """
+        frame = self.frames[self.index]
+        edges, ants = frame['edges'], frame['ants']
+        return int(frame['tick']), frame['pheromone'][:edges], frame['pos'][:ants], frame['found_food'][:ants]
+
+    def draw(self, surface, ant_renderer=None, color=(0, 60, 180)):
+        """Draws the graph with every edge as thick and as colored as its share of the most pheromone, and the ants.
+
+        Args:
+            surface: The pygame surface to draw on.
+            ant_renderer: The AntRenderer to draw the ants with, or None to leave them out.
+            color: The color of the edge with the most pheromone.
+        """
+        import pygame
+        if len(self.frames) == 0:
+            return
+        _, pheromone, pos, found_food = self.frame()
+        nodes, edge_nodes = self._layout()
+        share = pheromone / pheromone.max() if pheromone.size > 0 and pheromone.max() > 0 else pheromone
+        ends = nodes[edge_nodes[:len(share)]].astype(int).tolist()
+        for (start, end), amount in zip(ends, share.tolist()):
+            blend = tuple(int(100 + (channel - 100) * amount) for channel in color)
+            pygame.draw.line(surface, blend, start, end, 1 + int(amount * 9))
+        for x, y in nodes.astype(int).tolist():
+            pygame.draw.circle(surface, (0, 80, 200), (x, y), 6)
+        if ant_renderer is not None:
+            ant_renderer.draw(surface, pos, found_food)
+
+
+def _copy_frames(source, target):
+    """Copies frames into as many frames with room for at least as many edges.
+    """
+    for name in ('tick', 'edges', 'ants', 'pos', 'found_food'):
+        target[name] = source[name]
+    target['pheromone'][:, :source.dtype['pheromone'].shape[0]] = source['pheromone']
+
+
+def _map_frames(path, dtype):
+    """Maps the frames in a file of a recording, leaving out a frame that was only partly written when the recorder
+    stopped.
+    """
+    count = os.path.getsize(path) // dtype.itemsize
+    return np.memmap(path, dtype=dtype, mode='r', shape=(count,)) if count > 0 else np.zeros(0, dtype=dtype)
+
+
+def view(path, speed=1.0, size=(1000, 800)):
+    """Opens a window playing a recording until it is closed. Space pauses, + and - double or halve the speed, the
+    arrow keys step one frame and Home and End jump to the start and end.
+
+    Args:
+        path: The directory of the recording.
+        speed: How many seconds of simulation time pass per second of wall time.
+        size: The size of the window.
+    """
+    import pygame
+    from aco_example.render import AntRenderer
+    replay = Replay.open(path)
+    replay.speed = speed
+    pygame.init()
+    pygame.display.set_caption('Ant Colony Optimization Replay')
+    screen = pygame.display.set_mode(size)
+    font = fonts.get('Arial', 16)
+    ant_renderer = AntRenderer(5)
+    clock = pygame.time.Clock()
+
+    running = True
+    while running:
+        elapsed = clock.tick(60)
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_ESCAPE:
+                    running = False
+                elif event.key == pygame.K_SPACE:
+                    replay.playing = not replay.playing
+                elif event.key in (pygame.K_EQUALS, pygame.K_PLUS, pygame.K_KP_PLUS):
+                    replay.speed *= 2
+                elif event.key in (pygame.K_MINUS, pygame.K_KP_MINUS):
+                    replay.speed /= 2
+                elif event.key == pygame.K_RIGHT and len(replay) > 0:
+                    replay.seek(replay.ticks[min(replay.index + 1, len(replay) - 1)])
+                elif event.key == pygame.K_LEFT and len(replay) > 0:
+                    replay.seek(replay.ticks[max(replay.index - 1, 0)])
+                elif event.key == pygame.K_HOME:
+                    replay.seek(0)
+                elif event.key == pygame.K_END and len(replay) > 0:
+                    replay.seek(replay.ticks[-1])
+
+        replay.update(elapsed)
+        screen.fill((60, 60, 60))
+        replay.draw(screen, ant_renderer)
+        tick = replay.frame()[0] if len(replay) > 0 else 0
+        status = f'tick {tick}  speed {replay.speed:g}x  {"playing" if replay.playing else "paused"}'
+        screen.blit(font.render(status, True, (255, 255, 255)), (10, 10))
+        pygame.display.flip()
+    pygame.quit()
+
+
+if __name__ == '__main__':
+    view(sys.argv[1], float(sys.argv[2]) if len(sys.argv) > 2 else 1.0)
@@ -0,0 +1,154 @@
+import numpy as np
+import pygame
+
+from aco_example.profiling import profiler
+
+
+class LayeredRenderer:
+    """Represents a renderer that keeps the graph and menu on a cached static layer. The static layer is only redrawn
+    after it is invalidated, and the ants are drawn on top of it with only the area they cover sent to the display.
+    """
+
+    def __init__(self, screen):
+        """Initialization method for a layered renderer.
+
+        Args:
+            screen: The display surface to render to.
+        """
+        self.screen = screen
+        self.static = pygame.Surface(screen.get_size())
+        self.static_dirty = True
+        self._ant_rect = None
+
+    def invalidate(self):
+        """Marks the static layer as changed so that it is redrawn on the next frame.
+        """
+        self.static_dirty = True
+
+    def render(self, draw_static, draw_ants):
+        """Renders a frame and updates the display.
+
+        Args:
+            draw_static: Callable drawing the static layer onto the surface it is given.
+            draw_ants: Callable drawing the ants onto the surface it is given and returning the pygame rectangle
+                they cover, or None if nothing was drawn.
+        """
+        if self.static_dirty:
+            with profiler.phase('static'):
+                draw_static(self.static)
+                self.screen.blit(self.static, (0, 0))
+            with profiler.phase('ants'):
+                self._ant_rect = self._clip(draw_ants(self.screen))
+            self.static_dirty = False
+            with profiler.phase('display'):
+                pygame.display.flip()
+            return
+
+        # Restore the static layer where the ants were last frame, then draw them at their new positions.
+        dirty_rects = []
+        with profiler.phase('ants'):
+            if self._ant_rect is not None:
+                self.screen.blit(self.static, self._ant_rect, self._ant_rect)
+                dirty_rects.append(self._ant_rect)
+            self._ant_rect = self._clip(draw_ants(self.screen))
+            if self._ant_rect is not None:
+                dirty_rects.append(self._ant_rect)
+        with profiler.phase('display'):
+            pygame.display.update(dirty_rects)
+
+    def _clip(self, rect):
+        """Returns the part of a rectangle that is on screen, or None if there is none.
+        """
+        if rect is None:
+            return None
+        rect = rect.clip(self.screen.get_rect())
+        return rect if rect.width > 0 and rect.height > 0 else None
+
+
+class AntRenderer:
+    """Represents a renderer that draws a whole colony of ants in bulk. Small colonies are drawn by stamping a
+    pre-rendered sprite for every ant with a single Surface.blits call, large colonies as a density heatmap built in
+    one NumPy pass and written to a surface through pygame.surfarray.
+    """
+
+    def __init__(self, radius, color=(0, 0, 0), food_color=(0, 255, 0), heatmap_above=20000, cell_size=4):
+        """Initialization method for an ant renderer.
+
+        Args:
+            radius: The radius of a single ant.
+            color: The color of an ant.
+            food_color: The color of the dot on ants that are carrying food.
+            heatmap_above: Colonies with more ants than this are drawn as a heatmap.
+            cell_size: The size in pixels of one heatmap cell.
+        """
+        self.radius = radius
+        self.heatmap_above = heatmap_above
+        self.cell_size = cell_size
+        self.sprite = self._make_sprite(color, None)
+        self.food_sprite = self._make_sprite(color, food_color)
+
+    def _make_sprite(self, color, food_color):
+        """Pre-renders the sprite for a single ant.
+        """
+        size = self.radius * 2 + 1
+        sprite = pygame.Surface((size, size))
+        sprite.fill((255, 0, 255))
+        sprite.set_colorkey((255, 0, 255))
+        pygame.draw.circle(sprite, color, (self.radius, self.radius), self.radius)
+        if food_color is not None:
+            pygame.draw.circle(sprite, food_color, (self.radius, self.radius), self.radius // 2)
+        return sprite
+
+    def draw(self, surface, pos, found_food):
+        """Draws ants on the specified surface.
+
+        Args:
+            surface: The pygame surface to draw the ants on.
+            pos: Array of shape (n, 2) holding the center of every ant.
+            found_food: Array of n booleans marking the ants that are carrying food.
+
+        Returns:
+            The pygame rectangle covering every ant, or None if there are no ants.
+        """
+        if len(pos) == 0:
+            return None
+
+        if len(pos) > self.heatmap_above:
+            self.draw_heatmap(surface, pos)
+        else:
+            self.draw_sprites(surface, pos, found_food)
+
+        low = pos.min(axis=0).astype(int) - self.radius - self.cell_size
+        high = pos.max(axis=0).astype(int) + self.radius + self.cell_size
+        return pygame.Rect(low[0], low[1], high[0] - low[0], high[1] - low[1])
+
+    def draw_sprites(self, surface, pos, found_food):
+        """Stamps the ant sprite at the position of every ant.
+        """
+        corners = (pos - self.radius).astype(int).tolist()
+        sprites = [self.food_sprite if found else self.sprite for found in found_food.tolist()]
+        surface.blits(list(zip(sprites, corners)), doreturn=False)
+
+    def draw_heatmap(self, surface, pos):
+        """Draws how many ants are in each cell of a grid, from dark red for a few ants to yellow for the most.
+        """
+        width, height = surface.get_size()
+        grid_w = -(-width // self.cell_size)
+        grid_h = -(-height // self.cell_size)
+        cell = (pos // self.cell_size).astype(np.intp)
+        on_screen = (cell[:, 0] >= 0) & (cell[:, 0] < grid_w) & (cell[:, 1] >= 0) & (cell[:, 1] < grid_h)
+        cell = cell[on_screen]
+        counts = np.bincount(cell[:, 0] * grid_h + cell[:, 1], minlength=grid_w * grid_h).reshape(grid_w, grid_h)
+        if counts.max() == 0:
+            return
+
+        heat = np.log1p(counts) / np.log1p(counts.max())
+        pixels = np.zeros((grid_w, grid_h, 3), dtype=np.uint8)
+        pixels[..., 0] = 80 + heat * 175
+        pixels[..., 1] = heat * 230
+        pixels[counts == 0] = 0
+
+        # Empty cells are left transparent through the color key.
+        heatmap = pygame.surfarray.make_surface(pixels)
+        heatmap.set_colorkey((0, 0, 0))
+        surface.blit(pygame.transform.scale(heatmap, (grid_w * self.cell_size, grid_h * self.cell_size)), (0, 0))
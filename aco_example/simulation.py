@@ -0,0 +1,455 @@
+import random
+
+import numpy as np
+
+from aco_example.ant import Ant
+from aco_example.colony import Colony
+from aco_example.flow import FlowColony
+from aco_example.graph import Graph
+
+
+class Simulation:
+    """Represents the ant colony simulation itself. It owns the nodes, paths and ants and advances them one tick at a
+    time without needing a display, so it can be run headless as fast as the machine allows. While running, the
+    nodes and paths are views over an array-backed Graph.
+
+    Every tick covers dt seconds of simulation time and evaporation happens once every evap_period seconds of
+    simulation time, so a run gives the same result however fast its ticks are executed.
+    """
+
+    def __init__(self, nodes, paths, num_ants=50, dt=1 / 60, evap_period=1.0, vectorized=True, rng=None,
+                 lazy_evaporation=False, seed=None, candidates=None, flow=False, convergence=None, recorder=None):
+        """Initialization method for a simulation.
+
+        Args:
+            nodes: The list of nodes in the graph. The colony node is the first node marked as a colony.
+            paths: The list of paths between the nodes.
+            num_ants: The number of ants to spawn per path leaving the colony node.
+            dt: The simulation time covered by one tick, in seconds.
+            evap_period: The simulation time between each round of pheromone evaporation, in seconds.
+            vectorized: Whether the ants are stored as one array-backed Colony instead of a list of Ant objects.
+            rng: The NumPy random generator used by a vectorized colony.
+            lazy_evaporation: Whether evaporation only updates the graph's global decay factor.
+            seed: Seed for the ants' decisions so that every start repeats the same run. Ignored if rng is given.
+            candidates: The number of shortest paths leaving a node that a vectorized colony's ants choose among, or
+                None to consider every path.
+            flow: Whether the ants are simulated as a FlowColony, which only counts how many ants are on each path.
+                num_ants can then be in the millions.
+            convergence: A ConvergenceMonitor deciding when the simulation has converged, or None to run until
+                stopped.
+            recorder: A Recorder taking frames of the pheromone and the ants while the simulation runs, if any.
+        """
+        self.nodes = nodes
+        self.paths = paths
+        self.num_ants = num_ants
+        self.dt = dt
+        self.evap_period = evap_period
+        self.evaporations = 0
+        self.vectorized = vectorized
+        self.seed = seed
+        self.rng = rng
+        self.lazy_evaporation = lazy_evaporation
+        self.candidates = candidates
+        self.flow = flow
+        self.convergence = convergence
+        self.recorder = recorder
+        self.graph = None
+        self.colony = []
+        self.ticks = 0
+        self.is_running = False
+        # The shortest path found so far as graph node ids, its length and the tick it was found on.
+        self.best_path = None
+        self.best_length = np.inf
+        self.best_tick = None
+        # The Node and Path objects of a running simulation by their id in the graph, and the nodes by node id. The
+        # dict is None while the simulation does not run on Node and Path objects.
+        self._node_at = []
+        self._path_at = []
+        self._node_by_id = None
+
+    @classmethod
+    def from_graph(cls, graph, **kwargs):
+        """Creates a simulation that runs directly on a graph, without any Node or Path objects. Such a simulation
+        always uses a vectorized colony.
+
+        Args:
+            graph: The graph to run on. Its pheromone is changed in place.
+            **kwargs: Passed on to the Simulation initializer.
+
+        Returns:
+            The new simulation.
+        """
+        simulation = cls([], [], **kwargs)
+        simulation.graph = graph
+        return simulation
+
+    @property
+    def time(self):
+        """The simulation time that has passed since the simulation started, in seconds.
+        """
+        return self.ticks * self.dt
+
+    @property
+    def converged(self):
+        """Whether the convergence monitor has decided that the simulation has converged.
+        """
+        return self.convergence is not None and self.convergence.converged
+
+    @property
+    def colony_node(self):
+        """The node that all ants start at and return to, or None if there are no nodes.
+        """
+        for node in self.nodes:
+            if node.is_colony:
+                return node
+        return self.nodes[0] if len(self.nodes) > 0 else None
+
+    def start(self):
+        """Spawns the ants on the colony node and starts the simulation.
+        """
+        colony_node = self.colony_node
+        self.colony = []
+        self.ticks = 0
+        self.evaporations = 0
+        self.is_running = True
+        self._forget_best()
+        self._node_by_id = None
+        if colony_node is not None:
+            self.graph = Graph.from_objects(self.nodes, self.paths, self.lazy_evaporation)
+            self._node_at = list(self.nodes)
+            self._path_at = list(self.paths)
+            self._node_by_id = {node.node_id: node for node in self.nodes}
+        if self.graph is None or self.graph.num_nodes == 0:
+            return
+
+        # Ants are a quarter of the size of the colony node they start on.
+        ant_size = colony_node.radius / 2 if colony_node is not None else 20
+        if self.vectorized or colony_node is None:
+            num_ants = self.num_ants * self.graph.degree(self.graph.colony)
+            rng = self.rng if self.rng is not None else np.random.default_rng(self.seed)
+            if self.flow:
+                self.colony = FlowColony(self.graph, num_ants, int(ant_size) // 2, rng)
+            else:
+                self.colony = Colony(self.graph, num_ants, int(ant_size) // 2, rng, self.candidates)
+            return
+
+        # Ant objects keep their position in a pygame rectangle, unlike every other part of a headless simulation.
+        import pygame
+        left_top = (colony_node.rect.centerx - ant_size / 2, colony_node.rect.centery - ant_size / 2)
+        rng = random.Random(self.seed) if self.seed is not None else None
+        for i in range(self.num_ants * len(colony_node.neighbors)):
+            self.colony.append(Ant(pygame.Rect(left_top, (ant_size, ant_size)), colony_node, rng))
+
+    def stop(self):
+        """Removes all ants and resets the pheromone on every path.
+        """
+        self.colony = []
+        self.ticks = 0
+        self.evaporations = 0
+        self.is_running = False
+        self._forget_best()
+        if self.graph is not None:
+            self.graph.reset_pheromone()
+        for path in self.paths:
+            path.pheromone = 1
+
+    def _forget_best(self):
+        """Forgets the best path and every convergence measurement.
+        """
+        self.best_path = None
+        self.best_length = np.inf
+        self.best_tick = None
+        if self.convergence is not None:
+            self.convergence.reset()
+
+    def _offer(self, length, path):
+        """Keeps a path from the colony to food if it is shorter than the best one so far.
+
+        Args:
+            length: The length of the path.
+            path: The graph node ids along the path.
+        """
+        if length < self.best_length:
+            self.best_length = length
+            self.best_path = path
+            self.best_tick = self.ticks
+
+    def add_node(self, node):
+        """Adds a node to the graph of a running simulation. Nothing else changes, so the ants carry on as they were.
+
+        Args:
+            node: The new node. It must already be in the node list.
+        """
+        if not self._editable():
+            return
+        node.bind(self.graph, self.graph.add_node(node.rect.centerx, node.rect.centery, node.is_colony, node.has_food))
+        self._node_at.append(node)
+        self._node_by_id[node.node_id] = node
+        self._graph_changed()
+
+    def remove_node(self, node):
+        """Removes a node and its paths from the graph of a running simulation. The pheromone of every other path is
+        kept, except around the node's former neighbors, and ants whose path went through the node are repaired.
+
+        Args:
+            node: The node to remove. It must already be gone from the node list.
+        """
+        if not self._editable() or node.graph is not self.graph:
+            return
+        graph = self.graph
+        index = node.index
+        offsets, neighbors, _ = graph.csr()
+        around = neighbors[offsets[index]:offsets[index + 1]]
+        edge_map, origin = np.arange(graph.num_edges), np.arange(graph.num_edges)
+        # Removing an edge can move another one of the node's edges to a new id, so they are looked up each time.
+        incident = graph.incident_edges(index)
+        while incident:
+            self._remove_edge(incident[0], edge_map, origin)
+            incident = graph.incident_edges(index)
+
+        node_map = np.arange(graph.num_nodes)
+        node_map[index] = -1
+        moved = graph.remove_node(index)
+        last = self._node_at.pop()
+        if moved is not None:
+            node_map[moved] = index
+            self._node_at[index] = last
+            last.bind(graph, index)
+        del self._node_by_id[node.node_id]
+        node.graph = None
+        self._reinitialize(node_map[around])
+        self._graph_changed(node_map, edge_map)
+
+    def add_path(self, path):
+        """Adds a path to the graph of a running simulation. The new path and the others around its two nodes start
+        from the average pheromone of those paths, so the ants learn that neighborhood again.
+
+        Args:
+            path: The new path. It must already be in the path list, and its nodes in the graph.
+        """
+        if not self._editable():
+            return
+        u, v = path.node1.index, path.node2.index
+        path.bind(self.graph, self.graph.add_edge(u, v, 1.0, path.phero_evap))
+        self._path_at.append(path)
+        self._reinitialize([u, v])
+        self._graph_changed()
+
+    def remove_path(self, path):
+        """Removes a path from the graph of a running simulation, keeping the pheromone of every path except those
+        around its two nodes. Ants whose path used it are repaired.
+
+        Args:
+            path: The path to remove. It must already be gone from the path list.
+        """
+        if not self._editable() or path.graph is not self.graph:
+            return
+        edge_map, origin = np.arange(self.graph.num_edges), np.arange(self.graph.num_edges)
+        self._remove_edge(path.edge_id, edge_map, origin)
+        self._reinitialize([path.node1.index, path.node2.index])
+        self._graph_changed(None, edge_map)
+
+    def move_node(self, node, x, y):
+        """Moves a node, which changes the length of its paths. In a running simulation the paths around the node
+        start from their average pheromone again.
+
+        Args:
+            node: The node to move.
+            x: The new x-coordinate of the top left of the node.
+            y: The new y-coordinate of the top left of the node.
+        """
+        node.update(x, y)
+        if self._editable() and node.graph is self.graph:
+            self._reinitialize([node.index])
+            self._graph_changed()
+
+    def set_food(self, node, has_food):
+        """Adds food to or removes it from a node. In a running simulation the paths around the node start from
+        their average pheromone again.
+
+        Args:
+            node: The node to change.
+            has_food: Whether the node holds food.
+        """
+        node.has_food = has_food
+        if self._editable() and node.graph is self.graph:
+            self._reinitialize([node.index])
+            self._graph_changed()
+
+    def _editable(self):
+        """Whether the simulation is running on a graph built from its Node and Path objects.
+        """
+        return self.is_running and self._node_by_id is not None
+
+    def _remove_edge(self, edge, edge_map, origin):
+        """Removes an edge from the graph and binds the path that took over its id.
+
+        Args:
+            edge: The current id of the edge.
+            edge_map: Array mapping every edge id from before the edit to its current id, updated in place.
+            origin: Array mapping every current edge id to its id from before the edit, updated in place.
+        """
+        removed = self._path_at[edge]
+        moved = self.graph.remove_edge(edge)
+        edge_map[origin[edge]] = -1
+        last = self._path_at.pop()
+        if moved is not None:
+            origin[edge] = origin[moved]
+            edge_map[origin[edge]] = edge
+            self._path_at[edge] = last
+            last.bind(self.graph, edge)
+        removed.graph = None
+
+    def _reinitialize(self, nodes):
+        """Sets the pheromone of every path touching some nodes to the average of those paths.
+
+        Args:
+            nodes: The graph ids of the nodes. Negative ids are skipped.
+        """
+        incident = self.graph.incident_edges
+        edges = np.unique([edge for node in nodes if node >= 0 for edge in incident(int(node))]).astype(np.intp)
+        if edges.size > 0:
+            self.graph.set_pheromone(edges, self.graph.pheromone_of(edges).mean())
+
+    def _graph_changed(self, node_map=None, edge_map=None):
+        """Carries the ants and the best path over to the edited graph.
+
+        Args:
+            node_map: Array mapping every old node id to its new id, or -1 for removed nodes, if any were removed.
+            edge_map: Array mapping every old edge id to its new id, or -1 for removed edges, if any were removed.
+        """
+        if self.graph.num_nodes == 0:
+            # Without nodes there is nothing left for the ants to walk on.
+            self.colony = []
+        elif isinstance(self.colony, (Colony, FlowColony)):
+            self.colony.remap(node_map, edge_map)
+        else:
+            for ant in self.colony:
+                ant.repair(self._node_by_id)
+
+        # The best path is only kept while all of it still exists, and is measured again.
+        path = self.best_path
+        if path is not None and node_map is not None:
+            path = node_map[np.asarray(path)]
+        edges = [self.graph.edge_id(int(u), int(v)) for u, v in zip(path[:-1], path[1:])] if path is not None else []
+        if path is not None and min(path) >= 0 and None not in edges:
+            self.best_path = path
+            self.best_length = float(self.graph.length[edges].sum()) if edges else 0.0
+        else:
+            self._forget_best()
+        if isinstance(self.colony, (Colony, FlowColony)):
+            self.colony.best_path = self.best_path
+            self.colony.best_length = self.best_length
+        if self.convergence is not None:
+            self.convergence.reset()
+
+    def evaporate(self):
+        """Evaporates pheromone from every path.
+        """
+        if self.graph is not None:
+            self.graph.evaporate()
+
+    def step(self, n=1):
+        """Advances the simulation by a number of ticks.
+
+        Args:
+            n: The number of ticks to advance.
+        """
+        if not self.is_running:
+            return
+
+        for _ in range(n):
+            self.ticks += 1
+            # The small tolerance keeps e.g. 60 ticks of 1 / 60 seconds from falling just short of one second.
+            while self.evaporations < int(self.time / self.evap_period + 1e-9):
+                self.evaporations += 1
+                self.evaporate()
+
+            if isinstance(self.colony, (Colony, FlowColony)):
+                self.colony.step()
+                if self.colony.best_length < self.best_length:
+                    self._offer(self.colony.best_length, self.colony.best_path)
+            else:
+                for ant in self.colony:
+                    if not ant.at_node:
+                        ant.move()
+                        continue
+                    found_food = ant.found_food
+                    ant.choose()
+                    if ant.found_food and not found_food and ant.path_length < self.best_length:
+                        self._offer(ant.path_length, [self._node_by_id[node_id].index for node_id in ant.path])
+
+            if self.recorder is not None:
+                self.recorder.record(self)
+            monitor = self.convergence
+            if monitor is not None and self.ticks % monitor.interval == 0 and monitor.update(self) and monitor.stop:
+                self.is_running = False
+                return
+
+    def ants(self):
+        """Returns the state of every ant needed to draw it.
+
+        Returns:
+            (pos, found_food, radius) where pos is an array of shape (n, 2) holding the center of every ant,
+            found_food marks the ants carrying food and radius is the radius ants are drawn with.
+        """
+        if isinstance(self.colony, FlowColony):
+            pos, found_food = self.colony.groups()
+            return pos, found_food, self.colony.radius
+        if isinstance(self.colony, Colony):
+            return self.colony.pos, self.colony.found_food, self.colony.radius
+        pos = np.array([ant.rect.center for ant in self.colony], dtype=float).reshape(-1, 2)
+        found_food = np.array([ant.found_food for ant in self.colony], dtype=bool)
+        return pos, found_food, self.colony[0].radius if self.colony else 0
+
+    def share_on_route(self, on_route):
+        """Returns the share of ants whose last two nodes are both on a route.
+
+        Args:
+            on_route: Bool array marking the graph nodes on the route.
+        """
+        if isinstance(self.colony, FlowColony):
+            return self.colony.share_on_route(on_route)
+        if isinstance(self.colony, Colony):
+            came = (self.colony.prev < 0) | on_route[np.maximum(self.colony.prev, 0)]
+            return float(np.mean(on_route[self.colony.curr] & came)) if len(self.colony) > 0 else 0.0
+        if len(self.colony) == 0:
+            return 0.0
+        on = [on_route[ant.curr_node.index] and (ant.prev_node is None or on_route[ant.prev_node.index])
+              for ant in self.colony]
+        return float(sum(on) / len(on))
+
+    def draw_ants(self, surface):
+        """Draws every ant on the specified surface.
+
+        Args:
+            surface: The pygame surface to draw the ants on.
+
+        Returns:
+            The pygame rectangle covering every ant, or None if there are no ants.
+        """
+        if isinstance(self.colony, (Colony, FlowColony)):
+            return self.colony.draw(surface)
+        if len(self.colony) == 0:
+            return None
+        for ant in self.colony:
+            ant.draw(surface)
+        return self.colony[0].rect.unionall([ant.rect for ant in self.colony]).inflate(2, 2)
+
+    def run_until(self, predicate, max_steps=None):
+        """Advances the simulation until a condition holds or a number of ticks have passed.
+
+        Args:
+            predicate: Callable taking this simulation and returning True once the simulation should stop.
+            max_steps: The maximum number of ticks to advance, or None to run until the predicate holds.
+
+        Returns:
+            The number of ticks that were advanced.
+        """
+        steps = 0
+        while self.is_running and not predicate(self):
+            if max_steps is not None and steps >= max_steps:
+                break
+            self.step()
+            steps += 1
+        return steps
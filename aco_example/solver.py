@@ -0,0 +1,347 @@
+from collections import namedtuple
+
+import numpy as np
+
+from aco_example.colony import expand_segments, roulette
+
+# The best path found by a solver: the node ids along it, the edge ids between them, its length and the iteration
+# it was found in.
+Solution = namedtuple('Solution', ['nodes', 'edges', 'length', 'iteration'])
+
+
+class AntSystem:
+    """Represents the classic iteration-based Ant System. Every iteration, each ant builds a loop-free path from the
+    source to one of the targets, choosing edges with probability proportional to pheromone ** alpha times
+    (1 / length) ** beta. Pheromone then evaporates by rho and every ant that arrived lays q / length on its path.
+
+    Unlike Simulation, a solver does not animate anything and keeps its own pheromone, so the graph is not changed.
+    """
+
+    def __init__(self, graph, n_ants=20, alpha=1.0, beta=2.0, rho=0.1, q=1.0, source=None, targets=None, rng=None,
+                 candidates=None):
+        """Initialization method for a solver.
+
+        Args:
+            graph: The graph to solve on, for example Graph.from_objects(nodes, paths).
+            n_ants: The number of ants building a path each iteration.
+            alpha: How strongly ants follow pheromone.
+            beta: How strongly ants prefer short edges.
+            rho: The fraction of pheromone that evaporates each iteration.
+            q: The amount of pheromone an ant lays, divided by the length of its path.
+            source: The node id all ants start at. Defaults to the graph's colony node.
+            targets: The node ids the ants are looking for. Defaults to every node that holds food.
+            rng: The NumPy random generator used for the ants' decisions.
+            candidates: The number of shortest edges leaving a node that ants choose among, or None to consider
+                every edge. Ants fall back to every edge when all of the candidates lead to visited nodes.
+        """
+        self.graph = graph
+        self.n_ants = n_ants
+        self.alpha = alpha
+        self.beta = beta
+        self.rho = rho
+        self.q = q
+        self.candidates = candidates
+        self.source = graph.colony if source is None else source
+        self.rng = rng if rng is not None else np.random.default_rng()
+
+        self.is_target = np.zeros(graph.num_nodes, dtype=bool)
+        self.is_target[np.flatnonzero(graph.has_food) if targets is None else targets] = True
+        if not self.is_target.any():
+            raise ValueError('A solver needs at least one target node.')
+
+        self.offsets, self.adj_node, self.adj_edge = graph.csr()
+        self.length = graph.length
+        self.heuristic = graph.heuristic(beta)
+        self.pheromone = np.full(graph.num_edges, self.initial_pheromone())
+        self.iteration = 0
+        self.best = None
+
+    def initial_pheromone(self):
+        """Returns the pheromone level every edge starts with.
+        """
+        return 1.0
+
+    def run(self, iterations):
+        """Runs a number of iterations.
+
+        Args:
+            iterations: The number of iterations to run.
+
+        Returns:
+            The best solution found so far, or None if no ant has reached a target yet.
+        """
+        for _ in range(iterations):
+            self.iterate()
+        return self.best
+
+    def iterate(self):
+        """Runs a single iteration: every ant builds a path, then the pheromone is updated.
+
+        Returns:
+            The best solution of this iteration, or None if no ant reached a target.
+        """
+        self.iteration += 1
+        nodes, edges, lengths, arrived = self.construct()
+        iteration_best = None
+        if arrived.any():
+            ant = np.flatnonzero(arrived)[np.argmin(lengths[arrived])]
+            iteration_best = self._solution(nodes[:, ant], edges[:, ant], lengths[ant])
+            if self.best is None or iteration_best.length < self.best.length:
+                self.best = iteration_best
+        self.update(edges, lengths, arrived, iteration_best)
+        return iteration_best
+
+    def _solution(self, nodes, edges, length):
+        """Builds a Solution from one column of the construction arrays.
+        """
+        edges = edges[edges >= 0]
+        return Solution(nodes[:len(edges) + 1].tolist(), edges.tolist(), float(length), self.iteration)
+
+    def weights(self, edges):
+        """Returns how attractive some edges are to an ant.
+
+        Args:
+            edges: Array of edge ids.
+        """
+        return self.pheromone[edges] ** self.alpha * self.heuristic[edges]
+
+    def select(self, weight, seg_start, seg_end):
+        """Picks one candidate edge for each ant.
+
+        Args:
+            weight: The attractiveness of every candidate, already zero for visited nodes.
+            seg_start: The index of each ant's first candidate.
+            seg_end: One past the index of each ant's last candidate.
+
+        Returns:
+            (pick, total) as returned by roulette.
+        """
+        return roulette(weight, seg_start, seg_end, self.rng)
+
+    def on_move(self, edges):
+        """Called with the edges the ants just walked, before the next construction step.
+        """
+
+    def construct(self):
+        """Lets every ant build a loop-free path from the source until it reaches a target or gets stuck.
+
+        Returns:
+            (nodes, edges, lengths, arrived) where column k of nodes and edges holds the nodes visited and edges
+            walked by ant k, padded with -1, and arrived marks the ants that reached a target.
+        """
+        num_nodes = self.graph.num_nodes
+        ants = np.arange(self.n_ants)
+        nodes = np.full((num_nodes, self.n_ants), -1, dtype=np.intp)
+        edges = np.full((num_nodes, self.n_ants), -1, dtype=np.intp)
+        nodes[0] = self.source
+        lengths = np.zeros(self.n_ants)
+        arrived = np.full(self.n_ants, self.is_target[self.source])
+        visited = np.zeros((self.n_ants, num_nodes), dtype=bool)
+        visited[:, self.source] = True
+
+        active = ants[~arrived]
+        step = 0
+        while active.size > 0 and step < num_nodes - 1:
+            curr = nodes[step, active]
+            active = active[self.offsets[curr + 1] > self.offsets[curr]]
+            if active.size == 0:
+                break
+
+            if self.candidates is None:
+                active, next_node, edge = self._choose(active, nodes[step], visited, self.graph.csr())
+            else:
+                moved, next_node, edge = self._choose(active, nodes[step], visited,
+                                                      self.graph.candidates(self.candidates))
+                rest = np.setdiff1d(active, moved, assume_unique=True)
+                rest, rest_node, rest_edge = self._choose(rest, nodes[step], visited, self.graph.csr())
+                active = np.concatenate((moved, rest))
+                next_node = np.concatenate((next_node, rest_node))
+                edge = np.concatenate((edge, rest_edge))
+
+            step += 1
+            nodes[step, active] = next_node
+            edges[step - 1, active] = edge
+            lengths[active] += self.length[edge]
+            visited[active, next_node] = True
+            self.on_move(edge)
+
+            reached = self.is_target[next_node]
+            arrived[active[reached]] = True
+            active = active[~reached]
+        return nodes, edges, lengths, arrived
+
+    def _choose(self, active, curr, visited, lists):
+        """Lets ants pick their next edge from the neighbor lists of their current nodes.
+
+        Args:
+            active: The ants choosing.
+            curr: The node every ant is at, indexed by ant.
+            visited: Which nodes every ant has visited.
+            lists: (offsets, neighbors, edges) laid out like the result of Graph.csr.
+
+        Returns:
+            (ants, nodes, edges) for the ants that could pick an unvisited neighbor.
+        """
+        offsets, adj_node, adj_edge = lists
+        start = offsets[curr[active]]
+        seg_start, seg_end, owner, slot = expand_segments(start, offsets[curr[active] + 1] - start)
+        neighbor = adj_node[slot]
+        edge = adj_edge[slot]
+        weight = self.weights(edge)
+        weight[visited[active[owner], neighbor]] = 0
+
+        pick, total = self.select(weight, seg_start, seg_end)
+        chosen = total > 0
+        return active[chosen], neighbor[pick[chosen]], edge[pick[chosen]]
+
+    def evaporate(self):
+        """Evaporates pheromone from every edge.
+        """
+        self.pheromone *= 1 - self.rho
+
+    def deposit(self, edges, amount):
+        """Lays pheromone along the paths of some ants.
+
+        Args:
+            edges: Array of shape (steps, ants) with the edges each ant walked, padded with -1.
+            amount: The pheromone each ant lays on every edge of its path.
+        """
+        walked = edges >= 0
+        np.add.at(self.pheromone, edges[walked], np.broadcast_to(amount, edges.shape)[walked])
+
+    def update(self, edges, lengths, arrived, iteration_best):
+        """Updates the pheromone at the end of an iteration.
+
+        Args:
+            edges: The edges walked by every ant, as returned by construct.
+            lengths: The length of every ant's path.
+            arrived: Which ants reached a target.
+            iteration_best: The best solution of this iteration, or None.
+        """
+        self.evaporate()
+        self.deposit(edges[:, arrived], self.q / np.maximum(lengths[arrived], 1e-12))
+
+
+class MaxMinAntSystem(AntSystem):
+    """Represents the MAX-MIN Ant System. Only the best ant lays pheromone and every edge's pheromone is kept
+    between a lower and an upper bound, which keeps the colony exploring instead of stagnating early.
+    """
+
+    def __init__(self, graph, n_ants=20, alpha=1.0, beta=2.0, rho=0.02, q=1.0, source=None, targets=None,
+                 rng=None, p_best=0.05, use_global_best=False, candidates=None):
+        """Initialization method for a MAX-MIN Ant System.
+
+        Args:
+            p_best: The probability of building the best path once converged, used to derive the lower bound.
+            use_global_best: Whether the best path so far lays pheromone instead of the iteration's best path.
+
+        See AntSystem for the other arguments.
+        """
+        self.p_best = p_best
+        self.use_global_best = use_global_best
+        self.tau_max = 1.0
+        self.tau_min = 0.0
+        self._bounds_known = False
+        super().__init__(graph, n_ants, alpha, beta, rho, q, source, targets, rng, candidates)
+
+    def initial_pheromone(self):
+        # Starting at the upper bound makes the first iterations explore.
+        return self.tau_max
+
+    def _update_bounds(self):
+        """Derives the pheromone bounds from the length of the best path so far.
+        """
+        self.tau_max = self.q / (self.rho * max(self.best.length, 1e-12))
+        root = self.p_best ** (1 / max(self.graph.num_nodes, 1))
+        choices = self.graph.num_edges * 2 / max(self.graph.num_nodes, 1)
+        # Sparse graphs and isolated nodes can average one edge per node or less, which leaves one other choice.
+        others = choices - 1 if choices > 1 else 1
+        self.tau_min = min(self.tau_max * (1 - root) / (others * root), self.tau_max)
+
+    def update(self, edges, lengths, arrived, iteration_best):
+        self.evaporate()
+        best = self.best if self.use_global_best else iteration_best
+        if best is not None:
+            if not self._bounds_known:
+                # Once the first path is known the bounds exist, and every edge starts over at the upper bound.
+                self._update_bounds()
+                self.pheromone[:] = self.tau_max
+                self._bounds_known = True
+            self._update_bounds()
+            self.pheromone[best.edges] += self.q / max(best.length, 1e-12)
+        # Iterations in which no ant reached food still evaporate, so they are held to the bounds as well.
+        np.clip(self.pheromone, self.tau_min, self.tau_max, out=self.pheromone)
+
+
+class AntColonySystem(AntSystem):
+    """Represents the Ant Colony System. Ants take the most attractive edge with probability q0 and otherwise choose
+    like in the Ant System, every edge an ant walks loses some pheromone straight away (the local update), and only
+    the best path so far lays pheromone at the end of an iteration.
+    """
+
+    def __init__(self, graph, n_ants=10, alpha=1.0, beta=2.0, rho=0.1, q=1.0, source=None, targets=None,
+                 rng=None, q0=0.9, xi=0.1, tau0=None, candidates=None):
+        """Initialization method for an Ant Colony System.
+
+        Args:
+            q0: The probability of greedily taking the most attractive edge.
+            xi: The fraction of pheromone pulled back towards tau0 on every edge an ant walks.
+            tau0: The initial pheromone level. Defaults to 1 / (number of nodes * mean edge length).
+
+        See AntSystem for the other arguments.
+        """
+        self.q0 = q0
+        self.xi = xi
+        self.tau0 = tau0
+        super().__init__(graph, n_ants, alpha, beta, rho, q, source, targets, rng, candidates)
+
+    def initial_pheromone(self):
+        if self.tau0 is None:
+            mean_length = float(self.length.mean()) if len(self.length) > 0 else 1.0
+            self.tau0 = 1 / (max(self.graph.num_nodes, 1) * max(mean_length, 1e-12))
+        return self.tau0
+
+    def select(self, weight, seg_start, seg_end):
+        pick, total = roulette(weight, seg_start, seg_end, self.rng)
+        greedy = self.rng.random(len(seg_start)) < self.q0
+        if greedy.any():
+            # The first candidate holding its segment's largest weight.
+            best = np.maximum.reduceat(weight, seg_start)
+            owner = np.repeat(np.arange(len(seg_start)), seg_end - seg_start)
+            index = np.where(weight == best[owner], np.arange(len(weight)), len(weight))
+            pick = np.where(greedy, np.minimum.reduceat(index, seg_start), pick)
+        return pick, total
+
+    def on_move(self, edges):
+        self.pheromone[edges] = (1 - self.xi) * self.pheromone[edges] + self.xi * self.tau0
+
+    def update(self, edges, lengths, arrived, iteration_best):
+        if self.best is None:
+            return
+        best = np.array(self.best.edges, dtype=np.intp)
+        self.pheromone[best] = (1 - self.rho) * self.pheromone[best] + self.rho * self.q / max(self.best.length, 1e-12)
+
+
+# The solvers that can be selected by name.
+VARIANTS = {
+    'as': AntSystem,
+    'mmas': MaxMinAntSystem,
+    'acs': AntColonySystem,
+}
+
+
+def solve(graph, variant='as', iterations=100, **params):
+    """Solves for the shortest path from the colony to food with an iteration-based ant colony algorithm.
+
+    Args:
+        graph: The graph to solve on.
+        variant: One of 'as' (Ant System), 'mmas' (MAX-MIN Ant System) or 'acs' (Ant Colony System).
+        iterations: The number of iterations to run.
+        **params: Passed on to the solver, e.g. n_ants, alpha, beta, rho and q.
+
+    Returns:
+        The best Solution found, or None if no ant ever reached a target.
+    """
+    if variant not in VARIANTS:
+        raise ValueError(f'Unknown solver variant {variant!r}, expected one of {", ".join(VARIANTS)}.')
+    return VARIANTS[variant](graph, **params).run(iterations)
@@ -0,0 +1,115 @@
+class GridIndex:
+    """Represents a uniform grid over the screen that buckets nodes by the cell their center is in. Finding the nodes
+    under the mouse or touching a rectangle only looks at the few cells around it instead of at every node.
+    Nodes keep it up to date themselves whenever Node.update moves them.
+    """
+
+    def __init__(self, cell_size=80):
+        """Initialization method for a grid index.
+
+        Args:
+            cell_size: The width and height of a cell, ideally about the size of a node.
+        """
+        self.cell_size = cell_size
+        self.max_extent = 0
+        self._cells = {}
+        self._node_cell = {}
+
+    def _cell(self, x, y):
+        return int(x // self.cell_size), int(y // self.cell_size)
+
+    def insert(self, node):
+        """Adds a node to the index and makes the node report its moves to it.
+
+        Args:
+            node: The node to add.
+        """
+        cell = self._cell(*node.rect.center)
+        self._cells.setdefault(cell, {})[node.node_id] = node
+        self._node_cell[node.node_id] = cell
+        self.max_extent = max(self.max_extent, node.rect.width // 2 + 1, node.rect.height // 2 + 1)
+        node.spatial_index = self
+
+    def remove(self, node):
+        """Removes a node from the index.
+
+        Args:
+            node: The node to remove.
+        """
+        cell = self._node_cell.pop(node.node_id, None)
+        if cell is None:
+            return
+        bucket = self._cells[cell]
+        del bucket[node.node_id]
+        if not bucket:
+            del self._cells[cell]
+        node.spatial_index = None
+
+    def move(self, node):
+        """Moves a node to the cell of its current position.
+
+        Args:
+            node: The node that moved.
+        """
+        cell = self._cell(*node.rect.center)
+        old = self._node_cell.get(node.node_id)
+        if old == cell or old is None:
+            return
+        bucket = self._cells[old]
+        del bucket[node.node_id]
+        if not bucket:
+            del self._cells[old]
+        self._cells.setdefault(cell, {})[node.node_id] = node
+        self._node_cell[node.node_id] = cell
+
+    def clear(self):
+        """Removes every node from the index.
+        """
+        for bucket in self._cells.values():
+            for node in bucket.values():
+                node.spatial_index = None
+        self._cells.clear()
+        self._node_cell.clear()
+
+    def _nearby(self, left, top, right, bottom):
+        """Yields every node whose center is in a cell overlapping a rectangle.
+        """
+        x0, y0 = self._cell(left, top)
+        x1, y1 = self._cell(right, bottom)
+        for x in range(x0, x1 + 1):
+            for y in range(y0, y1 + 1):
+                bucket = self._cells.get((x, y))
+                if bucket:
+                    yield from bucket.values()
+
+    def query_point(self, x, y, radius):
+        """Returns the nodes whose center is within a distance of a point, oldest node first.
+
+        Args:
+            x: The x-coordinate of the point.
+            y: The y-coordinate of the point.
+            radius: The largest distance from the point.
+        """
+        hits = []
+        for node in self._nearby(x - radius, y - radius, x + radius, y + radius):
+            dx = node.rect.centerx - x
+            dy = node.rect.centery - y
+            if dx ** 2 + dy ** 2 <= radius ** 2:
+                hits.append(node)
+        hits.sort(key=lambda node: node.node_id)
+        return hits
+
+    def query_rect(self, rect):
+        """Returns the nodes whose rectangle collides with a rectangle, oldest node first.
+
+        Args:
+            rect: The pygame rectangle to test against.
+        """
+        extent = self.max_extent
+        nearby = self._nearby(rect.left - extent, rect.top - extent, rect.right + extent, rect.bottom + extent)
+        hits = [node for node in nearby if node.rect.colliderect(rect)]
+        hits.sort(key=lambda node: node.node_id)
+        return hits
+
+    def __len__(self):
+        return len(self._node_cell)
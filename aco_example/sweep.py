@@ -0,0 +1,140 @@
+"""Runs the simulation headless for every combination of a grid of parameters, spread over a pool of processes.
+Every process loads the graph once and then runs one combination after another on it.
+"""
+import itertools
+import multiprocessing
+import time
+
+import numpy as np
+
+from aco_example.convergence import ConvergenceMonitor
+from aco_example.graph_io import load_graph
+from aco_example.simulation import Simulation
+
+# The parameters a sweep varies, in the order their values are combined.
+PARAMETERS = ('alpha', 'beta', 'evap', 'q', 'num_ants', 'seed')
+
+# The graph loaded by the current worker process.
+_graph = None
+_options = {}
+
+
+def grid(alpha=(1.0,), beta=(0.0,), evap=(0.1,), q=(1.0,), num_ants=(50,), seed=(0,)):
+    """Returns every combination of some parameter values.
+
+    Args:
+        alpha: The values of the pheromone exponent.
+        beta: The values of the path length exponent.
+        evap: The values of the fraction of pheromone each path loses when it evaporates, like Path.phero_evap.
+        q: The values of the amount of pheromone an ant lays, divided by the length of its path.
+        num_ants: The values of the number of ants per path leaving the colony node.
+        seed: The seeds to repeat every other combination with.
+
+    Returns:
+        A list of dicts, one per combination, keyed by the names in PARAMETERS.
+    """
+    values = (alpha, beta, evap, q, num_ants, seed)
+    return [dict(zip(PARAMETERS, combination)) for combination in itertools.product(*values)]
+
+
+def prepare(graph, colony=0, food=None):
+    """Marks the colony and food nodes of a graph loaded from a file, which has neither.
+
+    Args:
+        graph: The graph to mark.
+        colony: The id of the colony node.
+        food: The ids of the food nodes. Defaults to the node farthest from the colony.
+
+    Returns:
+        The graph.
+    """
+    if food is None:
+        food = [int(np.argmax(np.hypot(*(graph.pos - graph.pos[colony]).T)))]
+    graph.is_colony[:] = False
+    graph.is_colony[colony] = True
+    graph.has_food[:] = False
+    graph.has_food[list(food)] = True
+    return graph
+
+
+def run_case(graph, params, ticks=3600, patience=None, entropy_below=None, dominant_above=None, **kwargs):
+    """Runs the simulation once on a graph and measures it. The graph's pheromone is reset first.
+
+    Args:
+        graph: The graph to run on, with its colony and food marked.
+        params: A dict holding a value for every name in PARAMETERS.
+        ticks: The largest number of ticks to run.
+        patience: The number of ticks without a shorter path after which the run may stop early.
+        entropy_below: If given, the run only stops early once the pheromone entropy along the dominant route is
+            below this value.
+        dominant_above: If given, the run only stops early once the share of ants on the dominant route is above
+            this value.
+        **kwargs: Passed on to Simulation, e.g. flow or candidates.
+
+    Returns:
+        A dict with the parameters and the measurements.
+    """
+    graph.reset_pheromone()
+    graph.phero_evap[:] = params['evap']
+    monitor = ConvergenceMonitor(patience, entropy_below, dominant_above)
+    simulation = Simulation.from_graph(graph, num_ants=params['num_ants'], seed=params['seed'], convergence=monitor,
+                                       **kwargs)
+    simulation.start()
+    colony = simulation.colony
+    colony.alpha = params['alpha']
+    colony.beta = params['beta']
+    colony.q = params['q']
+
+    start = time.perf_counter()
+    simulation.step(ticks)
+    seconds = time.perf_counter() - start
+    monitor.update(simulation)
+
+    result = dict(params)
+    result.update({
+        'ants': len(colony),
+        'ticks': simulation.ticks,
+        'seconds': seconds,
+        'ticks_per_sec': simulation.ticks / seconds,
+        'ant_steps_per_sec': simulation.ticks * len(colony) / seconds,
+        'best_length': None if simulation.best_tick is None else float(simulation.best_length),
+        'best_tick': simulation.best_tick,
+        'convergence_tick': monitor.converged_at,
+    })
+    result.update(monitor.metrics())
+    return result
+
+
+def sweep(path, cases, processes=None, file_format=None, colony=0, food=None, load_options=None, **kwargs):
+    """Runs every case on a graph file in a pool of processes.
+
+    Args:
+        path: The graph file, in any format load_graph reads.
+        cases: The parameter dicts to run, e.g. from grid.
+        processes: The number of processes. Defaults to the number of CPUs.
+        file_format: The format of the file, if it cannot be told from its extension.
+        colony: The id of the colony node.
+        food: The ids of the food nodes. Defaults to the node farthest from the colony.
+        load_options: Dict of extra arguments for the loader, e.g. {'neighbors': 10} for TSPLIB instances.
+        **kwargs: Passed on to run_case, e.g. ticks, patience, flow or candidates.
+
+    Yields:
+        The result dict of every case, in the order the runs finish.
+    """
+    loading = (path, file_format, colony, food, load_options or {}, kwargs)
+    with multiprocessing.Pool(processes, initializer=_load, initargs=loading) as pool:
+        yield from pool.imap_unordered(_run, cases)
+
+
+def _load(path, file_format, colony, food, load_options, kwargs):
+    """Loads the graph of a sweep in a worker process.
+    """
+    global _graph, _options
+    _graph = prepare(load_graph(path, file_format, **load_options), colony, food)
+    _options = kwargs
+
+
+def _run(params):
+    """Runs one case of a sweep in a worker process.
+    """
+    return run_case(_graph, params, **_options)
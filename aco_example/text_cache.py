@@ -0,0 +1,54 @@
+from collections import OrderedDict
+
+from aco_example.profiling import profiler
+
+
+class TextCache:
+    """Represents a cache of rendered text surfaces keyed by (font, text, antialias, color). Rasterizing text is one
+    of the most expensive parts of drawing a frame, while the labels on screen rarely change.
+    """
+
+    def __init__(self, max_size=512):
+        """Initialization method for a text cache.
+
+        Args:
+            max_size: The number of surfaces to keep before the least recently used one is evicted.
+        """
+        self.max_size = max_size
+        self.renders = 0
+        self._surfaces = OrderedDict()
+
+    def render(self, font, text, color, antialias=True):
+        """Returns the surface for a piece of text, only rendering it if it is not cached yet.
+
+        Args:
+            font: The pygame font to render the text with.
+            text: The text to render.
+            color: The color of the text.
+            antialias: Whether the text should have smooth edges.
+        """
+        key = (font, text, antialias, tuple(color))
+        surface = self._surfaces.get(key)
+        if surface is not None:
+            self._surfaces.move_to_end(key)
+            return surface
+
+        surface = font.render(text, antialias, color)
+        self.renders += 1
+        profiler.count('font_renders')
+        self._surfaces[key] = surface
+        if len(self._surfaces) > self.max_size:
+            self._surfaces.popitem(last=False)
+        return surface
+
+    def clear(self):
+        """Removes every surface from the cache.
+        """
+        self._surfaces.clear()
+
+    def __len__(self):
+        return len(self._surfaces)
+
+
+# The cache shared by every node, path and button.
+text_cache = TextCache()
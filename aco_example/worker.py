@@ -0,0 +1,154 @@
+import queue
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from aco_example.clock import SimulationClock
+
+# The state of a running simulation at one moment: the tick it was taken at, the simulation time, the center of
+# every ant, which ants carry food, the radius ants are drawn with and the pheromone level of every edge.
+Snapshot = namedtuple('Snapshot', ['ticks', 'time', 'ant_pos', 'found_food', 'radius', 'pheromone'])
+
+
+class SimulationWorker:
+    """Represents a simulation running on a background thread so that drawing a frame never waits for the ants and
+    a burst of ticks never drops a frame. The worker publishes read-only snapshots of the ants and pheromone, and
+    anything that changes the simulation is sent to it as a command and run between ticks.
+
+    Snapshots are triple-buffered. The worker only refills a buffer that is neither the front one nor the one handed
+    out by the latest call to latest, so a snapshot being drawn is never written to, even when latest hands out the
+    front buffer while a newer snapshot is being copied.
+
+    The worker holds lock while it runs ticks or commands. Another thread has to hold it too while it reads or
+    changes anything the simulation shares, such as the nodes, their spatial index, the paths and the graph.
+    """
+
+    def __init__(self, simulation, clock=None, idle_ms=1):
+        """Initialization method for a simulation worker.
+
+        Args:
+            simulation: The simulation to run. It must already be started, and other threads may only touch it
+                while holding lock.
+            clock: The SimulationClock pacing the ticks. Its speed can be changed through commands.
+            idle_ms: How long the worker sleeps when no tick is due yet, in milliseconds.
+        """
+        self.simulation = simulation
+        self.clock = clock if clock is not None else SimulationClock()
+        self.idle_ms = idle_ms
+        self.commands = queue.Queue()
+        self.error = None
+        self.lock = threading.RLock()
+        # Three sets of (ant_pos, found_food, pheromone) arrays, which of them the front snapshot uses and which of
+        # them latest handed out last.
+        self._buffers = [None, None, None]
+        self._front = None
+        self._front_index = None
+        self._handed_index = None
+        self._lock = threading.Lock()
+        self._wanted = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Starts running the simulation on the background thread.
+        """
+        self._publish()
+        self._wanted.set()
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name='simulation-worker', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """Stops the background thread once it finishes its current batch of ticks and commands.
+
+        Args:
+            timeout: The longest time to wait for the thread, in seconds, or None to wait until it stops.
+        """
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        with self.lock:
+            self._apply_commands()
+
+    @property
+    def is_alive(self):
+        """Whether the background thread is running."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def submit(self, command, *args):
+        """Queues a function to be called on the worker thread between ticks.
+
+        Args:
+            command: The function to call, e.g. clock.faster.
+            *args: The arguments to call it with.
+        """
+        self.commands.put((command, args))
+
+    def latest(self):
+        """Returns the newest snapshot and asks the worker for a fresh one.
+
+        Returns:
+            The newest Snapshot. Its arrays are read-only and stay unchanged until latest is called again.
+        """
+        with self._lock:
+            snapshot = self._front
+            self._handed_index = self._front_index
+        self._wanted.set()
+        return snapshot
+
+    def _run(self):
+        """Runs ticks, commands and snapshots until the worker is stopped.
+        """
+        last = time.perf_counter()
+        try:
+            while not self._stopping.is_set():
+                with self.lock:
+                    self._apply_commands()
+                    now = time.perf_counter()
+                    steps = self.clock.tick(self.simulation, (now - last) * 1000)
+                    last = now
+                if self._wanted.is_set():
+                    self._wanted.clear()
+                    self._publish()
+                if steps == 0:
+                    time.sleep(self.idle_ms / 1000)
+        except Exception as error:
+            # Kept so the thread that owns the worker can see why the simulation stopped.
+            self.error = error
+            raise
+
+    def _apply_commands(self):
+        """Calls every queued command.
+        """
+        while True:
+            try:
+                command, args = self.commands.get_nowait()
+            except queue.Empty:
+                return
+            command(*args)
+
+    def _publish(self):
+        """Copies the state of the simulation into a free buffer and makes it the front buffer.
+        """
+        simulation = self.simulation
+        pos, found_food, radius = simulation.ants()
+        pheromone = simulation.graph.pheromone if simulation.graph is not None else np.zeros(0)
+
+        with self._lock:
+            back = next(i for i in range(len(self._buffers)) if i not in (self._front_index, self._handed_index))
+        arrays = self._buffers[back]
+        if arrays is None or arrays[0].shape != pos.shape or arrays[2].shape != pheromone.shape:
+            arrays = (np.empty(pos.shape), np.empty(found_food.shape, dtype=bool), np.empty(pheromone.shape))
+        for array, values in zip(arrays, (pos, found_food, pheromone)):
+            array.flags.writeable = True
+            array[...] = values
+            array.flags.writeable = False
+
+        self._buffers[back] = arrays
+        snapshot = Snapshot(simulation.ticks, simulation.time, arrays[0], arrays[1], radius, arrays[2])
+        with self._lock:
+            self._front = snapshot
+            self._front_index = back
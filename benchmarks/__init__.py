@@ -0,0 +1 @@
+"""Seeded, reproducible benchmarks for the headless simulation."""
@@ -0,0 +1,168 @@
+"""Runs the simulation headless on generated workloads and stores the results as JSON.
+
+    python -m benchmarks.run --workloads grid geometric --sizes 10 1000 100000 --output results.json
+    python -m benchmarks.run --compare results.json
+
+Every run uses a fixed seed, so two runs of the same version evaluate exactly the same ant decisions and only the
+time they take differs.
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from aco_example.convergence import ConvergenceMonitor
+from aco_example.simulation import Simulation
+from benchmarks.workloads import WORKLOADS, to_objects
+
+DEFAULT_SIZES = [10, 100, 1000, 10000, 100000]
+# The ways of simulating the ants: one array-backed Colony, one Ant object per ant, or a FlowColony counting them.
+MODES = ('colony', 'objects', 'flow')
+# Ant objects take too long to step on larger graphs.
+OBJECTS_MAX_NODES = 1000
+
+
+def run_workload(name, size, ticks=600, num_ants=50, seed=0, mode='colony', memory_ticks=None, patience=300):
+    """Runs the simulation on one workload and measures it. Throughput is timed without tracing allocations, and
+    peak memory is measured in a separate, shorter run of the same workload under tracemalloc.
+
+    Args:
+        name: The name of the workload, a key of WORKLOADS.
+        size: The number of nodes.
+        ticks: The number of ticks to run.
+        num_ants: The number of ants per path leaving the colony node.
+        seed: Seed for both the workload and the ants.
+        mode: How the ants are simulated, one of MODES.
+        memory_ticks: The number of ticks of the run that measures peak memory. Defaults to a tenth of ticks.
+        patience: The number of ticks without a shorter path after which the run counts as converged.
+
+    Returns:
+        A dict with the measurements.
+    """
+    build, _ = WORKLOADS[name]
+    graph = build(size, seed=seed)
+
+    monitor = ConvergenceMonitor(patience=patience, stop=False)
+    simulation = _simulation(graph, mode, num_ants, seed, monitor)
+    simulation.start()
+    start = time.perf_counter()
+    simulation.step(ticks)
+    seconds = time.perf_counter() - start
+
+    # Tracing every allocation slows the simulation down, so it gets a run of its own on a fresh copy of the graph.
+    memory_ticks = max(ticks // 10, 1) if memory_ticks is None else memory_ticks
+    tracemalloc.start()
+    traced = _simulation(build(size, seed=seed), mode, num_ants, seed)
+    traced.start()
+    traced.step(memory_ticks)
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        'workload': name,
+        'mode': mode,
+        'flow': mode == 'flow',
+        'nodes': graph.num_nodes,
+        'edges': graph.num_edges,
+        'ants': len(simulation.colony),
+        'ticks': simulation.ticks,
+        'seconds': seconds,
+        'ticks_per_sec': simulation.ticks / seconds,
+        'ant_steps_per_sec': simulation.ticks * len(simulation.colony) / seconds,
+        'peak_memory_bytes': peak_memory,
+        'memory_ticks': memory_ticks,
+        'best_length': None if simulation.best_tick is None else simulation.best_length,
+        'time_to_convergence': None if monitor.converged_at is None else monitor.converged_at * simulation.dt,
+    }
+
+
+def _simulation(graph, mode, num_ants, seed, monitor=None):
+    """Creates the simulation of a workload graph for a mode.
+    """
+    if mode == 'objects':
+        nodes, paths = to_objects(graph)
+        return Simulation(nodes, paths, num_ants=num_ants, vectorized=False, seed=seed, convergence=monitor)
+    return Simulation.from_graph(graph, num_ants=num_ants, seed=seed, flow=mode == 'flow', convergence=monitor)
+
+
+def _mode(result):
+    """Returns the mode of a result, which results from before modes were added only record as flow or not.
+    """
+    return result.get('mode', 'flow' if result.get('flow', False) else 'colony')
+
+
+def compare(results, baseline):
+    """Prints how the throughput of each workload changed relative to a baseline.
+
+    Args:
+        results: The results of this run.
+        baseline: The results of an earlier run.
+    """
+    earlier = {(r['workload'], r['nodes'], _mode(r)): r for r in baseline['results']}
+    if any('memory_ticks' not in r for r in baseline['results']):
+        print('The baseline was timed while tracing allocations, so its ticks/sec are lower than untraced runs.')
+    for result in results['results']:
+        before = earlier.get((result['workload'], result['nodes'], _mode(result)))
+        if before is None:
+            continue
+        ratio = result['ticks_per_sec'] / before['ticks_per_sec']
+        print(f'{result["workload"]:>10} {result["nodes"]:>7} nodes {_mode(result):>7}: {ratio:6.2f}x ticks/sec'
+              f' ({before["ticks_per_sec"]:.1f} -> {result["ticks_per_sec"]:.1f})')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the headless ant colony simulation.')
+    parser.add_argument('--workloads', nargs='+', default=list(WORKLOADS), choices=list(WORKLOADS))
+    parser.add_argument('--sizes', nargs='+', type=int, default=DEFAULT_SIZES)
+    parser.add_argument('--ticks', type=int, default=600)
+    parser.add_argument('--ants', type=int, default=50, help='ants per path leaving the colony node')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--modes', nargs='+', default=['colony', 'objects'], choices=MODES,
+                        help='simulate the ants as one array-backed colony, as Ant objects or as counts per path')
+    parser.add_argument('--flow', action='store_true', help='also count the ants per path, the same as adding flow')
+    parser.add_argument('--patience', type=int, default=300,
+                        help='ticks without a shorter path after which a run counts as converged')
+    parser.add_argument('--memory-ticks', type=int, help='ticks of the traced run measuring peak memory')
+    parser.add_argument('--label', default='', help='name for this run, e.g. a version or commit')
+    parser.add_argument('--output', help='file to write the JSON results to')
+    parser.add_argument('--compare', help='JSON results of an earlier run to compare against')
+    args = parser.parse_args(argv)
+
+    results = {
+        'label': args.label,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'seed': args.seed,
+        'results': [],
+    }
+    modes = [mode for mode in MODES if mode in args.modes or (mode == 'flow' and args.flow)]
+    for name in args.workloads:
+        for size in args.sizes:
+            if size > WORKLOADS[name][1]:
+                continue
+            for mode in modes:
+                if mode == 'objects' and size > OBJECTS_MAX_NODES:
+                    continue
+                result = run_workload(name, size, args.ticks, args.ants, args.seed, mode, args.memory_ticks,
+                                      args.patience)
+                results['results'].append(result)
+                print(f'{name:>10} {result["nodes"]:>7} nodes {result["edges"]:>8} edges {mode:>7} '
+                      f'{result["ants"]:>6} ants: {result["ticks_per_sec"]:9.1f} ticks/s '
+                      f'{result["ant_steps_per_sec"]:12.0f} ant-steps/s '
+                      f'{result["peak_memory_bytes"] / 2 ** 20:8.1f} MiB', flush=True)
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+    if args.compare:
+        with open(args.compare) as file:
+            compare(results, json.load(file))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
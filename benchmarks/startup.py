@@ -0,0 +1,139 @@
+"""Measures how long it takes to import the package and to build a graph, and checks both against a budget.
+
+    python -m benchmarks.startup --nodes 10000 --import-budget 300 --build-budget 2000
+
+Importing is timed in a fresh interpreter every time, so nothing already loaded by this process hides its cost. The
+command exits with status 1 when any measurement is over its budget, so it can guard the launch time of headless
+workers.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+# Prints the import time in seconds and whether pygame was loaded along the way.
+IMPORT_SCRIPT = '''
+import sys, time
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start, 'pygame' in sys.modules)
+'''
+
+
+def measure_import(module='aco_example', repeats=5):
+    """Imports a module in fresh interpreters and measures the fastest import.
+
+    Args:
+        module: The name of the module to import.
+        repeats: The number of interpreters to start.
+
+    Returns:
+        Dict with the fastest import time in milliseconds and whether pygame was imported.
+    """
+    times = []
+    loads_pygame = False
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, (root, os.environ.get('PYTHONPATH')))))
+    for _ in range(repeats):
+        output = subprocess.run([sys.executable, '-c', IMPORT_SCRIPT.format(module=module)], env=env,
+                                capture_output=True, text=True, check=True).stdout.splitlines()[-1].split()
+        times.append(float(output[0]) * 1000)
+        loads_pygame = loads_pygame or output[1] == 'True'
+    return {'module': module, 'import_ms': min(times), 'loads_pygame': loads_pygame}
+
+
+def measure_build(num_nodes, seed=0):
+    """Builds a grid graph from Node and Path objects and from arrays, and draws the objects once.
+
+    Args:
+        num_nodes: The number of nodes, rounded up to the next square.
+        seed: Seed for the position jitter of the array graph.
+
+    Returns:
+        Dict with the time of every phase in milliseconds and the number of system font lookups.
+    """
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    import pygame
+    from aco_example.fonts import fonts
+    from aco_example.graph import Graph
+    from aco_example.network import Network
+    from aco_example.node import Node
+    from benchmarks.workloads import SPACING, grid
+
+    side = max(int(num_nodes ** 0.5 + 0.5), 2)
+    start = time.perf_counter()
+    network = Network()
+    for i in range(side * side):
+        y, x = divmod(i, side)
+        network.add_node(Node(i, (0, 80, 200), pygame.Rect(x * SPACING, y * SPACING, 30, 30)))
+    for i, node in enumerate(network.nodes):
+        if i % side < side - 1:
+            network.connect(node, network.nodes[i + 1], (0, 60, 180))
+        if i + side < len(network.nodes):
+            network.connect(node, network.nodes[i + side], (0, 60, 180))
+    objects = time.perf_counter()
+    Graph.from_objects(network.nodes, network.paths)
+    from_objects = time.perf_counter()
+    grid(side * side, seed)
+    from_arrays = time.perf_counter()
+
+    lookups = fonts.lookups
+    surface = pygame.Surface((side * SPACING, side * SPACING))
+    for path in network.paths:
+        path.draw(surface)
+    for node in network.nodes:
+        node.draw(surface)
+    drawn = time.perf_counter()
+    return {
+        'nodes': len(network.nodes),
+        'edges': len(network.paths),
+        'objects_ms': (objects - start) * 1000,
+        'from_objects_ms': (from_objects - objects) * 1000,
+        'from_arrays_ms': (from_arrays - from_objects) * 1000,
+        'first_draw_ms': (drawn - from_arrays) * 1000,
+        'font_lookups': fonts.lookups - lookups,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Measure import and graph build time against a budget.')
+    parser.add_argument('--module', default='aco_example', help='module a headless worker imports')
+    parser.add_argument('--nodes', type=int, default=10000)
+    parser.add_argument('--repeats', type=int, default=5, help='fresh interpreters to time the import in')
+    parser.add_argument('--import-budget', type=float, default=300, help='milliseconds allowed for the import')
+    parser.add_argument('--build-budget', type=float, default=2000,
+                        help='milliseconds allowed to build the object graph and its Graph')
+    parser.add_argument('--allow-pygame', action='store_true', help='do not fail when the import loads pygame')
+    parser.add_argument('--output', help='file to write the JSON results to')
+    args = parser.parse_args(argv)
+
+    results = measure_import(args.module, args.repeats)
+    print(f'import {args.module}: {results["import_ms"]:8.1f} ms, pygame loaded: {results["loads_pygame"]}',
+          flush=True)
+    results.update(measure_build(args.nodes))
+    print(f'{results["nodes"]:>7} nodes {results["edges"]:>8} edges: objects {results["objects_ms"]:8.1f} ms, '
+          f'from_objects {results["from_objects_ms"]:8.1f} ms, from_arrays {results["from_arrays_ms"]:8.1f} ms, '
+          f'first draw {results["first_draw_ms"]:8.1f} ms with {results["font_lookups"]} font lookups')
+
+    build_ms = results['objects_ms'] + results['from_objects_ms']
+    failures = []
+    if results['import_ms'] > args.import_budget:
+        failures.append(f'import took {results["import_ms"]:.1f} ms, budget {args.import_budget:g} ms')
+    if build_ms > args.build_budget:
+        failures.append(f'building the graph took {build_ms:.1f} ms, budget {args.build_budget:g} ms')
+    if results['loads_pygame'] and not args.allow_pygame:
+        failures.append(f'importing {args.module} loaded pygame')
+    results['failures'] = failures
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=1)
+    for failure in failures:
+        print(f'over budget: {failure}')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,131 @@
+import math
+
+import numpy as np
+
+from aco_example.graph import Graph
+
+# Distance between neighboring nodes, in pixels. Path.get_dist(80) makes this a length of about one.
+SPACING = 80
+
+
+def grid(num_nodes, seed=0):
+    """Builds a square grid where every node is connected to the nodes above, below, left and right of it. Node
+    positions are jittered so that the paths have different lengths.
+
+    Args:
+        num_nodes: The number of nodes, rounded up to the next square.
+        seed: Seed for the position jitter.
+
+    Returns:
+        The graph, with the colony in one corner and food in the opposite corner.
+    """
+    rng = np.random.default_rng(seed)
+    side = max(math.ceil(math.sqrt(num_nodes)), 2)
+    ys, xs = np.divmod(np.arange(side * side), side)
+    pos = np.stack((xs, ys), axis=1) * SPACING + rng.random((side * side, 2)) * SPACING * 0.4
+
+    index = np.arange(side * side).reshape(side, side)
+    edges = np.concatenate((np.stack((index[:, :-1].ravel(), index[:, 1:].ravel()), axis=1),
+                            np.stack((index[:-1, :].ravel(), index[1:, :].ravel()), axis=1)))
+    return _build(pos, edges)
+
+
+def random_geometric(num_nodes, degree=6, seed=0):
+    """Builds a random geometric graph where nodes are scattered uniformly and connected to every node within a
+    radius chosen to give the requested average degree.
+
+    Args:
+        num_nodes: The number of nodes.
+        degree: The average number of neighbors of a node.
+        seed: Seed for the node positions.
+
+    Returns:
+        The graph, with the colony and food on the nodes closest to opposite corners.
+    """
+    rng = np.random.default_rng(seed)
+    side = math.sqrt(num_nodes) * SPACING
+    pos = rng.random((num_nodes, 2)) * side
+    radius = math.sqrt(degree / (math.pi * num_nodes)) * side
+
+    # Only nodes in the same or a neighboring cell of a radius-sized grid can be connected.
+    cells = {}
+    for i, cell in enumerate(map(tuple, (pos // radius).astype(int).tolist())):
+        cells.setdefault(cell, []).append(i)
+    edges = []
+    for (cx, cy), members in cells.items():
+        members = np.array(members)
+        for dx, dy in ((0, 0), (1, -1), (1, 0), (1, 1), (0, 1)):
+            others = cells.get((cx + dx, cy + dy))
+            if others is None:
+                continue
+            others = np.array(others)
+            delta = pos[members, None, :] - pos[None, others, :]
+            close = np.hypot(delta[..., 0], delta[..., 1]) <= radius
+            if dx == 0 and dy == 0:
+                close &= members[:, None] < others[None, :]
+            a, b = np.nonzero(close)
+            edges.append(np.stack((members[a], others[b]), axis=1))
+    edges = np.concatenate(edges) if edges else np.zeros((0, 2), dtype=np.intp)
+    return _build(pos, edges)
+
+
+def complete(num_nodes, seed=0):
+    """Builds a complete graph over randomly scattered nodes.
+
+    Args:
+        num_nodes: The number of nodes. The number of edges grows with its square, so keep this small.
+        seed: Seed for the node positions.
+
+    Returns:
+        The graph, with the colony and food on the nodes closest to opposite corners.
+    """
+    rng = np.random.default_rng(seed)
+    pos = rng.random((num_nodes, 2)) * math.sqrt(num_nodes) * SPACING
+    u, v = np.triu_indices(num_nodes, k=1)
+    return _build(pos, np.stack((u, v), axis=1))
+
+
+def _build(pos, edges):
+    """Builds a graph from node positions and edge endpoints, putting the colony on the node closest to the origin
+    and food on the node furthest from it.
+    """
+    graph = Graph.from_arrays(pos, edges)
+    corner = pos.sum(axis=1)
+    graph.is_colony[int(np.argmin(corner))] = True
+    graph.has_food[int(np.argmax(corner))] = True
+    return graph
+
+
+def to_objects(graph, node_size=30):
+    """Builds Node and Path objects with the same nodes, edges, colony and food as a graph, for simulations with one
+    Ant object per ant.
+
+    Args:
+        graph: The graph to copy.
+        node_size: The width and height of the node rectangles, in pixels.
+
+    Returns:
+        (nodes, paths), the lists of Node and Path objects.
+    """
+    import pygame
+
+    from aco_example.network import Network
+    from aco_example.node import Node
+
+    network = Network()
+    for i, (x, y) in enumerate(graph.pos.tolist()):
+        node = network.add_node(Node(i, (0, 80, 200), pygame.Rect(0, 0, node_size, node_size)))
+        node.rect.center = (round(x), round(y))
+        node.is_colony = bool(graph.is_colony[i])
+        node.has_food = bool(graph.has_food[i])
+    for u, v in graph.edge_nodes.tolist():
+        network.connect(network.nodes[u], network.nodes[v], (0, 60, 180))
+    return network.nodes, network.paths
+
+
+# The workloads that can be selected by name, and the largest size each one is run at.
+WORKLOADS = {
+    'grid': (grid, 100000),
+    'geometric': (random_geometric, 100000),
+    'complete': (complete, 200),
+}
@@ -11,6 +11,7 @@ setup(name='Ant Colony Optimization Example',
       author_email='bc_townsend@outlook.com',
       packages=['aco_example'],
       install_requires=[
-          'pygame'
+          'pygame',
+          'numpy'
       ],
       )
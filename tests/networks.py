@@ -0,0 +1,24 @@
+import random
+
+import pygame
+
+from aco_example.network import Network
+from aco_example.node import Node
+
+
+def grid_network(side=5, seed=0):
+    """Builds a grid of Node and Path objects with jittered positions, the colony in one corner and food in the
+    opposite corner."""
+    rng = random.Random(seed)
+    network = Network()
+    for i in range(side * side):
+        x, y = 300 + (i % side) * 120 + rng.randint(-20, 20), 100 + (i // side) * 120
+        network.add_node(Node(i, (0, 80, 200), pygame.Rect(x, y, 40, 40)))
+    network.nodes[0].is_colony = True
+    network.nodes[-1].has_food = True
+    for i in range(side * side):
+        if i % side < side - 1:
+            network.connect(network.nodes[i], network.nodes[i + 1], (0, 60, 180))
+        if i + side < side * side:
+            network.connect(network.nodes[i], network.nodes[i + side], (0, 60, 180))
+    return network
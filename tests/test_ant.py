@@ -0,0 +1,60 @@
+import random
+
+import pygame
+
+from aco_example.ant import Ant
+from aco_example.node import Node
+from aco_example.simulation import Simulation
+from tests.networks import grid_network
+
+
+def nodes(count):
+    return [Node(i, (0, 80, 200), pygame.Rect(i * 100, 0, 40, 40)) for i in range(count)]
+
+
+def test_visit_cuts_loop_out_of_path():
+    a, b, c, d = nodes(4)
+    ant = Ant(pygame.Rect(0, 0, 10, 10), a, random.Random(0))
+    buffers = (ant.path, ant._lengths)
+    ant.visit(b, 1.0)
+    ant.visit(c, 2.0)
+    ant.visit(d, 4.0)
+    assert list(ant.path) == [0, 1, 2, 3]
+    assert ant.path_length == 7.0
+
+    # Coming back to b drops c and d along with what was walked after b.
+    ant.visit(b, 8.0)
+    assert list(ant.path) == [0, 1]
+    assert ant.path_length == 1.0
+    assert ant._on_path == {0: 0, 1: 1}
+    ant.visit(d, 2.0)
+    assert list(ant.path) == [0, 1, 3]
+    assert ant.path_length == 3.0
+
+    ant.clear_path()
+    assert list(ant.path) == [0] and list(ant._lengths) == [0.0]
+    assert ant._on_path == {0: 0} and ant.path_length == 0
+    # The buffers are reused rather than replaced.
+    assert ant.path is buffers[0] and ant._lengths is buffers[1]
+
+
+def test_paths_stay_loop_free_while_running():
+    network = grid_network(side=5, seed=3)
+    simulation = Simulation(network.nodes, network.paths, 10, vectorized=False, seed=1)
+    simulation.start()
+    by_id = {node.node_id: node for node in network.nodes}
+    colony = network.nodes[0]
+    for _ in range(1500):
+        simulation.step(1)
+        for ant in simulation.colony:
+            path = list(ant.path)
+            assert len(set(path)) == len(path)
+            for i in range(1, len(path)):
+                assert by_id[path[i]].neighbor(path[i - 1]) is not None
+            if not ant.found_food:
+                assert path[0] == colony.node_id
+                assert ant._on_path == {node_id: i for i, node_id in enumerate(path)}
+                assert ant.path_length == ant._lengths[-1]
+                walked = sum(by_id[path[i - 1]].path_to(by_id[path[i]]).get_dist(80) for i in range(1, len(path)))
+                assert abs(ant.path_length - walked) < 1e-9
+    assert simulation.best_path is not None
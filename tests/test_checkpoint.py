@@ -0,0 +1,109 @@
+import json
+
+import numpy as np
+import pytest
+
+from aco_example.checkpoint import VERSION, load_checkpoint, read_checkpoint, save_checkpoint
+from aco_example.network import Network
+from aco_example.simulation import Simulation
+from benchmarks.workloads import grid
+from tests.networks import grid_network
+
+MODES = {
+    'colony': dict(vectorized=True, lazy_evaporation=True),
+    'ants': dict(vectorized=False),
+    'flow': dict(flow=True),
+}
+
+
+def fingerprint(simulation):
+    pos, found_food, _ = simulation.ants()
+    return (simulation.ticks, simulation.graph.pheromone.tolist(), pos.tolist(), found_food.tolist(),
+            simulation.best_length)
+
+
+@pytest.mark.parametrize('mmap_mode', [None, 'c'])
+@pytest.mark.parametrize('mode', MODES)
+def test_resumed_run_matches_uninterrupted_run(tmp_path, mode, mmap_mode):
+    network = grid_network(seed=1)
+    simulation = Simulation(network.nodes, network.paths, 10, seed=5, **MODES[mode])
+    simulation.start()
+    simulation.step(400)
+    # An edit renumbers the graph, so the saved order differs from the order the nodes and paths were built in.
+    path = network.paths[3]
+    network.remove_path(path)
+    simulation.remove_path(path)
+    simulation.step(300)
+
+    save_checkpoint(simulation, str(tmp_path / 'run.ckpt'))
+    # Saving again replaces the first checkpoint.
+    save_checkpoint(simulation, str(tmp_path / 'run.ckpt'))
+    resumed = load_checkpoint(str(tmp_path / 'run.ckpt'), mmap_mode=mmap_mode)
+    assert fingerprint(resumed) == fingerprint(simulation)
+
+    simulation.step(900)
+    resumed.step(900)
+    assert fingerprint(resumed) == fingerprint(simulation)
+
+
+def test_read_checkpoint_maps_arrays(tmp_path):
+    network = grid_network(side=3)
+    simulation = Simulation(network.nodes, network.paths, 10, seed=5)
+    simulation.start()
+    simulation.step(100)
+    save_checkpoint(simulation, str(tmp_path / 'run.ckpt'))
+
+    state, arrays = read_checkpoint(str(tmp_path / 'run.ckpt'))
+    assert state['ticks'] == 100
+    assert isinstance(arrays['graph.pheromone'], np.memmap)
+    assert np.array_equal(arrays['graph.pheromone'], simulation.graph.pheromone)
+
+
+def test_lazily_evaporating_graph_resumes_bit_for_bit(tmp_path):
+    graph = grid(25, seed=2)
+    graph.lazy_evaporation = True
+    simulation = Simulation.from_graph(graph, num_ants=10, seed=4, lazy_evaporation=True)
+    simulation.start()
+    simulation.step(500)
+    assert simulation.graph.decay != 1.0
+
+    save_checkpoint(simulation, str(tmp_path / 'run.ckpt'))
+    state, arrays = read_checkpoint(str(tmp_path / 'run.ckpt'))
+    # Readers of the checkpoint still find the true pheromone levels.
+    assert state['decay'] == simulation.graph.decay
+    assert np.array_equal(arrays['graph.pheromone'], simulation.graph.pheromone)
+    assert 'graph.stored_pheromone' in arrays
+
+    resumed = load_checkpoint(str(tmp_path / 'run.ckpt'))
+    for _ in range(3):
+        simulation.step(400)
+        resumed.step(400)
+        assert fingerprint(resumed) == fingerprint(simulation)
+
+
+def test_objects_restored_into_network(tmp_path):
+    network = grid_network(side=3, seed=2)
+    simulation = Simulation(network.nodes, network.paths, 10, seed=5)
+    simulation.start()
+    simulation.step(200)
+    save_checkpoint(simulation, str(tmp_path / 'run.ckpt'))
+
+    restored = Network()
+    resumed = load_checkpoint(str(tmp_path / 'run.ckpt'), restored)
+    assert resumed.nodes is restored.nodes and resumed.paths is restored.paths
+    assert [(node.node_id, tuple(node.rect), node.is_colony, node.has_food) for node in restored.nodes] == \
+        [(node.node_id, tuple(node.rect), node.is_colony, node.has_food) for node in network.nodes]
+    assert [path.pheromone for path in restored.paths] == [path.pheromone for path in network.paths]
+
+
+def test_newer_checkpoint_is_refused(tmp_path):
+    network = grid_network(side=2)
+    save_checkpoint(Simulation(network.nodes, network.paths, 10), str(tmp_path / 'run.ckpt'))
+    with open(tmp_path / 'run.ckpt' / 'state.json') as file:
+        state = json.load(file)
+    state['version'] = VERSION + 1
+    with open(tmp_path / 'run.ckpt' / 'state.json', 'w') as file:
+        json.dump(state, file)
+
+    with pytest.raises(ValueError):
+        load_checkpoint(str(tmp_path / 'run.ckpt'))
@@ -0,0 +1,85 @@
+from types import SimpleNamespace
+
+import pytest
+
+from aco_example import clock
+from aco_example.clock import SimulationClock
+from aco_example.simulation import Simulation
+from tests.networks import grid_network
+
+
+def fingerprint(simulation):
+    pos, found_food, _ = simulation.ants()
+    return simulation.ticks, simulation.graph.pheromone.tolist(), pos.tolist(), found_food.tolist()
+
+
+@pytest.mark.parametrize('speed, frames', [(1.0, [16.7] * 300), (4.0, [5, 40, 16, 33, 7] * 30), (0.5, [100] * 200)])
+def test_outcome_does_not_depend_on_speed_or_frame_rate(speed, frames):
+    network = grid_network(side=4)
+    simulation = Simulation(network.nodes, network.paths, 10, seed=2)
+    simulation.start()
+    simulation_clock = SimulationClock(speed)
+    for elapsed in frames:
+        simulation_clock.tick(simulation, elapsed)
+    assert simulation.ticks > 0
+
+    network = grid_network(side=4)
+    reference = Simulation(network.nodes, network.paths, 10, seed=2)
+    reference.start()
+    reference.step(simulation.ticks)
+    assert fingerprint(simulation) == fingerprint(reference)
+
+
+def test_ticks_follow_simulation_time():
+    network = grid_network(side=3)
+    simulation = Simulation(network.nodes, network.paths, 10)
+    simulation.start()
+    simulation_clock = SimulationClock(speed=2.0)
+    # 25 ms at twice the speed is 3 ticks of 1/60 s, with the rest carried over to the next frame.
+    assert simulation_clock.tick(simulation, 25) == 3
+    assert simulation_clock.tick(simulation, 25) == 3
+    assert simulation_clock.tick(simulation, 25) == 3
+    assert simulation.ticks == 9
+    # A stall only counts as max_frame_ms.
+    assert simulation_clock.tick(simulation, 10000) == 30
+
+
+class TimedSimulation:
+    """Stands in for a simulation where every tick takes one millisecond of a fake wall clock."""
+
+    def __init__(self, stop_at=None):
+        self.now = 0.0
+        self.ticks = 0
+        self.batches = []
+        self.stop_at = stop_at
+        self.is_running = True
+        self.converged = False
+
+    def step(self, n):
+        self.batches.append(n)
+        self.ticks += n
+        self.now += n / 1000
+        if self.stop_at is not None and self.ticks >= self.stop_at:
+            self.is_running = False
+
+
+def test_fast_forward_keeps_to_budget(monkeypatch):
+    simulation = TimedSimulation()
+    monkeypatch.setattr(clock, 'time', SimpleNamespace(perf_counter=lambda: simulation.now))
+    simulation_clock = SimulationClock(budget_ms=10)
+    simulation_clock.as_fast_as_possible = True
+
+    steps = simulation_clock.tick(simulation, 16)
+    # Doubling alone would run batches of 1, 2, 4 and 8 ticks, 15 ms in all.
+    assert simulation.batches[:3] == [1, 2, 4]
+    assert steps == simulation.ticks
+    assert 9 <= steps <= 10
+    assert simulation.now <= 0.010 + 1e-9
+
+
+def test_fast_forward_ends_when_simulation_stops(monkeypatch):
+    simulation = TimedSimulation(stop_at=3)
+    monkeypatch.setattr(clock, 'time', SimpleNamespace(perf_counter=lambda: simulation.now))
+    simulation_clock = SimulationClock(budget_ms=1000)
+    simulation_clock.as_fast_as_possible = True
+    assert simulation_clock.tick(simulation, 16) == 3
@@ -0,0 +1,83 @@
+import numpy as np
+
+from aco_example.colony import Colony, expand_segments, roulette
+from aco_example.graph import Graph
+from benchmarks.workloads import grid
+from tests.test_solver import diamond
+
+
+def on_path(colony, ant):
+    """The nodes whose visited bit is set for an ant."""
+    bits = np.unpackbits(colony.visited[ant], bitorder='little')[:colony.graph.num_nodes]
+    return set(np.flatnonzero(bits).tolist())
+
+
+def test_expand_segments():
+    seg_start, seg_end, owner, slot = expand_segments(np.array([4, 0, 7]), np.array([2, 3, 1]))
+    assert seg_start.tolist() == [0, 2, 5]
+    assert seg_end.tolist() == [2, 5, 6]
+    assert owner.tolist() == [0, 0, 1, 1, 1, 2]
+    assert slot.tolist() == [4, 5, 0, 1, 2, 7]
+
+
+def test_roulette_never_picks_zero_weights():
+    weight = np.array([0.0, 3.0, 0.0, 0.0, 0.0, 1.0, 0.0, 2.0])
+    seg_start, seg_end = np.array([0, 2, 4]), np.array([2, 4, 8])
+    rng = np.random.default_rng(0)
+    picks = []
+    for _ in range(500):
+        pick, total = roulette(weight, seg_start, seg_end, rng)
+        assert total.tolist() == [3.0, 0.0, 3.0]
+        picks.append(pick)
+    picks = np.array(picks)
+    assert set(picks[:, 0]) == {1}
+    assert set(picks[:, 2]) == {5, 7}
+    assert 0.6 < np.mean(picks[:, 2] == 7) < 0.73
+
+
+def test_loop_is_cut_out_of_path():
+    # A triangle 0-1-2 with food hanging off node 2 at node 3.
+    pos = np.array([(0, 0), (80, 0), (40, 60), (40, 140)], dtype=float)
+    graph = Graph.from_arrays(pos, np.array([[0, 1], [1, 2], [2, 0], [2, 3]]), length=np.array([1.0, 2.0, 4.0, 8.0]))
+    graph.is_colony[0] = True
+    graph.has_food[3] = True
+    colony = Colony(graph, 1, 5, np.random.default_rng(0))
+    ant = np.array([0])
+
+    colony._push(ant, np.array([1]), np.array([0]))
+    colony._push(ant, np.array([2]), np.array([1]))
+    assert colony.stack[0, :colony.depth[0]].tolist() == [0, 1, 2]
+    assert colony.path_length[0] == 3.0
+    assert on_path(colony, 0) == {0, 1, 2}
+
+    # Coming back to node 0 drops nodes 1 and 2 instead of walking the triangle again.
+    colony._push(ant, np.array([0]), np.array([2]))
+    assert colony.stack[0, :colony.depth[0]].tolist() == [0]
+    assert colony.path_length[0] == 0.0
+    assert on_path(colony, 0) == {0}
+    assert colony.curr[0] == 0 and colony.prev[0] == 2
+
+
+def test_paths_stay_loop_free():
+    graph = grid(36, seed=3)
+    colony = Colony(graph, 40, 5, np.random.default_rng(1))
+    for _ in range(1000):
+        colony.step()
+        for ant in range(len(colony)):
+            nodes = colony.stack[ant, :colony.depth[ant]].tolist()
+            assert len(set(nodes)) == len(nodes)
+            if not colony.found_food[ant]:
+                assert on_path(colony, ant) == set(nodes)
+                edges = colony.stack_edge[ant, 1:colony.depth[ant]]
+                assert np.isclose(colony.path_length[ant], graph.length[edges].sum())
+    assert colony.best_path is not None
+
+
+def test_colony_learns_short_route():
+    graph = diamond()
+    colony = Colony(graph, 20, 5, np.random.default_rng(0))
+    for _ in range(3000):
+        colony.step()
+    assert colony.best_path.tolist() == [0, 1, 3]
+    assert colony.best_length == 2.0
+    assert graph.pheromone[0] > graph.pheromone[2]
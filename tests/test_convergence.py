@@ -0,0 +1,66 @@
+import numpy as np
+
+from aco_example.convergence import ConvergenceMonitor, dominant_route, route_entropy
+from aco_example.graph import Graph
+from aco_example.simulation import Simulation
+from aco_example.sweep import run_case
+from tests.test_solver import diamond
+
+
+def fork():
+    """Three routes from node 0 to node 4, through nodes 1, 2 and 3."""
+    pos = np.array([(0, 0), (1, 1), (1, 0), (1, -1), (2, 0)], dtype=float)
+    edges = np.array([[0, 1], [1, 4], [0, 2], [2, 4], [0, 3], [3, 4]])
+    graph = Graph.from_arrays(pos, edges, length=np.ones(6))
+    graph.is_colony[0] = True
+    graph.has_food[4] = True
+    return graph
+
+
+def test_route_entropy_leaves_out_the_edge_back():
+    graph = fork()
+    graph.set_pheromone(np.arange(6), np.array([5.0, 1.0, 1.0, 1.0, 1.0, 1.0]))
+    assert dominant_route(graph) == [0, 1, 4]
+    # Node 1 only has the way on to food ahead of it, so only the colony's three equal choices count.
+    graph.set_pheromone(np.arange(6), np.array([1.0, 1.0, 1.0, 1.0, 1.0, 1.0]))
+    assert abs(route_entropy(graph, [0, 1, 4]) - 1.0) < 1e-12
+    graph.set_pheromone(np.arange(6), np.array([1.0, 1.0, 0.0, 1.0, 0.0, 1.0]))
+    assert route_entropy(graph, [0, 1, 4]) == 0.0
+
+
+def test_monitor_stops_after_patience():
+    monitor = ConvergenceMonitor(patience=300, interval=60)
+    simulation = Simulation.from_graph(diamond(), num_ants=5, seed=0, convergence=monitor)
+    simulation.start()
+    simulation.step(5000)
+
+    assert not simulation.is_running
+    assert simulation.converged
+    assert simulation.ticks == monitor.converged_at
+    assert monitor.converged_at % 60 == 0
+    assert monitor.converged_at - simulation.best_tick >= 300
+    assert monitor.route == [0, 1, 3]
+    assert monitor.dominant_share > 0.5
+
+
+def test_monitor_waits_for_every_check():
+    # The path stops improving long before the pheromone can settle below an unreachable entropy.
+    monitor = ConvergenceMonitor(patience=60, entropy_below=-1, stop=False)
+    simulation = Simulation.from_graph(diamond(), num_ants=5, seed=0, convergence=monitor)
+    simulation.start()
+    simulation.step(1200)
+    assert simulation.is_running
+    assert not monitor.converged
+    assert monitor.converged_at is None
+    assert monitor.ticks_since_improvement >= 60
+
+
+def test_sweep_reports_the_tick_the_run_converged():
+    params = {'alpha': 1.0, 'beta': 1.0, 'evap': 0.1, 'q': 1.0, 'num_ants': 5, 'seed': 0}
+    result = run_case(diamond(), params, ticks=5000, patience=300)
+    assert result['convergence_tick'] == result['converged_at'] == result['ticks']
+    assert result['convergence_tick'] - result['best_tick'] >= 300
+
+    result = run_case(diamond(), params, ticks=600)
+    assert result['convergence_tick'] is None
+    assert result['best_tick'] is not None
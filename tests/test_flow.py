@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from aco_example.graph import Graph
+from aco_example.simulation import Simulation
+
+
+def diamond(short_y, long_y):
+    """Two routes from the colony at node 0 to food at node 3, through node 1 and through node 2."""
+    pos = np.array([(0, 0), (200, short_y), (200, long_y), (400, 0)], dtype=float)
+    graph = Graph.from_arrays(pos, np.array([[0, 1], [1, 3], [0, 2], [2, 3]]))
+    graph.is_colony[0] = True
+    graph.has_food[3] = True
+    return graph
+
+
+def short_route_shares(flow, short_y, long_y, seeds=range(6), ticks=3000):
+    shares = []
+    for seed in seeds:
+        simulation = Simulation.from_graph(diamond(short_y, long_y), num_ants=100, seed=seed, flow=flow)
+        simulation.start()
+        simulation.step(ticks)
+        pheromone = simulation.graph.pheromone
+        shares.append(pheromone[:2].sum() / pheromone.sum())
+    return np.array(shares)
+
+
+@pytest.mark.parametrize('short_y, long_y', [(80, -160), (80, 500)])
+def test_flow_settles_like_colony_across_seeds(short_y, long_y):
+    colony = short_route_shares(False, short_y, long_y)
+    flow = short_route_shares(True, short_y, long_y)
+
+    assert colony.mean() > 0.5 and flow.mean() > 0.5
+    assert abs(flow.mean() - colony.mean()) < 0.06
@@ -0,0 +1,59 @@
+import os
+import subprocess
+import sys
+
+import pygame
+
+from aco_example.fonts import FontRegistry, fonts
+from tests.networks import grid_network
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_fonts_are_looked_up_and_loaded_once():
+    registry = FontRegistry()
+    small = registry.get('Arial', 20)
+    assert registry.get('Arial', 20) is small
+    large = registry.get('Arial', 38)
+    assert large is not small
+    # Both sizes come from the same lookup of the face.
+    assert registry.lookups == 1 and len(registry) == 2
+
+    # A face that is not installed still gives a font.
+    assert registry.get('No Such Face', 20) is not None
+    assert registry.lookups == 2
+
+
+def test_fonts_are_loaded_again_after_pygame_font_quit():
+    registry = FontRegistry()
+    font = registry.get('Arial', 20)
+    pygame.font.quit()
+    assert registry.get('Arial', 20) is not font
+    assert pygame.font.get_init()
+    assert registry.lookups == 1
+
+
+def test_drawing_shares_fonts():
+    network = grid_network(side=6)
+    surface = pygame.Surface((1200, 900))
+    for path in network.paths:
+        path.draw(surface)
+    for node in network.nodes:
+        node.draw(surface)
+    lookups = fonts.lookups
+
+    network = grid_network(side=6, seed=1)
+    for path in network.paths:
+        path.draw(surface)
+    for node in network.nodes:
+        node.draw(surface)
+    assert fonts.lookups == lookups
+    assert len({id(node.font) for node in network.nodes}) == 1
+    assert len({id(path.font) for path in network.paths}) == 1
+
+
+def test_import_does_not_load_pygame():
+    script = 'import sys, aco_example; from aco_example.simulation import Simulation; print("pygame" in sys.modules)'
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    output = subprocess.run([sys.executable, '-c', script], env=env, capture_output=True, text=True, check=True)
+    assert output.stdout.split() == ['False']
@@ -0,0 +1,135 @@
+import numpy as np
+
+from aco_example.colony import Colony
+from aco_example.graph import Graph
+from benchmarks.workloads import random_geometric
+
+
+def labeled(num_nodes=60, seed=0):
+    """A random geometric graph whose nodes and edges carry their original ids as x-coordinate and pheromone."""
+    graph = random_geometric(num_nodes, seed=seed)
+    graph = Graph.from_arrays(np.stack((np.arange(graph.num_nodes), np.zeros(graph.num_nodes)), axis=1),
+                              graph.edge_nodes, pheromone=np.arange(graph.num_edges, dtype=float),
+                              length=np.arange(graph.num_edges, dtype=float) % 7 + 1)
+    return graph
+
+
+def check(graph, nodes, edges):
+    """Checks the graph against the labels of the nodes and edges that should still be in it."""
+    node_label = graph.pos[:, 0].astype(int).tolist()
+    edge_label = graph.pheromone.astype(int).tolist()
+    assert sorted(node_label) == sorted(nodes)
+    assert sorted(edge_label) == sorted(edges)
+    for edge, (u, v) in enumerate(graph.edge_nodes.tolist()):
+        assert {node_label[u], node_label[v]} == set(edges[edge_label[edge]])
+        assert graph.edge_id(u, v) == edge and graph.edge_id(v, u) == edge
+        assert edge in graph.incident_edges(u) and edge in graph.incident_edges(v)
+
+    offsets, neighbors, csr_edges = graph.csr()
+    for node in range(graph.num_nodes):
+        ids = csr_edges[offsets[node]:offsets[node + 1]].tolist()
+        assert sorted(ids) == sorted(graph.incident_edges(node))
+        assert graph.degree(node) == len(ids)
+        for neighbor, edge in zip(neighbors[offsets[node]:offsets[node + 1]].tolist(), ids):
+            assert node in graph.edge_nodes[edge] and neighbor in graph.edge_nodes[edge]
+
+    # Candidate lists are rebuilt after every edit.
+    offsets, _, candidates = graph.candidates(3)
+    for node in range(graph.num_nodes):
+        kept = candidates[offsets[node]:offsets[node + 1]].tolist()
+        assert set(kept) <= set(graph.incident_edges(node))
+        assert graph.length[kept].tolist() == sorted(graph.length[graph.incident_edges(node)].tolist())[:3]
+
+
+def test_swap_removal_keeps_ids_consistent():
+    graph = labeled()
+    rng = np.random.default_rng(1)
+    nodes = list(range(graph.num_nodes))
+    edges = {i: tuple(pair) for i, pair in enumerate(graph.edge_nodes.tolist())}
+    graph.candidates(3)
+
+    for step in range(60):
+        if step % 3 == 0 and graph.num_nodes > 0:
+            node = int(rng.integers(graph.num_nodes))
+            label = int(graph.pos[node, 0])
+            last = graph.num_nodes - 1
+            last_label = int(graph.pos[last, 0])
+            moved = graph.remove_node(node)
+            # The last node takes over the freed id.
+            assert moved == (last if node != last else None)
+            if moved is not None:
+                assert int(graph.pos[node, 0]) == last_label
+            nodes.remove(label)
+            edges = {i: pair for i, pair in edges.items() if label not in pair}
+        elif graph.num_edges > 0:
+            edge = int(rng.integers(graph.num_edges))
+            last = graph.num_edges - 1
+            last_label = int(graph.pheromone[last])
+            del edges[int(graph.pheromone[edge])]
+            moved = graph.remove_edge(edge)
+            assert moved == (last if edge != last else None)
+            if moved is not None:
+                assert int(graph.pheromone[edge]) == last_label
+        check(graph, nodes, edges)
+
+
+def test_parallel_edge_takes_over_lookup():
+    graph = Graph.from_arrays(np.array([(0, 0), (1, 0)], dtype=float), np.array([[0, 1], [1, 0]]))
+    assert graph.edge_id(0, 1) == 0
+    graph.remove_edge(0)
+    assert graph.edge_id(0, 1) == 0 and graph.edge_id(1, 0) == 0
+    graph.remove_edge(0)
+    assert graph.edge_id(0, 1) is None and graph.num_edges == 0
+
+
+def test_lengths_and_heuristic_follow_edits():
+    graph = random_geometric(40, seed=2)
+    heuristic = graph.heuristic(2.0)
+    assert np.allclose(heuristic, 1 / graph.length ** 2)
+
+    # Adding edges past the capacity grows the tables along with the edge arrays.
+    for v in range(1, 40):
+        graph.add_edge(0, v)
+    graph.move_node(5, 123.0, 456.0)
+    delta = graph.pos[graph.edge_nodes[:, 1]] - graph.pos[graph.edge_nodes[:, 0]]
+    assert np.allclose(graph.length, np.hypot(delta[:, 0], delta[:, 1]) / 80)
+    assert np.allclose(graph.heuristic(2.0), 1 / graph.length ** 2)
+    assert np.allclose(graph.heuristic(1.0), 1 / graph.length)
+
+
+def test_explicit_lengths_do_not_follow_moves():
+    graph = Graph.from_arrays(np.array([(0, 0), (80, 0), (0, 80)], dtype=float), np.array([[0, 1], [0, 2]]),
+                              length=np.array([5.0, 7.0]))
+    graph.move_node(1, 800.0, 0.0)
+    assert graph.length.tolist() == [5.0, 7.0]
+    graph.distances = np.full((3, 3), 9.0)
+    graph.add_edge(1, 2)
+    assert graph.length.tolist() == [5.0, 7.0, 9.0]
+
+
+def test_candidates_are_the_shortest_edges_in_order():
+    graph = random_geometric(80, degree=10, seed=3)
+    offsets, neighbors, edges = graph.csr()
+    for k in (1, 3, 100):
+        kept_offsets, kept_neighbors, kept_edges = graph.candidates(k)
+        assert graph.candidates(k) is graph.candidates(k)
+        for node in range(graph.num_nodes):
+            every = edges[offsets[node]:offsets[node + 1]]
+            kept = kept_edges[kept_offsets[node]:kept_offsets[node + 1]]
+            assert len(kept) == min(k, len(every))
+            assert graph.length[kept].tolist() == sorted(graph.length[every].tolist())[:k]
+            for neighbor, edge in zip(kept_neighbors[kept_offsets[node]:kept_offsets[node + 1]], kept):
+                assert graph.edge_id(node, neighbor) == edge
+
+
+def test_ants_fall_back_when_candidates_lead_back():
+    # Node 1's shortest edge leads back to the colony, so with one candidate ants at node 1 must use the other.
+    pos = np.array([(0, 0), (40, 0), (400, 0)], dtype=float)
+    graph = Graph.from_arrays(pos, np.array([[0, 1], [1, 2]]))
+    graph.is_colony[0] = True
+    graph.has_food[2] = True
+    colony = Colony(graph, 20, 5, np.random.default_rng(0), candidates=1)
+    colony._explore(np.arange(20))
+    colony.at_node[:] = True
+    colony._explore(np.arange(20))
+    assert colony.curr.tolist() == [2] * 20
@@ -0,0 +1,50 @@
+import numpy as np
+
+from aco_example.graph_io import distance_matrix, load_tsplib
+
+# burma14 and ulysses16 from TSPLIB, with their optimal tours and lengths.
+BURMA14 = [(16.47, 96.10), (16.47, 94.44), (20.09, 92.54), (22.39, 93.37), (25.23, 97.24), (22.00, 96.05),
+           (20.47, 97.02), (17.20, 96.29), (16.30, 97.38), (14.05, 98.12), (16.53, 97.38), (21.52, 95.59),
+           (19.41, 97.13), (20.09, 94.55)]
+BURMA14_TOUR = [1, 2, 14, 3, 4, 5, 6, 12, 7, 13, 8, 11, 9, 10]
+ULYSSES16 = [(38.24, 20.42), (39.57, 26.15), (40.56, 25.32), (36.26, 23.12), (33.48, 10.54), (37.56, 12.19),
+             (38.42, 13.11), (37.52, 20.44), (41.23, 9.10), (41.17, 13.05), (36.08, -5.21), (38.47, 15.13),
+             (38.15, 15.35), (37.51, 15.17), (35.49, 14.32), (39.36, 19.56)]
+ULYSSES16_TOUR = [1, 14, 13, 12, 7, 6, 15, 5, 11, 9, 10, 16, 3, 2, 4, 8]
+
+
+def write_tsplib(path, coords, kind='EUC_2D'):
+    with open(path, 'w') as file:
+        file.write(f'NAME : test\nTYPE : TSP\nDIMENSION : {len(coords)}\nEDGE_WEIGHT_TYPE : {kind}\n')
+        file.write('NODE_COORD_SECTION\n')
+        for i, (x, y) in enumerate(coords, start=1):
+            file.write(f'{i} {x} {y}\n')
+        file.write('EOF\n')
+
+
+def tour_length(matrix, tour):
+    tour = np.array(tour) - 1
+    return matrix[tour, np.roll(tour, -1)].sum()
+
+
+def test_geo_optimal_tours():
+    assert tour_length(distance_matrix(BURMA14, kind='GEO'), BURMA14_TOUR) == 3323
+    assert tour_length(distance_matrix(ULYSSES16, kind='GEO'), ULYSSES16_TOUR) == 6859
+    assert distance_matrix(BURMA14, kind='GEO')[0, :4].tolist() == [0, 153, 510, 706]
+
+
+def test_geo_uses_tsplib_pi():
+    # With math.pi instead of TSPLIB's 3.141592 these two points are 15300 apart.
+    assert distance_matrix([(-53.03, 53.42), (44.11, -60.54)], kind='GEO')[0, 1] == 15299
+
+
+def test_distance_file_rebuilt_for_another_instance(tmp_path):
+    write_tsplib(tmp_path / 'a.tsp', [(0, 0), (3, 4), (6, 8)])
+    write_tsplib(tmp_path / 'b.tsp', [(0, 0), (30, 40), (60, 80)])
+    distance_file = str(tmp_path / 'distances.npy')
+
+    assert load_tsplib(str(tmp_path / 'a.tsp'), distance_file=distance_file).length.tolist() == [5, 10, 5]
+    assert load_tsplib(str(tmp_path / 'b.tsp'), distance_file=distance_file).length.tolist() == [50, 100, 50]
+    modified = (tmp_path / 'distances.npy').stat().st_mtime_ns
+    assert load_tsplib(str(tmp_path / 'b.tsp'), distance_file=distance_file).length.tolist() == [50, 100, 50]
+    assert (tmp_path / 'distances.npy').stat().st_mtime_ns == modified
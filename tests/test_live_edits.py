@@ -0,0 +1,130 @@
+import random
+
+import numpy as np
+import pygame
+import pytest
+
+from aco_example.colony import Colony
+from aco_example.flow import FlowColony
+from aco_example.node import Node
+from aco_example.simulation import Simulation
+from tests.networks import grid_network
+
+MODES = {
+    'colony': dict(vectorized=True),
+    'ants': dict(vectorized=False),
+    'flow': dict(flow=True),
+}
+
+
+def check(simulation):
+    """Asserts that the graph, the node and path objects and the ants all agree with each other."""
+    graph = simulation.graph
+    assert graph.num_nodes == len(simulation.nodes) and graph.num_edges == len(simulation.paths)
+    for index, node in enumerate(simulation._node_at):
+        assert node.index == index and node.graph is graph
+    for edge, path in enumerate(simulation._path_at):
+        assert path.edge_id == edge
+        assert sorted(graph.edge_nodes[edge].tolist()) == sorted((path.node1.index, path.node2.index))
+    if simulation.best_path is not None:
+        assert simulation.best_path[0] == graph.colony
+
+    colony = simulation.colony
+    if isinstance(colony, Colony):
+        assert np.all((colony.curr >= 0) & (colony.curr < graph.num_nodes))
+        assert np.all(colony.stack[:, 0] == graph.colony)
+        for ant in range(len(colony)):
+            stack = colony.stack[ant, :colony.depth[ant]].tolist()
+            assert all(0 <= node < graph.num_nodes for node in stack)
+            assert all(graph.edge_id(u, v) is not None for u, v in zip(stack, stack[1:]))
+    elif isinstance(colony, FlowColony):
+        counts = [colony.exploring, colony.searching, colony.returning, colony.restarting, colony.setting_off]
+        assert sum(int(np.sum(count)) for count in counts) == colony.num_ants
+    else:
+        ids = {node.node_id for node in simulation.nodes}
+        for ant in colony:
+            assert ant.curr_node.node_id in ids
+            assert ant.colony_node is simulation.colony_node
+            for u, v in zip(ant.path, ant.path[1:]):
+                assert simulation._node_by_id[u].neighbor(v) is not None
+
+
+@pytest.mark.parametrize('mode', MODES)
+@pytest.mark.parametrize('seed', range(5))
+def test_random_edits_keep_invariants(mode, seed):
+    rng = random.Random(seed)
+    network = grid_network(seed=seed)
+    simulation = Simulation(network.nodes, network.paths, 20, seed=3, **MODES[mode])
+    simulation.start()
+    next_id = 100
+    for _ in range(30):
+        simulation.step(rng.randint(5, 60))
+        check(simulation)
+        edit = rng.choice(['remove_node', 'remove_path', 'add_node', 'add_path', 'move_node', 'set_food'])
+        plain = [node for node in network.nodes if not node.is_colony and not node.has_food]
+        if edit == 'remove_node' and len(plain) > 5:
+            node = rng.choice(plain)
+            network.remove_node(node)
+            simulation.remove_node(node)
+        elif edit == 'remove_path' and len(network.paths) > 10:
+            path = rng.choice(network.paths)
+            network.remove_path(path)
+            simulation.remove_path(path)
+        elif edit == 'add_node':
+            node = Node(next_id, (0, 80, 200), pygame.Rect(rng.randint(300, 800), rng.randint(100, 600), 40, 40))
+            next_id += 1
+            network.add_node(node)
+            simulation.add_node(node)
+            for other in rng.sample(network.nodes[:-1], 2):
+                path = network.connect(node, other, (0, 60, 180))
+                if path is not None:
+                    simulation.add_path(path)
+        elif edit == 'add_path':
+            path = network.connect(*rng.sample(network.nodes, 2), (0, 60, 180))
+            if path is not None:
+                simulation.add_path(path)
+        elif edit == 'move_node':
+            node = rng.choice(network.nodes)
+            simulation.move_node(node, node.rect.x + 30, node.rect.y - 20)
+        elif edit == 'set_food' and plain:
+            node = rng.choice(plain)
+            simulation.set_food(node, not node.has_food)
+        check(simulation)
+    simulation.step(300)
+    check(simulation)
+
+
+@pytest.mark.parametrize('mode', MODES)
+def test_removing_the_colony_moves_it(mode):
+    network = grid_network()
+    simulation = Simulation(network.nodes, network.paths, 20, seed=3, **MODES[mode])
+    simulation.start()
+    simulation.step(200)
+
+    old = simulation.colony_node
+    new = network.nodes[1]
+    new.is_colony = True
+    network.remove_node(old)
+    simulation.remove_node(old)
+    check(simulation)
+    simulation.step(200)
+    check(simulation)
+    assert simulation.graph.colony == new.index
+
+
+@pytest.mark.parametrize('mode', MODES)
+def test_emptied_graph_accepts_new_nodes(mode):
+    network = grid_network(side=3)
+    simulation = Simulation(network.nodes, network.paths, 10, seed=3, **MODES[mode])
+    simulation.start()
+    simulation.step(50)
+    for node in list(network.nodes):
+        network.remove_node(node)
+        simulation.remove_node(node)
+
+    node = Node(999, (0, 80, 200), pygame.Rect(400, 400, 40, 40))
+    node.is_colony = True
+    network.add_node(node)
+    simulation.add_node(node)
+    assert simulation.graph.num_nodes == 1 and node.index == 0 and node.graph is simulation.graph
+    simulation.step(10)
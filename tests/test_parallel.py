@@ -0,0 +1,70 @@
+from multiprocessing import shared_memory
+
+import numpy as np
+import pytest
+
+from aco_example.parallel import ParallelColonies
+from aco_example.simulation import Simulation
+from tests.test_solver import diamond
+
+
+def serial_rounds(merge, rounds, interval=120, seed=3):
+    """Runs the two colonies of a ParallelColonies one after another in this process and merges them the same way.
+    """
+    seeds = np.random.SeedSequence(seed).spawn(2)
+    simulations = [Simulation.from_graph(diamond(), num_ants=5, rng=np.random.default_rng(seeds[k])) for k in range(2)]
+    for simulation in simulations:
+        simulation.start()
+    for _ in range(rounds):
+        for simulation in simulations:
+            simulation.step(interval)
+        rows = np.array([simulation.graph.pheromone for simulation in simulations])
+        lengths = [simulation.colony.best_length for simulation in simulations]
+        merged = rows.mean(axis=0) if merge == 'average' else rows[int(np.argmin(lengths))]
+        for simulation in simulations:
+            simulation.graph.set_pheromone(np.arange(simulation.graph.num_edges), merged)
+    return merged, min(lengths)
+
+
+@pytest.mark.parametrize('merge', ParallelColonies.MERGES)
+def test_two_processes_merge_like_serial_colonies(merge):
+    with ParallelColonies(diamond(), num_colonies=2, num_ants=5, merge=merge, merge_interval=120, seed=3) as colonies:
+        result = colonies.run(3)
+        # Every colony continues from the merged pheromone.
+        assert np.all(colonies._pheromone == colonies._pheromone[0])
+        pheromone = colonies.pheromone
+
+    expected, best_length = serial_rounds(merge, 3)
+    assert result['rounds'] == 3
+    assert result['ant_steps'] == 3 * 120 * 2 * 10
+    assert result['best_length'] == best_length == 2.0
+    assert np.allclose(pheromone, expected, rtol=1e-12)
+
+
+def test_close_releases_shared_memory():
+    colonies = ParallelColonies(diamond(), num_colonies=2, num_ants=5, merge_interval=60, seed=0)
+    colonies.start()
+    name = colonies._shm.name
+    processes = [process for process, _ in colonies._workers]
+    colonies.run(1)
+    colonies.close()
+
+    assert all(not process.is_alive() for process in processes)
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=name)
+    # The merged pheromone is still readable once the shared memory is gone.
+    assert colonies.pheromone.shape == (4,)
+    assert np.all(colonies.pheromone > 0)
+
+
+def test_close_after_a_colony_died():
+    colonies = ParallelColonies(diamond(), num_colonies=2, num_ants=5, merge_interval=60, seed=0)
+    colonies.start()
+    name = colonies._shm.name
+    process = colonies._workers[0][0]
+    process.kill()
+    process.join()
+    colonies.close()
+
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=name)
@@ -0,0 +1,34 @@
+import csv
+import json
+
+from aco_example.profiling import Profiler
+
+
+def export_two_windows(path):
+    profiler = Profiler(enabled=True, window=0)
+    profiler.export_to(str(path))
+    with profiler.phase('events'):
+        pass
+    profiler.frame()
+    with profiler.phase('simulation'):
+        pass
+    profiler.count('ant_decisions', 7)
+    profiler.frame()
+
+
+def test_csv_export_keeps_columns_first_seen_later(tmp_path):
+    export_two_windows(tmp_path / 'profile.csv')
+    with open(tmp_path / 'profile.csv', newline='') as file:
+        rows = list(csv.DictReader(file))
+
+    assert len(rows) == 2
+    assert {'events_ms', 'simulation_ms', 'ant_decisions', 'fps', 'frames', 'time'} <= set(rows[0])
+    assert rows[0]['events_ms'] != '' and rows[0]['ant_decisions'] == ''
+    assert rows[1]['simulation_ms'] != '' and rows[1]['ant_decisions'] == '7'
+
+
+def test_jsonl_export(tmp_path):
+    export_two_windows(tmp_path / 'profile.jsonl')
+    with open(tmp_path / 'profile.jsonl') as file:
+        rows = [json.loads(line) for line in file]
+    assert 'events_ms' in rows[0] and rows[1]['ant_decisions'] == 7
@@ -0,0 +1,78 @@
+import numpy as np
+
+from aco_example.recording import Recorder, Replay
+from aco_example.simulation import Simulation
+from tests.networks import grid_network
+
+
+def test_replay_follows_graph_edits(tmp_path):
+    network = grid_network(side=4)
+    recorder = Recorder(capacity=100, every=10, ants=20, path=str(tmp_path / 'run.rec'))
+    simulation = Simulation(network.nodes, network.paths, 10, seed=1, recorder=recorder)
+    simulation.start()
+    simulation.step(50)
+    before = (simulation.graph.pos.copy(), simulation.graph.edge_nodes.copy())
+
+    path = network.paths[0]
+    network.remove_path(path)
+    simulation.remove_path(path)
+    node = network.nodes[5]
+    network.remove_node(node)
+    simulation.remove_node(node)
+    simulation.step(50)
+    after = (simulation.graph.pos.copy(), simulation.graph.edge_nodes.copy())
+    recorder.close()
+
+    for replay in (recorder.replay(), Replay.open(str(tmp_path / 'run.rec'))):
+        replay.seek(40)
+        assert np.array_equal(replay.pos, before[0]) and np.array_equal(replay.edge_nodes, before[1])
+        replay.seek(60)
+        assert np.array_equal(replay.pos, after[0]) and np.array_equal(replay.edge_nodes, after[1])
+        assert replay.frame()[1].size == min(len(after[1]), len(before[1]))
+
+
+def test_ring_buffer_forgets_old_layouts():
+    network = grid_network(side=3)
+    recorder = Recorder(capacity=3, every=10, ants=5)
+    simulation = Simulation(network.nodes, network.paths, 5, seed=1, recorder=recorder)
+    simulation.start()
+    for node in network.nodes[1:4]:
+        simulation.step(10)
+        simulation.move_node(node, node.rect.x + 10, node.rect.y)
+    simulation.step(30)
+
+    replay = recorder.replay()
+    assert len(recorder.layouts) == 1
+    assert np.array_equal(replay.pos, simulation.graph.pos)
+
+
+def test_frames_widen_for_added_paths(tmp_path):
+    network = grid_network(side=5)
+    recorder = Recorder(capacity=100, every=10, ants=20, path=str(tmp_path / 'run.rec'))
+    simulation = Simulation(network.nodes, network.paths, 10, seed=1, recorder=recorder)
+    simulation.start()
+    simulation.step(50)
+    first = recorder.replay()
+    first.seek(50)
+    early = first.frame()[1].copy()
+
+    # Adding paths twice outgrows the frames twice, going from 40 edges to 41 and then to 86.
+    pheromone = {}
+    for count in (1, 45):
+        pairs = [(i, j) for i in range(25) for j in range(i + 2, 25)
+                 if network.nodes[i].path_to(network.nodes[j]) is None]
+        for i, j in pairs[:count]:
+            simulation.add_path(network.connect(network.nodes[i], network.nodes[j], (0, 60, 180)))
+        simulation.step(50)
+        pheromone[simulation.ticks] = simulation.graph.pheromone.copy()
+    recorder.close()
+    assert simulation.graph.num_edges == 86
+
+    for replay in (recorder.replay(), Replay.open(str(tmp_path / 'run.rec'))):
+        replay.seek(50)
+        assert np.array_equal(replay.frame()[1], early)
+        for tick, expected in pheromone.items():
+            replay.seek(tick)
+            assert replay.frame()[0] == tick
+            assert np.allclose(replay.frame()[1], expected, rtol=1e-6)
+            assert len(replay.edge_nodes) == len(expected)
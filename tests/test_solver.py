@@ -0,0 +1,46 @@
+import numpy as np
+
+from aco_example.colony import roulette
+from aco_example.graph import Graph
+from aco_example.solver import MaxMinAntSystem
+
+
+def diamond(isolated=0):
+    """A short and a long route from node 0 to node 3, plus nodes connected to nothing."""
+    pos = np.array([(0, 0), (1, 1), (1, -1), (2, 0)] + [(5 + i, 5) for i in range(isolated)], dtype=float)
+    graph = Graph.from_arrays(pos, np.array([[0, 1], [1, 3], [0, 2], [2, 3]]), length=np.array([1.0, 1.0, 2.0, 2.0]))
+    graph.is_colony[0] = True
+    graph.has_food[3] = True
+    return graph
+
+
+def test_mmas_learns_on_sparse_graph():
+    solver = MaxMinAntSystem(diamond(isolated=6), n_ants=5, rng=np.random.default_rng(0))
+    best = solver.run(51)
+
+    assert best.nodes == [0, 1, 3]
+    assert 0 < solver.tau_min < solver.tau_max
+    # The short route is reinforced up to the bound while the long one evaporates.
+    assert np.all(solver.pheromone[:2] == solver.tau_max)
+    assert np.all(solver.pheromone[2:] < solver.tau_max)
+
+
+def test_roulette_keeps_small_segments_after_large_ones():
+    weight = np.array([1e3, 1e3, 1e-14, 2e-14])
+    rng = np.random.default_rng(0)
+    pick, total = roulette(weight, np.array([0, 2]), np.array([2, 4]), rng)
+    assert total.tolist() == [2e3, 3e-14]
+
+    picks = np.array([roulette(weight, np.array([0, 2]), np.array([2, 4]), rng)[0] for _ in range(2000)])
+    assert set(picks[:, 0]) == {0, 1}
+    assert set(picks[:, 1]) == {2, 3}
+    assert 0.6 < np.mean(picks[:, 1] == 3) < 0.73
+
+
+def test_mmas_keeps_bounds_without_a_path():
+    solver = MaxMinAntSystem(diamond(), n_ants=5, rng=np.random.default_rng(0))
+    solver.run(5)
+    solver.pheromone[:] = solver.tau_min
+    # An iteration in which no ant reached food only evaporates, which must not go below the lower bound.
+    solver.update(None, None, None, None)
+    assert np.all(solver.pheromone == solver.tau_min)
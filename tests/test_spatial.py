@@ -0,0 +1,55 @@
+import random
+
+import pygame
+
+from aco_example.node import Node
+from aco_example.spatial import GridIndex
+
+
+def brute_point(nodes, x, y, radius):
+    return [node for node in nodes if (node.rect.centerx - x) ** 2 + (node.rect.centery - y) ** 2 <= radius ** 2]
+
+
+def brute_rect(nodes, rect):
+    return [node for node in nodes if node.rect.colliderect(rect)]
+
+
+def test_queries_match_brute_force_while_nodes_move():
+    rng = random.Random(0)
+    index = GridIndex(40)
+    nodes = []
+    for i in range(200):
+        size = rng.choice((20, 40, 120))
+        node = Node(i, (0, 80, 200), pygame.Rect(rng.randint(-100, 900), rng.randint(-100, 700), size, size))
+        index.insert(node)
+        nodes.append(node)
+
+    for _ in range(300):
+        node = rng.choice(nodes)
+        node.update(rng.randint(-100, 900), rng.randint(-100, 700))
+        x, y, radius = rng.randint(0, 800), rng.randint(0, 600), rng.randint(0, 100)
+        assert index.query_point(x, y, radius) == brute_point(nodes, x, y, radius)
+        rect = pygame.Rect(rng.randint(0, 800), rng.randint(0, 600), rng.randint(1, 200), rng.randint(1, 200))
+        assert index.query_rect(rect) == brute_rect(nodes, rect)
+
+
+def test_removed_nodes_are_not_found():
+    index = GridIndex(40)
+    first = Node(0, (0, 80, 200), pygame.Rect(100, 100, 40, 40))
+    second = Node(1, (0, 80, 200), pygame.Rect(110, 100, 40, 40))
+    index.insert(second)
+    index.insert(first)
+    # Hits come oldest node first, whatever order they were inserted in.
+    assert index.query_point(125, 120, 30) == [first, second]
+
+    index.remove(first)
+    assert index.query_point(125, 120, 30) == [second]
+    assert first.spatial_index is None
+    # Moving a node that left the index does not put it back.
+    first.update(110, 100)
+    assert index.query_rect(pygame.Rect(100, 100, 60, 60)) == [second]
+    assert len(index) == 1
+
+    index.clear()
+    assert len(index) == 0 and second.spatial_index is None
+    assert index.query_rect(pygame.Rect(0, 0, 800, 600)) == []
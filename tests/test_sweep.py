@@ -0,0 +1,66 @@
+import csv
+import json
+
+from aco_example.__main__ import main
+from aco_example.graph_io import load_graph, save_graph
+from aco_example.sweep import PARAMETERS, grid, prepare, run_case
+from benchmarks.workloads import grid as grid_graph
+
+
+def graph_file(tmp_path):
+    path = str(tmp_path / 'grid.edges')
+    save_graph(grid_graph(16, seed=1), path)
+    return path
+
+
+def test_grid_combines_every_value():
+    cases = grid(alpha=(1, 2), beta=(0,), evap=(0.1, 0.2, 0.3), seed=range(2))
+    assert len(cases) == 12
+    assert all(list(case) == list(PARAMETERS) for case in cases)
+    assert cases[0] == {'alpha': 1, 'beta': 0, 'evap': 0.1, 'q': 1.0, 'num_ants': 50, 'seed': 0}
+    assert cases[-1]['alpha'] == 2 and cases[-1]['evap'] == 0.3 and cases[-1]['seed'] == 1
+
+
+def test_csv_output_is_appended_under_one_header(tmp_path):
+    path = graph_file(tmp_path)
+    output = str(tmp_path / 'runs.csv')
+    argv = [path, '--alpha', '1', '2', '--ants', '5', '--ticks', '300', '--processes', '2', '--output', output]
+    assert main(argv) is None
+    main(argv)
+
+    with open(output, newline='') as file:
+        rows = list(csv.DictReader(file))
+    assert len(rows) == 4
+    assert sorted(row['alpha'] for row in rows) == ['1.0', '1.0', '2.0', '2.0']
+    assert all(row['ticks'] == '300' and float(row['best_length']) > 0 for row in rows)
+
+
+def test_jsonl_results_match_single_runs(tmp_path):
+    path = graph_file(tmp_path)
+    output = str(tmp_path / 'runs.jsonl')
+    main([path, '--beta', '0', '1', '--ants', '5', '--ticks', '600', '--patience', '120', '--processes', '2',
+          '--output', output])
+
+    with open(output) as file:
+        results = [json.loads(line) for line in file]
+    assert len(results) == 2
+    for result in results:
+        params = {name: result[name] for name in PARAMETERS}
+        # Runs in the pool measure exactly what the same run in this process does.
+        expected = run_case(prepare(load_graph(path)), params, ticks=600, patience=120)
+        for name in ('ticks', 'best_length', 'best_tick', 'convergence_tick', 'entropy', 'dominant_share'):
+            assert result[name] == expected[name]
+
+
+def test_csv_from_an_earlier_sweep_gets_new_columns(tmp_path):
+    path = graph_file(tmp_path)
+    output = tmp_path / 'runs.csv'
+    output.write_text('alpha,beta,ticks,best_length\n1.0,0.0,100,4.5\n')
+    main([path, '--ants', '5', '--ticks', '300', '--processes', '1', '--output', str(output)])
+
+    with open(output, newline='') as file:
+        rows = list(csv.DictReader(file))
+    assert len(rows) == 2
+    assert rows[0]['ticks'] == '100' and rows[0]['best_tick'] == ''
+    assert rows[1]['ticks'] == '300' and rows[1]['best_tick'] != ''
+    assert float(rows[1]['best_length']) > 0
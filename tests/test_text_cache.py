@@ -0,0 +1,46 @@
+from aco_example.text_cache import TextCache
+
+
+class CountingFont:
+    """Stands in for a pygame font and counts what it renders."""
+
+    def __init__(self):
+        self.rendered = []
+
+    def render(self, text, antialias, color):
+        self.rendered.append(text)
+        return object()
+
+
+def test_cached_text_is_rendered_once():
+    font = CountingFont()
+    cache = TextCache()
+    surface = cache.render(font, '12.5', (255, 255, 255))
+    assert cache.render(font, '12.5', [255, 255, 255]) is surface
+    # A different color or antialiasing is a different surface.
+    assert cache.render(font, '12.5', (0, 0, 0)) is not surface
+    assert cache.render(font, '12.5', (255, 255, 255), antialias=False) is not surface
+    assert font.rendered == ['12.5'] * 3
+    assert cache.renders == 3 and len(cache) == 3
+
+
+def test_least_recently_used_text_is_evicted():
+    font = CountingFont()
+    cache = TextCache(max_size=3)
+    a = cache.render(font, 'a', (255, 255, 255))
+    cache.render(font, 'b', (255, 255, 255))
+    cache.render(font, 'c', (255, 255, 255))
+    # Using 'a' again makes 'b' the least recently used surface.
+    assert cache.render(font, 'a', (255, 255, 255)) is a
+    cache.render(font, 'd', (255, 255, 255))
+    assert len(cache) == 3
+
+    assert cache.render(font, 'a', (255, 255, 255)) is a
+    cache.render(font, 'c', (255, 255, 255))
+    cache.render(font, 'd', (255, 255, 255))
+    assert font.rendered == ['a', 'b', 'c', 'd']
+    cache.render(font, 'b', (255, 255, 255))
+    assert font.rendered == ['a', 'b', 'c', 'd', 'b']
+
+    cache.clear()
+    assert len(cache) == 0
@@ -0,0 +1,46 @@
+import time
+
+import numpy as np
+
+from aco_example.simulation import Simulation
+from aco_example.worker import SimulationWorker
+from benchmarks.workloads import grid
+
+
+def test_latest_snapshot_never_overwritten():
+    simulation = Simulation.from_graph(grid(16), num_ants=5, seed=1)
+    simulation.start()
+    worker = SimulationWorker(simulation)
+
+    worker._publish()
+    # latest can hand out the front snapshot while the worker is already copying the next one.
+    drawn = worker.latest()
+    kept = (drawn.ant_pos.copy(), drawn.pheromone.copy())
+    for _ in range(3):
+        simulation.step(20)
+        worker._publish()
+        assert np.array_equal(drawn.ant_pos, kept[0])
+        assert np.array_equal(drawn.pheromone, kept[1])
+    assert not np.array_equal(worker.latest().pheromone, kept[1])
+
+
+def test_worker_waits_for_lock():
+    simulation = Simulation.from_graph(grid(16), num_ants=5, seed=1)
+    simulation.start()
+    worker = SimulationWorker(simulation)
+    worker.clock.as_fast_as_possible = True
+    ran = []
+
+    with worker.lock:
+        worker.start()
+        worker.submit(ran.append, simulation.ticks)
+        time.sleep(0.05)
+        # Neither ticks nor commands run while another thread holds the lock.
+        assert simulation.ticks == 0
+        assert ran == []
+    deadline = time.perf_counter() + 5
+    while not ran and time.perf_counter() < deadline:
+        time.sleep(0.01)
+    worker.stop()
+    assert ran == [0]
+    assert simulation.ticks > 0